@@ -0,0 +1,131 @@
+from datetime import datetime
+from typing import List, Optional
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+import json
+import models, pagination, rollups
+
+table = models.AnalyticsData
+
+# sort parameter -> (key column, descending). Every order ends on id so
+# pages are stable, and each key has a (key, id) index to seek on.
+SORTS = {
+    "recorded_at": (table.recorded_at, False),
+    "-recorded_at": (table.recorded_at, True),
+    "value": (table.value, False),
+    "-value": (table.value, True),
+}
+
+
+def criteria(
+    categories: Optional[List[str]] = None,
+    metric_names: Optional[List[str]] = None,
+    min_value: Optional[int] = None,
+    max_value: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> list:
+    """
+    WHERE clauses for GET /analytics/data, or a 400 for an impossible range.
+
+    Names compare through the dimension comparator: the integer keys are
+    matched against an id subquery, so category_id/metric_id indexes apply.
+    Bounds without an offset are taken as UTC, like stored timestamps.
+    """
+    start = rollups.as_utc(start) if start is not None else None
+    end = rollups.as_utc(end) if end is not None else None
+    if min_value is not None and max_value is not None and min_value > max_value:
+        raise HTTPException(status_code=400, detail="min_value is greater than max_value")
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    clauses = []
+    for column, names in ((table.category, categories), (table.metric_name, metric_names)):
+        if not names:
+            continue
+        # One name is an equality seek, so the index also yields the order
+        clauses.append(column == names[0] if len(names) == 1 else column.in_(names))
+    if min_value is not None:
+        clauses.append(table.value >= min_value)
+    if max_value is not None:
+        clauses.append(table.value <= max_value)
+    if start is not None:
+        clauses.append(table.recorded_at >= start)
+    if end is not None:
+        clauses.append(table.recorded_at < end)
+    return clauses
+
+
+def sort_key(sort: str):
+    if sort not in SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(SORTS)}")
+    return SORTS[sort]
+
+
+def order_by(sort: str) -> list:
+    column, descending = sort_key(sort)
+    if descending:
+        return [column.desc(), table.id.desc()]
+    return [column, table.id]
+
+
+def seek(sort: str, cursor: str):
+    """Keyset clause continuing after the row a cursor was issued for."""
+    column, descending = sort_key(sort)
+    key, last_id = pagination.decode_cursor(cursor, 2)
+    if column is table.recorded_at:
+        try:
+            key = datetime.fromisoformat(key)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    elif not isinstance(key, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    position = tuple_(column, table.id)
+    return position < (key, last_id) if descending else position > (key, last_id)
+
+
+def cursor_key(sort: str, row) -> tuple:
+    column, _ = sort_key(sort)
+    return getattr(row, column.key), row.id
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN for any SELECT, bound parameters included."""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _explain(element, compiler, **kw):
+    return "EXPLAIN QUERY PLAN " + compiler.process(element.statement, **kw)
+
+
+@compiles(Explain, "postgresql")
+def _explain_postgresql(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def explain(db: AsyncSession, stmt) -> dict:
+    """The database's plan for `stmt`, to confirm which indexes it uses."""
+    conn = await db.connection()
+    dialect = conn.dialect.name
+    rows = (await conn.execute(Explain(stmt))).all()
+    if dialect == "postgresql":
+        plan = rows[0][0]
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+    else:
+        # (id, parent, notused, detail) per step of the query plan
+        plan = [{"id": row[0], "parent": row[1], "detail": row[3]} for row in rows]
+    return {
+        "dialect": dialect,
+        "sql": str(stmt.compile(dialect=conn.dialect)),
+        "plan": plan
+    }
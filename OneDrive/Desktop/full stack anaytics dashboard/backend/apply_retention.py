@@ -0,0 +1,33 @@
+import asyncio
+import os
+from database import engine, init_db
+import partitions
+import logging
+
+# Reduce noise from sqlalchemy
+logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
+
+async def apply_retention():
+    """Create upcoming partitions and downsample/drop months past ANALYTICS_RETENTION_MONTHS."""
+    try:
+        await init_db()
+        async with engine.begin() as conn:
+            created = await partitions.ensure_partitions(conn)
+        for name in created:
+            print(f"Created partition {name}")
+
+        if partitions.ANALYTICS_RETENTION_MONTHS <= 0:
+            print("ANALYTICS_RETENTION_MONTHS is not set; keeping all raw rows.")
+            return
+
+        expired = await partitions.apply_retention()
+        for month in expired:
+            print(f"Dropped {month['rows']} rows from {month['month']:%Y-%m} (hour/day rollups kept)")
+        print(f"Retention complete: {len(expired)} month(s) expired.")
+
+    except Exception as e:
+        print(f"Error during retention: {e}")
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    asyncio.run(apply_retention())
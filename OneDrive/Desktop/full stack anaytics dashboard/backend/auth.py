@@ -1,9 +1,18 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+import asyncio
+import hashlib
+import hmac
 import os
+import secrets
+import threading
+import time
 from dotenv import load_dotenv
+import metrics
 
 import bcrypt
 # Workaround for passlib + bcrypt 4.0.0+ compatibility issue
@@ -15,6 +24,13 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkeyForDevelopmentOnly12345")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+REFRESH_TOKEN_EXPIRE_DAYS = float(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 14))
+# A rotated token presented again within this window is a race, not a replay
+REFRESH_REUSE_GRACE_SECONDS = float(os.getenv("REFRESH_REUSE_GRACE_SECONDS", 10))
+
+# bcrypt runs on a small dedicated pool so it never blocks the event loop
+HASH_MAX_WORKERS = int(os.getenv("HASH_MAX_WORKERS", 4))
+HASH_MAX_QUEUE = int(os.getenv("HASH_MAX_QUEUE", 100))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -24,6 +40,63 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+
+hash_executor = ThreadPoolExecutor(max_workers=HASH_MAX_WORKERS, thread_name_prefix="bcrypt")
+_hash_stats_lock = threading.Lock()
+_hash_pending = 0
+hash_stats = {
+    "calls": 0,
+    "rejected": 0,
+    "queue_wait_seconds_total": 0.0,
+    "queue_wait_seconds_max": 0.0,
+    "hash_seconds_total": 0.0,
+    "hash_seconds_max": 0.0,
+}
+
+def _record_hash(operation: str, wait: float, elapsed: float):
+    metrics.hash_queue_wait.observe(wait, operation)
+    metrics.hash_latency.observe(elapsed, operation)
+    with _hash_stats_lock:
+        hash_stats["calls"] += 1
+        hash_stats["queue_wait_seconds_total"] += wait
+        hash_stats["queue_wait_seconds_max"] = max(hash_stats["queue_wait_seconds_max"], wait)
+        hash_stats["hash_seconds_total"] += elapsed
+        hash_stats["hash_seconds_max"] = max(hash_stats["hash_seconds_max"], elapsed)
+
+async def _run_hashing(fn, *args):
+    global _hash_pending
+    if _hash_pending >= HASH_MAX_QUEUE:
+        with _hash_stats_lock:
+            hash_stats["rejected"] += 1
+        raise HTTPException(status_code=503, detail="Authentication is busy, please retry")
+
+    submitted = time.perf_counter()
+
+    def job():
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            _record_hash(fn.__name__, started - submitted, time.perf_counter() - started)
+
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(hash_executor, job)
+    finally:
+        _hash_pending -= 1
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_hashing(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await _run_hashing(get_password_hash, password)
+
+def get_hash_stats() -> dict:
+    with _hash_stats_lock:
+        stats = dict(hash_stats)
+    stats.update(pending=_hash_pending, max_workers=HASH_MAX_WORKERS, max_queue=HASH_MAX_QUEUE)
+    return stats
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -34,3 +107,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+def create_refresh_token() -> str:
+    """Opaque random token; only its digest is stored (see hash_refresh_token)."""
+    return secrets.token_urlsafe(32)
+
+def hash_refresh_token(token: str) -> str:
+    # Keyed with SECRET_KEY: a leaked refresh_tokens table cannot be used
+    # to forge or look up tokens, and verifying costs one HMAC, not bcrypt
+    return hmac.new(SECRET_KEY.encode(), token.encode(), hashlib.sha256).hexdigest()
@@ -0,0 +1,64 @@
+import asyncio
+import os
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select, delete
+from models import AnalyticsData
+from database import engine, init_db
+import rollups
+import logging
+
+# Reduce noise from sqlalchemy
+logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
+
+BATCH_SIZE = 5000
+
+async def backfill_rollups():
+    """Rebuild the minute/hour/day rollup tables from analytics_data."""
+    try:
+        await init_db()
+        AsyncSessionLocal = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+        async with AsyncSessionLocal() as session:
+            for table, _ in rollups.ROLLUPS:
+                await session.execute(delete(table))
+
+            last_id = 0
+            total = 0
+            while True:
+                result = await session.execute(
+                    select(AnalyticsData)
+                    .where(AnalyticsData.id > last_id)
+                    .order_by(AnalyticsData.id)
+                    .limit(BATCH_SIZE)
+                )
+                batch = result.scalars().all()
+                if not batch:
+                    break
+                last_id = batch[-1].id
+
+                # Rows without a timestamp cannot be bucketed
+                timed = [
+                    {
+                        "metric_name": row.metric_name,
+                        "value": row.value,
+                        "category": row.category,
+                        "recorded_at": row.recorded_at
+                    }
+                    for row in batch
+                    if row.recorded_at is not None
+                ]
+                await rollups.apply(session, timed)
+                total += len(timed)
+                print(f"Rolled up {total} rows (last id {last_id})")
+
+            await session.commit()
+            print(f"Backfill complete: {total} rows folded into rollups.")
+
+    except Exception as e:
+        print(f"Error during backfill: {e}")
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    asyncio.run(backfill_rollups())
@@ -0,0 +1,60 @@
+import asyncio
+import os
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select, delete
+from models import AnalyticsData, AnalyticsSketch
+from database import engine, init_db
+import sketches
+import logging
+
+# Reduce noise from sqlalchemy
+logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
+
+BATCH_SIZE = 5000
+
+async def backfill_sketches():
+    """Rebuild the hourly quantile sketches from analytics_data."""
+    try:
+        await init_db()
+        AsyncSessionLocal = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(AnalyticsSketch))
+
+            store = sketches.SketchStore()
+            last_id = 0
+            total = 0
+            while True:
+                result = await session.execute(
+                    select(
+                        AnalyticsData.id,
+                        AnalyticsData.metric_name,
+                        AnalyticsData.value,
+                        AnalyticsData.category,
+                        AnalyticsData.recorded_at
+                    )
+                    .where(AnalyticsData.id > last_id)
+                    .order_by(AnalyticsData.id)
+                    .limit(BATCH_SIZE)
+                )
+                batch = [row._asdict() for row in result.all()]
+                if not batch:
+                    break
+                last_id = batch[-1]["id"]
+
+                store.on_insert(batch)
+                total += len(batch)
+                print(f"Sketched {total} rows (last id {last_id})")
+
+            await sketches.merge_into_table(session, store.pending)
+            await session.commit()
+            print(f"Backfill complete: {total} rows in {len(store.pending)} hourly sketches.")
+
+    except Exception as e:
+        print(f"Error during backfill: {e}")
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    asyncio.run(backfill_sketches())
@@ -0,0 +1,128 @@
+"""
+Benchmark: SQL vs. columnar (NumPy) dashboard summaries
+
+Fills a scratch SQLite database, loads the columnar snapshot from it and
+times the /analytics/summary queries both ways.
+
+    python benchmark_columnar.py --rows 1000000 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+SCRATCH = os.path.join(tempfile.mkdtemp(), "bench_columnar.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{SCRATCH}"
+os.environ.setdefault("DB_ECHO", "false")
+
+from sqlalchemy import select, func
+import database
+import dimensions
+import models
+import columnar
+
+
+def seed(rows: int):
+    metrics = [f"metric_{i}" for i in range(50)]
+    categories = [f"category_{i}" for i in range(20)]
+
+    conn = sqlite3.connect(SCRATCH)
+    conn.executemany("INSERT INTO metrics (id, name) VALUES (?, ?)", enumerate(metrics, 1))
+    conn.executemany("INSERT INTO categories (id, name) VALUES (?, ?)", enumerate(categories, 1))
+    start = datetime(2025, 1, 1)
+    rng = random.Random(42)
+    batch = []
+    for i in range(rows):
+        batch.append((
+            rng.randint(1, len(metrics)),
+            rng.randint(0, 10000),
+            rng.randint(1, len(categories)),
+            (start + timedelta(seconds=i * 30)).strftime("%Y-%m-%d %H:%M:%S.%f")
+        ))
+        if len(batch) == 100000:
+            conn.executemany("INSERT INTO analytics_data (metric_id, value, category_id, recorded_at) VALUES (?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO analytics_data (metric_id, value, category_id, recorded_at) VALUES (?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+    return start, start + timedelta(seconds=rows * 30)
+
+
+async def sql_summary(category=None, start=None, end=None):
+    # Same statement as get_analytics_summary
+    stmt = select(
+        models.AnalyticsData.category_id,
+        func.count(models.AnalyticsData.id),
+        func.sum(models.AnalyticsData.value),
+        func.max(models.AnalyticsData.value)
+    )
+    if category:
+        stmt = stmt.where(models.AnalyticsData.category == category)
+    if start:
+        stmt = stmt.where(models.AnalyticsData.recorded_at >= start)
+    if end:
+        stmt = stmt.where(models.AnalyticsData.recorded_at < end)
+    stmt = stmt.group_by(models.AnalyticsData.category_id)
+    async with database.AsyncSessionLocal() as session:
+        rows = (await session.execute(stmt)).all()
+        await dimensions.categories.names_for(session, (row[0] for row in rows))
+        return rows
+
+
+async def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        if asyncio.iscoroutine(result):
+            await result
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"Seeding {args.rows} rows into {SCRATCH}...")
+    await database.init_db()
+    first, last = seed(args.rows)
+    week_start = first + (last - first) / 2
+    window = (
+        week_start.replace(tzinfo=timezone.utc),
+        (week_start + timedelta(days=7)).replace(tzinfo=timezone.utc)
+    )
+
+    store = columnar.ColumnarStore()
+    started = time.perf_counter()
+    await store.load()
+    print(f"Columnar snapshot loaded in {time.perf_counter() - started:.2f}s")
+
+    cases = [
+        ("whole table", {}),
+        ("one category", {"category": "category_3"}),
+        ("7-day window", {"start": window[0], "end": window[1]}),
+        ("category + window", {"category": "category_3", "start": window[0], "end": window[1]}),
+    ]
+
+    print("\n" + "=" * 64)
+    print(f"{'Query':<20} | {'SQL (ms)':>10} | {'Columnar (ms)':>14} | {'Speedup':>8}")
+    print("=" * 64)
+    for name, kwargs in cases:
+        sql_ms = await timed(lambda: sql_summary(**kwargs), args.repeat)
+        col_ms = await timed(lambda: store.summary(**kwargs), args.repeat)
+        print(f"{name:<20} | {sql_ms:>10.2f} | {col_ms:>14.2f} | {sql_ms / col_ms:>7.1f}x")
+
+    await database.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
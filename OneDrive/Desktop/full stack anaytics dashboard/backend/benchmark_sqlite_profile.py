@@ -0,0 +1,114 @@
+"""
+Benchmark: default vs. sqlite-production database profile
+
+Runs the same mixed read/write workload against a fresh SQLite file for each
+profile and prints reads/s and writes/s.
+
+    python benchmark_sqlite_profile.py --writers 4 --readers 16 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from sqlalchemy import select
+import database
+import dimensions
+import ingest
+import models
+
+
+async def run_profile(profile: str, writers: int, readers: int, seconds: float) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), f"bench_{profile}.db")
+    url = f"sqlite+aiosqlite:///{path}"
+    write_engine, read_engine, sessionmaker = database.configure(url, profile, echo=False)
+
+    async with write_engine.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+    # Fresh database per profile, so forget ids interned by the last one
+    dimensions.metrics.clear()
+    dimensions.categories.clear()
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    deadline = time.perf_counter() + seconds
+
+    async def writer(n: int):
+        while time.perf_counter() < deadline:
+            try:
+                async with sessionmaker() as session:
+                    row = {
+                        "metric_name": f"metric_{n}",
+                        "value": n,
+                        "category": f"cat_{n % 4}",
+                        "recorded_at": datetime.now(timezone.utc)
+                    }
+                    await dimensions.encode(session, [row])
+                    session.add(models.AnalyticsData(**{c: row[c] for c in ingest.COLUMNS}))
+                    await session.commit()
+                counts["writes"] += 1
+            except Exception:
+                counts["errors"] += 1
+
+    async def reader(n: int):
+        # Index-backed page read so cost does not grow with the table
+        stmt = (
+            select(models.AnalyticsData)
+            .where(models.AnalyticsData.category == f"cat_{n % 4}")
+            .order_by(models.AnalyticsData.recorded_at.desc(), models.AnalyticsData.id.desc())
+            .limit(50)
+        )
+        while time.perf_counter() < deadline:
+            try:
+                async with sessionmaker() as session:
+                    (await session.execute(stmt)).scalars().all()
+                counts["reads"] += 1
+            except Exception:
+                counts["errors"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(writer(i) for i in range(writers)),
+        *(reader(i) for i in range(readers))
+    )
+    elapsed = time.perf_counter() - started
+
+    await write_engine.dispose()
+    if read_engine is not write_engine:
+        await read_engine.dispose()
+
+    return {
+        "profile": profile,
+        "writes_per_sec": counts["writes"] / elapsed,
+        "reads_per_sec": counts["reads"] / elapsed,
+        "errors": counts["errors"],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    results = []
+    for profile in ("default", "sqlite-production"):
+        print(f"Running {profile} for {args.seconds:.0f}s "
+              f"({args.writers} writers, {args.readers} readers)...")
+        results.append(await run_profile(profile, args.writers, args.readers, args.seconds))
+
+    print("\n" + "=" * 60)
+    print(f"{'Profile':<20} | {'Writes/s':>10} | {'Reads/s':>10} | {'Errors':>6}")
+    print("=" * 60)
+    for r in results:
+        print(f"{r['profile']:<20} | {r['writes_per_sec']:>10.1f} | {r['reads_per_sec']:>10.1f} | {r['errors']:>6}")
+
+    base, tuned = results
+    if base["writes_per_sec"] and base["reads_per_sec"]:
+        print(f"\nWrite speedup: {tuned['writes_per_sec'] / base['writes_per_sec']:.2f}x, "
+              f"read speedup: {tuned['reads_per_sec'] / base['reads_per_sec']:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
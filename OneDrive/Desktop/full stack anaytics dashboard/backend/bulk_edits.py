@@ -0,0 +1,216 @@
+from typing import AsyncIterator, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete
+import itertools
+import os
+from dotenv import load_dotenv
+import models, schemas, database, dimensions, etags, write_hooks, rollups, analytics_query
+
+load_dotenv()
+
+# Rows per UPDATE/DELETE statement. Each chunk commits on its own, so a
+# large purge never holds the write lock (or a huge transaction) for long.
+BULK_EDIT_CHUNK = int(os.getenv("BULK_EDIT_CHUNK", 1000))
+
+COLUMNS = (
+    models.AnalyticsData.id,
+    models.AnalyticsData.metric_id,
+    models.AnalyticsData.value,
+    models.AnalyticsData.category_id,
+    models.AnalyticsData.recorded_at
+)
+
+
+def filter_criteria(spec: schemas.AnalyticsFilter) -> list:
+    """
+    The filter's WHERE clauses, built like GET /analytics/data's: bounds
+    are normalized to UTC, and an empty range is a 400.
+    """
+    return analytics_query.criteria(
+        [spec.category] if spec.category is not None else None,
+        [spec.metric_name] if spec.metric_name is not None else None,
+        spec.min_value, spec.max_value, spec.start, spec.end
+    )
+
+
+def validate(selection: schemas.AnalyticsSelection) -> str:
+    """Return an error message for an unusable selection, else ''."""
+    if (selection.ids is None) == (selection.filter is None):
+        return "Give either ids or filter"
+    if selection.filter is not None and not filter_criteria(selection.filter):
+        # An empty filter would match every row; that is never a cleanup job
+        return "filter needs at least one criterion"
+    return ""
+
+
+def _id_slices(ids: List[int]) -> List[List[int]]:
+    ids = sorted(set(ids))
+    return [ids[offset:offset + BULK_EDIT_CHUNK] for offset in range(0, len(ids), BULK_EDIT_CHUNK)]
+
+
+async def _lock_for_read(db: AsyncSession):
+    """
+    Start the transaction with the write lock on SQLite, so a before-image
+    read next cannot go stale before the UPDATE. PostgreSQL locks the rows
+    it reads FOR UPDATE instead.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        # Also pins a split session to the writer (see database.RoutingSession)
+        await database.exclusive(db, "analytics_edit")
+
+
+async def _values(db: AsyncSession, changes: schemas.AnalyticsChanges) -> dict:
+    """Column values for an UPDATE; new names are interned in `db`'s transaction."""
+    values = {}
+    if changes.metric_name is not None:
+        values["metric_id"] = await dimensions.metrics.id_for(db, changes.metric_name)
+    if changes.category is not None:
+        values["category_id"] = await dimensions.categories.id_for(db, changes.category)
+    if changes.value is not None:
+        values["value"] = changes.value
+    return values
+
+
+async def _locked_chunks(db: AsyncSession, selection: schemas.AnalyticsSelection) -> AsyncIterator[list]:
+    """
+    Yield the selected rows BULK_EDIT_CHUNK at a time, in id order. Each
+    chunk is read at the start of a transaction that holds the lock until
+    the caller commits: rows FOR UPDATE on PostgreSQL, the database write
+    lock on SQLite.
+
+    Id lists are sliced up front; filters page by id (keyset), so an
+    update whose new values still match the filter never revisits rows.
+    """
+    table = models.AnalyticsData
+    if selection.ids is not None:
+        for chunk in _id_slices(selection.ids):
+            await _lock_for_read(db)
+            stmt = select(*COLUMNS).where(table.id.in_(chunk)).order_by(table.id)
+            rows = (await db.execute(stmt.with_for_update())).mappings().all()
+            if rows:
+                yield rows
+        return
+
+    criteria = filter_criteria(selection.filter)
+    last_id = 0
+    while True:
+        await _lock_for_read(db)
+        stmt = (
+            select(*COLUMNS)
+            .where(*criteria, table.id > last_id)
+            .order_by(table.id)
+            .limit(BULK_EDIT_CHUNK)
+        )
+        rows = (await db.execute(stmt.with_for_update())).mappings().all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]["id"]
+
+
+async def delete_rows(db: AsyncSession, selection: schemas.AnalyticsSelection) -> dict:
+    """
+    One DELETE ... RETURNING per chunk; the removed rows come out of the
+    rollups in the same transaction and go to the write hooks after it.
+    """
+    table = models.AnalyticsData
+    if selection.ids is not None:
+        pages = ([table.id.in_(chunk)] for chunk in _id_slices(selection.ids))
+    else:
+        # Deleted rows stop matching, so the same page query walks the table
+        page = select(table.id).where(*filter_criteria(selection.filter)).order_by(table.id).limit(BULK_EDIT_CHUNK)
+        pages = itertools.repeat([table.id.in_(page)])
+
+    affected = chunks = 0
+    for where in pages:
+        rows = (await db.execute(delete(table).where(*where).returning(*COLUMNS))).mappings().all()
+        removed = await dimensions.decode(db, rows)
+        await rollups.retract(db, removed)
+        await db.commit()
+        if rows:
+            affected += len(rows)
+            chunks += 1
+            etags.bump()
+            write_hooks.after_delete(removed)
+        if selection.ids is None and len(rows) < BULK_EDIT_CHUNK:
+            break
+    return {"affected": affected, "chunks": chunks}
+
+
+async def update_rows(db: AsyncSession, selection: schemas.AnalyticsSelection, changes: schemas.AnalyticsChanges) -> dict:
+    """
+    Per chunk: read the locked rows for the before-image, then one
+    UPDATE ... WHERE id IN (...) and the rollup adjustment, all committed
+    together.
+    """
+    table = models.AnalyticsData
+    after_fields = changes.model_dump(exclude_none=True)
+
+    affected = chunks = 0
+    async for rows in _locked_chunks(db, selection):
+        # Interned under the chunk's lock; after the first commit the ids are cached
+        values = await _values(db, changes)
+        await db.execute(
+            update(table)
+            .where(table.id.in_([row["id"] for row in rows]))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        before = await dimensions.decode(db, rows)
+        after = [{**row, **after_fields} for row in before]
+        await rollups.retract(db, before)
+        await rollups.apply(db, after)
+        await db.commit()
+
+        affected += len(rows)
+        chunks += 1
+        etags.bump()
+        write_hooks.after_update(list(zip(before, after)))
+    return {"affected": affected, "chunks": chunks}
+
+
+async def update_row(db: AsyncSession, data_id: int, changes: schemas.AnalyticsChanges) -> Optional[Tuple[dict, dict]]:
+    """
+    One UPDATE ... RETURNING for PUT /analytics/data/{id}; returns the
+    decoded (before, after) rows, or None when the id does not exist.
+    The rollups are adjusted in the caller's transaction, which must not
+    have started yet.
+
+    PostgreSQL returns the before-image from the same statement through a
+    locked self-join (UPDATE ... FROM). SQLite's RETURNING cannot see
+    joined tables, so there the old row is read first, under the write
+    lock taken before anything else in the transaction.
+    """
+    postgresql = db.get_bind().dialect.name == "postgresql"
+    if not postgresql:
+        await _lock_for_read(db)
+    values = await _values(db, changes)
+
+    table = models.AnalyticsData.__table__
+    new = [table.c[column.key] for column in COLUMNS]
+    # A PUT without fields still answers with the row: SET value = value
+    stmt = update(table).values(values or {table.c.value: table.c.value})
+
+    if postgresql:
+        old = select(*new).where(table.c.id == data_id).with_for_update().subquery("old")
+        stmt = stmt.where(table.c.id == old.c.id).returning(
+            *new, *(column.label(f"old_{column.key}") for column in old.c)
+        )
+        row = (await db.execute(stmt)).mappings().first()
+        if row is None:
+            return None
+        after = {column.key: row[column.key] for column in new}
+        before = {column.key: row[f"old_{column.key}"] for column in new}
+    else:
+        before = (await db.execute(select(*new).where(table.c.id == data_id))).mappings().first()
+        if before is None:
+            return None
+        after = (await db.execute(stmt.where(table.c.id == data_id).returning(*new))).mappings().first()
+        if after is None:
+            return None
+
+    before, after = await dimensions.decode(db, [before, after])
+    if values:
+        await rollups.retract(db, [before])
+        await rollups.apply(db, [after])
+    return before, after
@@ -0,0 +1,160 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import select, func
+import logging
+import os
+from dotenv import load_dotenv
+import models, rollups, write_hooks
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CATALOG_ENABLED = os.getenv("CATALOG_ENABLED", "true").lower() == "true"
+
+DIMENSIONS = ("category", "metric_name")
+
+
+class Entry:
+    __slots__ = ("count", "first_seen", "last_seen")
+
+    def __init__(self, count: int = 0, first_seen: Optional[datetime] = None, last_seen: Optional[datetime] = None):
+        self.count = count
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+
+    def seen(self, recorded_at: Optional[datetime]):
+        if recorded_at is None:
+            return
+        if self.first_seen is None or recorded_at < self.first_seen:
+            self.first_seen = recorded_at
+        if self.last_seen is None or recorded_at > self.last_seen:
+            self.last_seen = recorded_at
+
+
+def grouped_catalog(dimension: str, *criteria):
+    """Rows, first and last recorded_at per name: group on the integer key, then join the names."""
+    table = models.AnalyticsData
+    key_column, lookup = getattr(table, dimension).property.info["dimension"]
+    groups = (
+        select(
+            key_column.label("key"),
+            func.count(table.id).label("count"),
+            func.min(table.recorded_at).label("first_seen"),
+            func.max(table.recorded_at).label("last_seen")
+        )
+        .where(key_column.is_not(None), *criteria)
+        .group_by(key_column)
+        .subquery()
+    )
+    return (
+        select(lookup.name, groups.c.count, groups.c.first_seen, groups.c.last_seen)
+        .join(groups, groups.c.key == lookup.id)
+        .order_by(lookup.name)
+    )
+
+
+class Catalog(write_hooks.SeededStore):
+    """
+    Every category and metric name with its row count and the first and
+    last recorded_at seen, kept current by the write hooks.
+
+    Counts are exact. The time bounds only ever widen on insert: a delete
+    or update cannot tell whether it removed the oldest or newest row of a
+    name without a query, so the bounds stay until the name's count drops
+    to zero. Retention moves first_seen up to its cutoff.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.entries: Dict[str, Dict[str, Entry]] = {dimension: {} for dimension in DIMENSIONS}
+
+    def _insert(self, rows: List[dict]):
+        for row in rows:
+            recorded_at = rollups.as_utc(row.get("recorded_at"))
+            for dimension, entries in self.entries.items():
+                name = row.get(dimension)
+                if name is None:
+                    continue
+                entry = entries.get(name)
+                if entry is None:
+                    entry = entries[name] = Entry()
+                entry.count += 1
+                entry.seen(recorded_at)
+
+    def _remove(self, dimension: str, name: Optional[str], count: int):
+        entries = self.entries[dimension]
+        entry = entries.get(name)
+        if entry is None:
+            return
+        entry.count -= count
+        if entry.count <= 0:
+            del entries[name]
+
+    def _remove_rows(self, rows: List[dict]):
+        for row in rows:
+            for dimension in DIMENSIONS:
+                self._remove(dimension, row.get(dimension), 1)
+
+    def _update(self, changes: List[tuple]):
+        self._remove_rows([before for before, _ in changes])
+        self._insert([after for _, after in changes])
+
+    def _delete(self, rows: List[dict]):
+        self._remove_rows(rows)
+
+    def _expire(self, before: datetime, groups: List[dict]):
+        for group in groups:
+            for dimension in DIMENSIONS:
+                self._remove(dimension, group[dimension], group["record_count"])
+        cutoff = rollups.as_utc(before)
+        for entries in self.entries.values():
+            for entry in entries.values():
+                if entry.first_seen is not None and entry.first_seen < cutoff:
+                    entry.first_seen = cutoff
+
+    async def seed(self, session, max_id: int):
+        """One GROUP BY per dimension."""
+        table = models.AnalyticsData
+        for dimension, entries in self.entries.items():
+            result = await session.execute(grouped_catalog(dimension, table.id <= max_id))
+            for name, count, first_seen, last_seen in result.all():
+                entries[name] = Entry(count, rollups.as_utc(first_seen), rollups.as_utc(last_seen))
+
+    async def load(self):
+        max_id = await super().load()
+        logger.info(f"Catalog seeded from {max_id} rows")
+
+    def snapshot(self) -> dict:
+        return {
+            field: [
+                {"name": name, "count": entry.count, "first_seen": entry.first_seen, "last_seen": entry.last_seen}
+                for name, entry in sorted(self.entries[dimension].items())
+            ]
+            for dimension, field in (("category", "categories"), ("metric_name", "metric_names"))
+        }
+
+
+async def sql_catalog(db) -> dict:
+    """The same payload from a GROUP BY per dimension, used until the catalog is seeded."""
+    payload = {}
+    for dimension, field in (("category", "categories"), ("metric_name", "metric_names")):
+        result = await db.execute(grouped_catalog(dimension))
+        payload[field] = [
+            {"name": name, "count": count, "first_seen": rollups.as_utc(first_seen), "last_seen": rollups.as_utc(last_seen)}
+            for name, count, first_seen, last_seen in result.all()
+        ]
+    return payload
+
+
+catalog: Optional[Catalog] = None
+
+
+async def start():
+    """Subscribe the catalog to analytics writes and seed it in the background."""
+    global catalog
+    if not CATALOG_ENABLED:
+        return
+    catalog = Catalog()
+    catalog.register()
+    await catalog.load()
@@ -0,0 +1,217 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import select
+import logging
+import os
+from dotenv import load_dotenv
+import models, rollups, write_hooks
+
+try:
+    import numpy as np
+except ImportError:  # the columnar engine is optional
+    np = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_ENABLED = os.getenv("COLUMNAR_ENABLED", "false").lower() == "true"
+LOAD_BATCH_SIZE = 50000
+
+
+def to_epoch_us(value: datetime) -> int:
+    delta = rollups.as_utc(value) - rollups.EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+class Dictionary:
+    """Maps strings to dense integer codes and back."""
+
+    def __init__(self):
+        self.codes: Dict[Optional[str], int] = {}
+        self.values: List[Optional[str]] = []
+
+    def encode(self, value: Optional[str]) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class ColumnarStore(write_hooks.SeededStore):
+    """
+    In-memory column snapshot of analytics_data.
+
+    metric_name and category are dictionary encoded to int32 codes; value,
+    id and recorded_at (epoch microseconds) are int64. Columns grow by
+    doubling, deletes clear a validity bit, so every write is O(1) amortised
+    and every query is a handful of vectorised passes.
+    """
+
+    COLUMNS = ("ids", "metrics", "categories", "values", "timestamps")
+    # Expiring twice masks the same rows
+    replay_expire = True
+
+    def __init__(self, capacity: int = 1024):
+        super().__init__()
+        self.metric_dict = Dictionary()
+        self.category_dict = Dictionary()
+        self.size = 0
+        # While rows arrive in recorded_at order, time filters can binary-search
+        self.time_sorted = True
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        fresh = {
+            "ids": np.full(capacity, -1, dtype=np.int64),
+            "metrics": np.zeros(capacity, dtype=np.int32),
+            "categories": np.zeros(capacity, dtype=np.int32),
+            "values": np.zeros(capacity, dtype=np.int64),
+            "timestamps": np.zeros(capacity, dtype=np.int64),
+            "valid": np.zeros(capacity, dtype=bool),
+        }
+        for name, column in fresh.items():
+            old = getattr(self, name, None)
+            if old is not None:
+                column[:self.size] = old[:self.size]
+            setattr(self, name, column)
+
+    # ----------------------------------------
+    # Writes
+    # ----------------------------------------
+    def _insert(self, rows: List[dict]):
+        rows = [r for r in rows if r.get("value") is not None and r.get("recorded_at") is not None]
+        if not rows:
+            return
+        needed = self.size + len(rows)
+        if needed > len(self.ids):
+            self._allocate(max(needed, len(self.ids) * 2))
+
+        end = self.size + len(rows)
+        timestamps = [to_epoch_us(r["recorded_at"]) for r in rows]
+        previous = self.timestamps[self.size - 1] if self.size else timestamps[0]
+        if self.time_sorted and (timestamps[0] < previous or any(b < a for a, b in zip(timestamps, timestamps[1:]))):
+            self.time_sorted = False
+
+        self.ids[self.size:end] = [r.get("id") or -1 for r in rows]
+        self.metrics[self.size:end] = [self.metric_dict.encode(r["metric_name"]) for r in rows]
+        self.categories[self.size:end] = [self.category_dict.encode(r["category"]) for r in rows]
+        self.values[self.size:end] = [r["value"] for r in rows]
+        self.timestamps[self.size:end] = timestamps
+        self.valid[self.size:end] = True
+        self.size = end
+
+    def _positions(self, row_ids: List[int]) -> np.ndarray:
+        """Positions of the given ids: one vectorized pass for the whole batch."""
+        return np.flatnonzero(np.isin(self.ids[:self.size], np.asarray(row_ids, dtype=self.ids.dtype)))
+
+    def _update(self, changes: List[tuple]):
+        by_id = {after["id"]: after for _, after in changes}
+        for position in self._positions(list(by_id)):
+            after = by_id[int(self.ids[position])]
+            self.metrics[position] = self.metric_dict.encode(after["metric_name"])
+            self.categories[position] = self.category_dict.encode(after["category"])
+            self.values[position] = after["value"]
+
+    def _delete(self, rows: List[dict]):
+        self.valid[self._positions([row["id"] for row in rows])] = False
+
+    def _expire(self, before: datetime, groups: List[dict]):
+        self.valid[:self.size] &= self.timestamps[:self.size] >= to_epoch_us(before)
+
+    async def seed(self, session, max_id: int):
+        """Stream the rows into the columns in id order."""
+        table = models.AnalyticsData
+        stmt = select(
+            table.id, table.metric_name, table.category, table.value, table.recorded_at
+        ).where(table.id <= max_id).order_by(table.id).execution_options(yield_per=LOAD_BATCH_SIZE)
+
+        result = await session.stream(stmt)
+        async for partition in result.partitions():
+            self._insert([r._asdict() for r in partition])
+
+    async def load(self):
+        await super().load()
+        logger.info(f"Columnar snapshot ready: {self.size} rows")
+
+    # ----------------------------------------
+    # Queries
+    # ----------------------------------------
+    def _select(self, category: Optional[str], start: Optional[datetime], end: Optional[datetime]):
+        """Return (lo, hi, mask) where mask selects matching rows within [lo, hi)."""
+        lo, hi = 0, self.size
+        if self.time_sorted:
+            if start:
+                lo = int(np.searchsorted(self.timestamps[:self.size], to_epoch_us(start), side="left"))
+            if end:
+                hi = int(np.searchsorted(self.timestamps[:self.size], to_epoch_us(end), side="left"))
+            hi = max(lo, hi)
+
+        mask = self.valid[lo:hi].copy()
+        if category:
+            code = self.category_dict.codes.get(category)
+            if code is None:
+                return lo, hi, None
+            mask &= self.categories[lo:hi] == code
+        if not self.time_sorted:
+            if start:
+                mask &= self.timestamps[lo:hi] >= to_epoch_us(start)
+            if end:
+                mask &= self.timestamps[lo:hi] < to_epoch_us(end)
+        return lo, hi, mask
+
+    def group_by(self, column: str, lo: int, hi: int, mask) -> Dict[str, "np.ndarray"]:
+        """Per-code count, sum and max of value for the selected rows."""
+        codes = getattr(self, column)[lo:hi][mask]
+        values = self.values[lo:hi][mask]
+        width = len(self.category_dict.values if column == "categories" else self.metric_dict.values)
+
+        counts = np.bincount(codes, minlength=width)
+        sums = np.bincount(codes, weights=values, minlength=width)
+        maxima = np.full(width, np.iinfo(np.int64).min, dtype=np.int64)
+        np.maximum.at(maxima, codes, values)
+        return {"count": counts, "sum": sums, "max": maxima}
+
+    def summary(self, category=None, start=None, end=None, top: int = 5) -> dict:
+        lo, hi, mask = self._select(category, start, end)
+        if mask is None or not mask.any():
+            return {"total_records": 0, "unique_categories": 0, "avg_value": 0, "max_value": None, "top_categories": []}
+
+        groups = self.group_by("categories", lo, hi, mask)
+        present = np.flatnonzero(groups["count"])
+        total_records = int(groups["count"].sum())
+        order = present[np.argsort(-groups["count"][present], kind="stable")][:top]
+
+        return {
+            "total_records": total_records,
+            "unique_categories": int(len(present)),
+            "avg_value": float(groups["sum"].sum()) / total_records,
+            "max_value": int(groups["max"][present].max()),
+            "top_categories": [
+                {
+                    "category": self.category_dict.values[code],
+                    "count": int(groups["count"][code]),
+                    "avg_value": float(groups["sum"][code]) / int(groups["count"][code]),
+                    "max_value": int(groups["max"][code])
+                }
+                for code in order
+            ]
+        }
+
+
+store: Optional[ColumnarStore] = None
+
+
+async def start():
+    """Load the snapshot and subscribe it to every analytics write path."""
+    global store
+    if not COLUMNAR_ENABLED:
+        return
+    if np is None:
+        logger.warning("COLUMNAR_ENABLED is set but numpy is not installed; using SQL")
+        return
+
+    store = ColumnarStore()
+    store.register()
+    await store.load()
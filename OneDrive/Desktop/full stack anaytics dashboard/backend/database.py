@@ -1,6 +1,10 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncConnection, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql import Insert, Update, Delete
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Table, event, func, inspect, select, text
+from typing import Optional, Union
+import hashlib
 import os
 from dotenv import load_dotenv
 
@@ -9,19 +13,193 @@ load_dotenv()
 # Use SQLite by default for simplicity, but allow override via environment variable
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./analytics.db")
 
-engine = create_async_engine(DATABASE_URL, echo=True)
-AsyncSessionLocal = async_sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+# "default" keeps the development setup; "sqlite-production" tunes SQLite
+# for concurrent traffic (see configure_sqlite_production)
+DB_PROFILE = os.getenv("DB_PROFILE", "default")
+DB_ECHO = os.getenv("DB_ECHO", "true" if DB_PROFILE == "default" else "false").lower() == "true"
+
+# "auto" creates missing tables at startup once per schema version;
+# "skip" trusts a launcher (serve.py) to have done it before the workers
+SCHEMA_INIT = os.getenv("SCHEMA_INIT", "auto")
+
+SQLITE_READER_POOL_SIZE = int(os.getenv("SQLITE_READER_POOL_SIZE", 4))
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64000)),  # negative = KiB
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+}
+
+
+def _set_pragmas(pragmas: dict):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    return on_connect
+
+
+class RoutingSession(Session):
+    """
+    Send flushes and INSERT/UPDATE/DELETE to the writer, other statements
+    to a reader. Once a transaction has written, the rest of it stays on
+    the writer so it reads its own uncommitted rows.
+    """
+
+    writer = None
+    reader = None
+    _wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._wrote or self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            self._wrote = True
+            return self.writer.sync_engine
+        return self.reader.sync_engine
+
+
+@event.listens_for(RoutingSession, "after_commit")
+@event.listens_for(RoutingSession, "after_rollback")
+def _unpin_writer(session):
+    session._wrote = False
+
+
+def configure_sqlite_production(url: str, echo: bool = False):
+    """
+    WAL-mode SQLite with one pooled writer connection and a pool of
+    query_only readers. WAL lets readers proceed while a write is in
+    flight; funnelling writes through a single connection queues them in
+    the pool instead of spinning on SQLITE_BUSY.
+    """
+    write_engine = create_async_engine(
+        url, echo=echo, poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0
+    )
+    read_engine = create_async_engine(
+        url, echo=echo, poolclass=AsyncAdaptedQueuePool,
+        pool_size=SQLITE_READER_POOL_SIZE, max_overflow=0
+    )
+    event.listen(write_engine.sync_engine, "connect", _set_pragmas(SQLITE_PRAGMAS))
+    event.listen(read_engine.sync_engine, "connect", _set_pragmas({**SQLITE_PRAGMAS, "query_only": "ON"}))
+
+    session_class = type("SQLiteRoutingSession", (RoutingSession,), {
+        "writer": write_engine,
+        "reader": read_engine,
+    })
+    sessionmaker = async_sessionmaker(
+        class_=AsyncSession, sync_session_class=session_class, expire_on_commit=False
+    )
+    return write_engine, read_engine, sessionmaker
+
+
+def configure(url: str, profile: str = "default", echo: bool = True):
+    """Build (write_engine, read_engine, sessionmaker) for a profile."""
+    if profile == "sqlite-production":
+        if not url.startswith("sqlite"):
+            raise ValueError("DB_PROFILE=sqlite-production requires a SQLite DATABASE_URL")
+        return configure_sqlite_production(url, echo=echo)
+
+    engine = create_async_engine(url, echo=echo)
+    sessionmaker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    return engine, engine, sessionmaker
+
+
+engine, read_engine, AsyncSessionLocal = configure(DATABASE_URL, DB_PROFILE, DB_ECHO)
 
 class Base(DeclarativeBase):
     pass
 
+# One row: the fingerprint of the models the schema was last created from
+schema_version = Table(
+    "schema_version", Base.metadata,
+    Column("version", String(64), primary_key=True),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now())
+)
+
+
+def schema_fingerprint() -> str:
+    """Hash of every table, column and index in the models; changes with them."""
+    parts = []
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        columns = ",".join(f"{c.name}:{c.type!r}" for c in table.columns)
+        indexes = ",".join(sorted(str(i.name) for i in table.indexes))
+        parts.append(f"{table.name}({columns})[{indexes}]")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+async def exclusive(db: Union[AsyncConnection, AsyncSession], name: str):
+    """
+    Hold a lock shared by every process on this database until the
+    transaction of `db` ends: a transaction-scoped advisory lock on
+    PostgreSQL, the database write lock (BEGIN IMMEDIATE) on SQLite.
+
+    Must be the first statement of the transaction, since SQLite cannot
+    upgrade a transaction that has already read.
+    """
+    if isinstance(db, AsyncSession):
+        # The writer, when reads and writes go to different engines
+        db = await db.connection(bind_arguments={"clause": schema_version.insert()})
+    if db.dialect.name == "postgresql":
+        await db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": name})
+    elif db.dialect.name == "sqlite":
+        await db.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+async def read_snapshot(db: AsyncSession):
+    """
+    Make every following read in the transaction of `db` see the same
+    committed state: REPEATABLE READ on PostgreSQL, a deferred BEGIN on
+    SQLite, whose first read fixes the snapshot (in WAL mode).
+
+    Must be called before anything else runs in the transaction.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    elif db.get_bind().dialect.name == "sqlite":
+        conn = await db.connection()
+        await conn.exec_driver_sql("BEGIN")
+
+
+async def _recorded_version(conn: AsyncConnection) -> Optional[str]:
+    # No schema_version table yet: a new or pre-versioning database
+    if not await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table(schema_version.name)):
+        return None
+    return (await conn.execute(select(schema_version.c.version))).scalar()
+
+
+def _create_missing_indexes(sync_conn):
+    # create_all skips indexes added to a model whose table already exists
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
 async def init_db():
+    """
+    Create missing tables and indexes, once per schema version.
+
+    Safe to run from every worker at once. When the recorded version
+    matches the models, startup costs one SELECT and create_all never
+    inspects the tables. Otherwise the first worker creates the schema
+    under `exclusive`; the others wait on the lock, then find the new
+    version recorded and return.
+    """
+    if SCHEMA_INIT == "skip":
+        return
+    version = schema_fingerprint()
+    async with engine.connect() as conn:
+        if await _recorded_version(conn) == version:
+            return
+
     async with engine.begin() as conn:
+        await exclusive(conn, "schema")
+        if await _recorded_version(conn) == version:
+            return
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_missing_indexes)
+        await conn.execute(schema_version.delete())
+        await conn.execute(schema_version.insert().values(version=version))
 
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
-
@@ -1,6 +1,7 @@
 
 import sqlite3
 import os
+import invalidation
 
 def demote_other_admins():
     try:
@@ -11,6 +12,8 @@ def demote_other_admins():
         
         # Demote all admins except the target one
         cursor.execute("UPDATE users SET role = 'USER' WHERE role = 'ADMIN' AND email != ?", (target_email,))
+        # Running servers drop their cached users when this commits
+        invalidation.publish_sqlite(conn, "user")
         
         conn.commit()
         print(f"Demoted {cursor.rowcount} other admins to USER role.")
@@ -3,7 +3,7 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-import schemas, models, auth, database
+import schemas, models, auth, database, user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -25,12 +25,20 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
+    user = user_cache.users.get(token_data.email)
+    if user is not None:
+        return user
+
     # SQLAlchemy query to find user
     result = await db.execute(select(models.User).where(models.User.email == token_data.email))
     user = result.scalars().first()
     
     if user is None:
         raise credentials_exception
+
+    # Detach so the cached copy never rides along in another request's session
+    db.expunge(user)
+    user_cache.users.set(token_data.email, user)
     return user
 
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
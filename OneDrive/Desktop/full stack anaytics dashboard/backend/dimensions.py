@@ -0,0 +1,151 @@
+from typing import Dict, Iterable, List, Mapping, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+import threading
+import models
+
+# Name lists per IN (...) / VALUES statement
+LOOKUP_CHUNK = 500
+
+
+class Interner:
+    """
+    In-process name <-> id cache for one dimension table.
+
+    Only committed ids go in the shared cache. Ids a transaction inserts
+    itself are kept in its session's info until it ends: the session's
+    own lookups use them (another connection, such as a reader, cannot
+    see the uncommitted row yet), a commit moves them into the cache and
+    a rollback drops them.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.ids: Dict[str, int] = {}
+        self.names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, pairs: Iterable[tuple]):
+        with self._lock:
+            for id_, name in pairs:
+                self.ids[name] = id_
+                self.names[id_] = name
+
+    def _fresh(self, db: AsyncSession) -> Dict[str, int]:
+        """Names this session's transaction inserted, with their ids."""
+        return db.info.setdefault(FRESH_KEY, {}).setdefault(self.model.__tablename__, {})
+
+    def clear(self):
+        with self._lock:
+            self.ids.clear()
+            self.names.clear()
+
+    async def _select(self, db: AsyncSession, column, values: List) -> List[tuple]:
+        found = []
+        for offset in range(0, len(values), LOOKUP_CHUNK):
+            result = await db.execute(
+                select(self.model.id, self.model.name).where(column.in_(values[offset:offset + LOOKUP_CHUNK]))
+            )
+            found.extend(result.all())
+        return found
+
+    async def ids_for(self, db: AsyncSession, names: Iterable[Optional[str]]) -> Dict[str, int]:
+        """Resolve names to ids, creating dimension rows that do not exist yet."""
+        wanted = {name for name in names if name is not None}
+        fresh = self._fresh(db)
+        resolved = {name: self.ids[name] for name in wanted if name in self.ids}
+        resolved.update({name: fresh[name] for name in wanted - resolved.keys() if name in fresh})
+        missing = sorted(wanted - resolved.keys())
+        if not missing:
+            return resolved
+
+        found = await self._select(db, self.model.name, missing)
+        self._remember(found)
+        resolved.update({name: id_ for id_, name in found})
+
+        missing = [name for name in missing if name not in resolved]
+        if missing:
+            dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+            for offset in range(0, len(missing), LOOKUP_CHUNK):
+                chunk = missing[offset:offset + LOOKUP_CHUNK]
+                result = await db.execute(
+                    dialect.insert(self.model)
+                    .values([{"name": name} for name in chunk])
+                    .on_conflict_do_nothing(index_elements=["name"])
+                    .returning(self.model.id, self.model.name)
+                )
+                inserted = {name: id_ for id_, name in result.all()}
+                fresh.update(inserted)
+                resolved.update(inserted)
+
+            # Lost a race with another writer: its row is committed by now
+            raced = [name for name in missing if name not in resolved]
+            if raced:
+                found = await self._select(db, self.model.name, raced)
+                self._remember(found)
+                resolved.update({name: id_ for id_, name in found})
+        return resolved
+
+    async def id_for(self, db: AsyncSession, name: Optional[str]) -> Optional[int]:
+        if name is None:
+            return None
+        return (await self.ids_for(db, [name]))[name]
+
+    async def names_for(self, db: AsyncSession, ids: Iterable[Optional[int]]) -> Dict[int, str]:
+        wanted = {id_ for id_ in ids if id_ is not None}
+        resolved = {id_: self.names[id_] for id_ in wanted if id_ in self.names}
+        resolved.update({id_: name for name, id_ in self._fresh(db).items() if id_ in wanted})
+        missing = sorted(wanted - resolved.keys())
+        if missing:
+            found = await self._select(db, self.model.id, missing)
+            self._remember(found)
+            resolved.update(dict(found))
+        return resolved
+
+
+metrics = Interner(models.Metric)
+categories = Interner(models.Category)
+
+# Session.info key for the ids each session's transaction inserted
+FRESH_KEY = "dimension_ids"
+INTERNERS = {interner.model.__tablename__: interner for interner in (metrics, categories)}
+
+
+@event.listens_for(Session, "after_commit")
+def _promote_fresh(session):
+    for table, fresh in session.info.pop(FRESH_KEY, {}).items():
+        INTERNERS[table]._remember((id_, name) for name, id_ in fresh.items())
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_fresh(session):
+    session.info.pop(FRESH_KEY, None)
+
+
+async def encode(db: AsyncSession, rows: List[dict]):
+    """Add metric_id/category_id to row dicts that carry metric_name/category."""
+    metric_ids = await metrics.ids_for(db, (row["metric_name"] for row in rows))
+    category_ids = await categories.ids_for(db, (row["category"] for row in rows))
+    for row in rows:
+        row["metric_id"] = metric_ids.get(row["metric_name"])
+        row["category_id"] = category_ids.get(row["category"])
+
+
+
+async def decode(db: AsyncSession, rows: Iterable[Mapping]) -> List[dict]:
+    """write_hooks row dicts for rows read with metric_id/category_id."""
+    rows = list(rows)
+    metric_names = await metrics.names_for(db, (row["metric_id"] for row in rows))
+    category_names = await categories.names_for(db, (row["category_id"] for row in rows))
+    return [
+        {
+            "id": row["id"],
+            "metric_name": metric_names.get(row["metric_id"]),
+            "value": row["value"],
+            "category": category_names.get(row["category_id"]),
+            "recorded_at": row["recorded_at"]
+        }
+        for row in rows
+    ]
@@ -0,0 +1,60 @@
+from fastapi import Request, Response
+import hashlib
+import itertools
+import uuid
+import invalidation
+
+# A fresh prefix per process start means tags issued before a restart never
+# match the reset counter by accident.
+_boot_id = uuid.uuid4().hex[:8]
+_counter = itertools.count(1)
+_version = f"{_boot_id}.0"
+
+
+def bump():
+    """Record a write to analytics_data; every outstanding ETag goes stale."""
+    global _version
+    _version = f"{_boot_id}.{next(_counter)}"
+    invalidation.publish("etags")
+
+
+def _on_invalidation(key, event_id: int):
+    # A write on any worker: adopt the channel's event id as the version.
+    # Once this worker's own bumps are written out, all workers issue the
+    # same tags and a client can revalidate against any of them.
+    global _version
+    if not invalidation.pending("etags"):
+        _version = f"shared.{event_id}"
+
+
+invalidation.subscribe("etags", _on_invalidation)
+
+
+def current() -> str:
+    return _version
+
+
+def for_request(request: Request, *parts) -> str:
+    """Weak ETag from the table version, the path and its query parameters."""
+    key = "|".join([current(), request.url.path, *map(str, parts)] + [
+        f"{k}={v}" for k, v in sorted(request.query_params.multi_items())
+    ])
+    return 'W/"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+
+
+def not_modified(request: Request, etag: str):
+    """Return a 304 response if the client already holds `etag`, else None."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    candidates = [tag.strip() for tag in header.split(",")]
+    # Weak comparison: W/"x" and "x" are equivalent for GET revalidation
+    bare = etag[2:] if etag.startswith("W/") else etag
+    if "*" in candidates or any(tag in (etag, bare) or tag[2:] == bare for tag in candidates):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    return None
+
+
+def tag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
@@ -0,0 +1,130 @@
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+from sqlalchemy import select
+import csv
+import io
+import json
+import models, database, analytics_query
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+COLUMNS = ["id", "metric_name", "value", "category", "recorded_at"]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+
+
+def export_statement(
+    categories: Optional[List[str]] = None,
+    metric_names: Optional[List[str]] = None,
+    min_value: Optional[int] = None,
+    max_value: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    sort: str = "recorded_at",
+    limit: Optional[int] = None
+):
+    """The rows GET /analytics/data pages through for the same filters and sort."""
+    stmt = (
+        select(*(getattr(models.AnalyticsData, c) for c in COLUMNS))
+        .where(*analytics_query.criteria(categories, metric_names, min_value, max_value, start, end))
+        .order_by(*analytics_query.order_by(sort))
+    )
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+async def _partitions(stmt) -> AsyncIterator[List[tuple]]:
+    # The request's session is already closed once a StreamingResponse
+    # starts iterating, so the export owns its own session.
+    async with database.AsyncSessionLocal() as session:
+        result = await session.stream(stmt)
+        async for partition in result.partitions():
+            yield partition
+
+
+async def stream_csv(stmt) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    yield buffer.getvalue()
+
+    async for rows in _partitions(stmt):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            (r.id, r.metric_name, r.value, r.category, r.recorded_at.isoformat() if r.recorded_at else "")
+            for r in rows
+        )
+        yield buffer.getvalue()
+
+
+async def stream_ndjson(stmt) -> AsyncIterator[str]:
+    async for rows in _partitions(stmt):
+        yield "".join(
+            json.dumps({
+                "id": r.id,
+                "metric_name": r.metric_name,
+                "value": r.value,
+                "category": r.category,
+                "recorded_at": r.recorded_at.isoformat() if r.recorded_at else None
+            }) + "\n"
+            for r in rows
+        )
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose contents are handed out as they arrive."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_parquet(stmt) -> AsyncIterator[bytes]:
+    schema = pyarrow.schema([
+        ("id", pyarrow.int64()),
+        ("metric_name", pyarrow.string()),
+        ("value", pyarrow.int64()),
+        ("category", pyarrow.string()),
+        ("recorded_at", pyarrow.timestamp("us", tz="UTC")),
+    ])
+    sink = _DrainableSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+
+    # Each partition becomes one row group, so memory is bounded by the batch
+    async for rows in _partitions(stmt):
+        writer.write_table(pyarrow.Table.from_pylist([r._asdict() for r in rows], schema=schema))
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+STREAMERS = {
+    "csv": stream_csv,
+    "ndjson": stream_ndjson,
+    "parquet": stream_parquet,
+}
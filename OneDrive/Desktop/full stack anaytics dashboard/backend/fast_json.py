@@ -0,0 +1,53 @@
+from datetime import datetime
+from typing import List
+from fastapi import Response
+import enum
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder gives the same bytes, slower
+    orjson = None
+
+# Headers the rendered body sets itself; everything else on the route's
+# injected Response (cursor, ETag, Cache-Control) is carried over
+_BODY_HEADERS = (b"content-length", b"content-type")
+
+
+def _isoformat(value: datetime) -> str:
+    # Pydantic writes UTC as "Z"; match it so both paths emit the same bytes
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return _isoformat(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(rows: List[dict]) -> bytes:
+    """
+    Serialize plain row dicts the way FastAPI renders a response_model:
+    compact separators, UTF-8 text unescaped, datetimes as Pydantic does.
+    """
+    if orjson is not None:
+        return orjson.dumps(rows, option=orjson.OPT_UTC_Z)
+    return json.dumps(rows, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def response(rows: List[dict], headers_from: Response) -> Response:
+    """
+    JSON response for rows already shaped like the route's response_model.
+
+    Returning a Response skips FastAPI's per-row validation and encoding;
+    the response_model still documents the endpoint. Keys must be in the
+    model's field order (see test_schema_conformance.py).
+    """
+    rendered = Response(content=dumps(rows), media_type="application/json")
+    rendered.raw_headers.extend(
+        (key, value) for key, value in headers_from.raw_headers if key not in _BODY_HEADERS
+    )
+    return rendered
@@ -1,6 +1,7 @@
 
 import sqlite3
 import os
+import invalidation
 
 def fix_roles():
     try:
@@ -9,6 +10,8 @@ def fix_roles():
         
         # Convert all roles to lowercase
         cursor.execute("UPDATE users SET role = LOWER(role)")
+        # Running servers drop their cached users when this commits
+        invalidation.publish_sqlite(conn, "user")
         conn.commit()
         
         print(f"Updated {cursor.rowcount} rows. Roles normalized to lowercase.")
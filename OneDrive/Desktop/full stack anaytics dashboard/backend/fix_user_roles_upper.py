@@ -1,6 +1,7 @@
 
 import sqlite3
 import os
+import invalidation
 
 def fix_roles_upper():
     try:
@@ -12,6 +13,8 @@ def fix_roles_upper():
         cursor.execute("UPDATE users SET role = 'USER' WHERE role = 'user'")
         cursor.execute("UPDATE users SET role = 'EDITOR' WHERE role = 'editor'")
         cursor.execute("UPDATE users SET role = 'VIEWER' WHERE role = 'viewer'")
+        # Running servers drop their cached users when this commits
+        invalidation.publish_sqlite(conn, "user")
         
         conn.commit()
         
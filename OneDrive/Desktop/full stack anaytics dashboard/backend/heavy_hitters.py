@@ -0,0 +1,192 @@
+from typing import Dict, List, Optional
+from sqlalchemy import select, func
+import heapq
+import logging
+import os
+from dotenv import load_dotenv
+import models, write_hooks
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+HEAVY_HITTERS_ENABLED = os.getenv("HEAVY_HITTERS_ENABLED", "true").lower() == "true"
+HEAVY_HITTERS_CAPACITY = int(os.getenv("HEAVY_HITTERS_CAPACITY", 1000))
+
+DIMENSIONS = ("category", "metric_name")
+
+
+def grouped_counts(dimension: str, *criteria):
+    """Rows per name: group analytics_data on the integer key, then join the names."""
+    table = models.AnalyticsData
+    key_column, lookup = getattr(table, dimension).property.info["dimension"]
+    counts = (
+        select(key_column.label("key"), func.count(table.id).label("count"))
+        .where(key_column.is_not(None), *criteria)
+        .group_by(key_column)
+        .subquery()
+    )
+    return select(lookup.name, counts.c.count).join(counts, counts.c.key == lookup.id), counts.c.count
+
+
+class SpaceSaving:
+    """
+    Space-Saving top-K counter over at most `capacity` keys.
+
+    A new key arriving when the table is full takes over the slot of the
+    current minimum and inherits its count as `error`, so every reported
+    count overestimates the true one by at most `error` (and at most
+    total / capacity). The minimum is found through a lazily-invalidated
+    heap, keeping each update O(log capacity).
+    """
+
+    def __init__(self, capacity: int = HEAVY_HITTERS_CAPACITY):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.total = 0
+        self._heap: List[tuple] = []
+
+    def _push(self, key: str):
+        heapq.heappush(self._heap, (self.counts[key], key))
+        if len(self._heap) > 4 * self.capacity:
+            # Too many stale entries; rebuild from the live counts
+            self._heap = [(count, k) for k, count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> str:
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                return key
+
+    def add(self, key: str, weight: int = 1):
+        self.total += weight
+        if key in self.counts:
+            self.counts[key] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = weight
+            self.errors[key] = 0
+        else:
+            evicted = self._pop_min()
+            floor = self.counts.pop(evicted)
+            del self.errors[evicted]
+            self.counts[key] = floor + weight
+            self.errors[key] = floor
+        self._push(key)
+
+    def remove(self, key: str, weight: int = 1):
+        """Undo an earlier add; untracked keys only lower the total."""
+        self.total = max(0, self.total - weight)
+        if key in self.counts:
+            self.counts[key] = max(self.errors[key], self.counts[key] - weight)
+            if self.counts[key] == 0:
+                # Frees the slot; its stale heap entries are skipped later
+                del self.counts[key], self.errors[key]
+            else:
+                self._push(key)
+
+    def top(self, k: int) -> List[dict]:
+        leaders = heapq.nlargest(k + 1, self.counts.items(), key=lambda item: item[1])
+        # Beyond the (k+1)th count nothing can outrank a leader whose
+        # lower bound (count - error) is still above it
+        runner_up = leaders[k][1] if len(leaders) > k else 0
+        return [
+            {
+                "name": key,
+                "count": count,
+                "error": self.errors[key],
+                "guaranteed": count - self.errors[key] >= runner_up
+            }
+            for key, count in leaders[:k]
+        ]
+
+
+class HeavyHitters(write_hooks.SeededStore):
+    """One Space-Saving counter per dimension, fed by the write hooks."""
+
+    def __init__(self, capacity: int = HEAVY_HITTERS_CAPACITY):
+        super().__init__()
+        self.capacity = capacity
+        self.counters = {dimension: SpaceSaving(capacity) for dimension in DIMENSIONS}
+
+    def _apply(self, rows: List[dict], weight: int):
+        for row in rows:
+            for dimension, counter in self.counters.items():
+                key = row.get(dimension)
+                if key is None:
+                    continue
+                if weight > 0:
+                    counter.add(key, weight)
+                else:
+                    counter.remove(key, -weight)
+
+    def _insert(self, rows: List[dict]):
+        self._apply(rows, 1)
+
+    def _update(self, changes: List[tuple]):
+        self._apply([before for before, _ in changes], -1)
+        self._apply([after for _, after in changes], 1)
+
+    def _delete(self, rows: List[dict]):
+        self._apply(rows, -1)
+
+    def _expire(self, before, groups: List[dict]):
+        for group in groups:
+            self.counters["metric_name"].remove(group["metric_name"], group["record_count"])
+            self.counters["category"].remove(group["category"], group["record_count"])
+
+    async def seed(self, session, max_id: int):
+        """Exact counts from one GROUP BY per dimension."""
+        table = models.AnalyticsData
+        for dimension, counter in self.counters.items():
+            stmt, _ = grouped_counts(dimension, table.id <= max_id)
+            result = await session.execute(stmt)
+            for key, count in sorted(result.all(), key=lambda row: row[1], reverse=True):
+                # Keys beyond capacity only count towards the total
+                counter.total += count
+                if len(counter.counts) < counter.capacity:
+                    counter.counts[key] = count
+                    counter.errors[key] = 0
+            counter._heap = [(count, key) for key, count in counter.counts.items()]
+            heapq.heapify(counter._heap)
+
+    async def load(self):
+        max_id = await super().load()
+        logger.info(f"Heavy hitters seeded from {max_id} rows")
+
+    def top(self, k: int) -> dict:
+        return {
+            "total": self.counters["category"].total,
+            "capacity": self.capacity,
+            "categories": self.counters["category"].top(k),
+            "metric_names": self.counters["metric_name"].top(k)
+        }
+
+
+async def sql_top(db, k: int) -> dict:
+    """Exact counts with a GROUP BY per dimension, used until the counters are seeded."""
+    table = models.AnalyticsData
+    payload = {"capacity": 0}
+    for dimension, field in (("category", "categories"), ("metric_name", "metric_names")):
+        stmt, count = grouped_counts(dimension)
+        result = await db.execute(stmt.order_by(count.desc()).limit(k))
+        payload[field] = [
+            {"name": key, "count": count, "error": 0, "guaranteed": True}
+            for key, count in result.all()
+        ]
+    payload["total"] = (await db.execute(select(func.count(table.id)))).scalar() or 0
+    return payload
+
+
+hitters: Optional[HeavyHitters] = None
+
+
+async def start():
+    """Subscribe the counters to analytics writes and seed them in the background."""
+    global hitters
+    if not HEAVY_HITTERS_ENABLED:
+        return
+    hitters = HeavyHitters()
+    hitters.register()
+    await hitters.load()
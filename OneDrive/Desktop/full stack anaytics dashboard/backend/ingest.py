@@ -0,0 +1,232 @@
+from typing import AsyncIterator, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, text
+import asyncio
+import logging
+import os
+import time
+from dotenv import load_dotenv
+import models, rollups, database, etags, write_hooks, dimensions
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Opt-in write-behind mode for POST /analytics/data
+INGEST_BUFFER_ENABLED = os.getenv("INGEST_BUFFER_ENABLED", "false").lower() == "true"
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 10000))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 500))
+INGEST_FLUSH_INTERVAL_MS = int(os.getenv("INGEST_FLUSH_INTERVAL_MS", 200))
+# A failed batch is retried after 1x, 2x, 4x ... the backoff before it is dropped
+INGEST_RETRY_ATTEMPTS = int(os.getenv("INGEST_RETRY_ATTEMPTS", 5))
+INGEST_RETRY_BACKOFF_MS = int(os.getenv("INGEST_RETRY_BACKOFF_MS", 200))
+
+# Largest single NDJSON line we are willing to buffer while waiting for "\n"
+MAX_LINE_BYTES = 1024 * 1024
+
+# Stored analytics_data columns; row dicts also keep the decoded names
+COLUMNS = ("metric_id", "value", "category_id", "recorded_at")
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[Optional[bytes]]:
+    """
+    Split an incoming byte stream into lines without buffering the body.
+
+    A line longer than MAX_LINE_BYTES is yielded as None; its bytes are
+    dropped as they arrive, up to the next newline.
+    """
+    buffer = b""
+    skipping = False
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if skipping:
+                # The end of the overlong line
+                skipping = False
+                yield None
+            else:
+                yield None if len(line) > MAX_LINE_BYTES else line
+        if len(buffer) > MAX_LINE_BYTES:
+            skipping, buffer = True, b""
+    if skipping:
+        yield None
+    elif buffer:
+        yield None if len(buffer) > MAX_LINE_BYTES else buffer
+
+
+async def write_rows(db: AsyncSession, rows: List[dict]):
+    """
+    Insert plain row dicts without building ORM objects.
+
+    Names are interned to metric_id/category_id first, and the new ids are
+    stored back into `rows` on every backend. Postgres (asyncpg) draws the
+    ids from the table's sequence in one query and sends them with the
+    rows in a binary COPY; everything else gets a Core executemany
+    INSERT ... RETURNING. Rollups are folded in on the same transaction.
+    """
+    if not rows:
+        return
+
+    await dimensions.encode(db, rows)
+
+    dialect = db.get_bind().dialect
+    if dialect.name == "postgresql" and dialect.driver == "asyncpg":
+        # COPY returns nothing, so the ids are taken before it
+        ids = (await db.execute(
+            text("SELECT nextval(pg_get_serial_sequence('analytics_data', 'id')) FROM generate_series(1, :count)"),
+            {"count": len(rows)}
+        )).scalars().all()
+        for row, new_id in zip(rows, sorted(ids)):
+            row["id"] = new_id
+
+        conn = await db.connection()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            models.AnalyticsData.__tablename__,
+            records=[(row["id"], *(row[c] for c in COLUMNS)) for row in rows],
+            columns=["id", *COLUMNS]
+        )
+    else:
+        table = models.AnalyticsData.__table__
+        result = await db.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            [{c: row[c] for c in COLUMNS} for row in rows]
+        )
+        for row, new_id in zip(rows, result.scalars()):
+            row["id"] = new_id
+
+    await rollups.apply(db, rows)
+
+
+class WriteBehindBuffer:
+    """
+    Bounded in-process queue of analytics rows flushed in batches.
+
+    A background task writes a batch once `batch_size` rows are waiting or
+    `flush_interval` seconds have passed since the first one arrived,
+    whichever comes first. enqueue() never waits: a full queue is reported
+    to the caller so the API can push back.
+
+    The rows were already acknowledged with 202, so a batch whose write
+    fails is held and retried with exponential backoff while new rows
+    keep queueing behind it. It is dropped, and logged as lost, only once
+    `retry_attempts` writes have failed.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        batch_size: int,
+        flush_interval: float,
+        retry_attempts: int = INGEST_RETRY_ATTEMPTS,
+        retry_backoff: float = INGEST_RETRY_BACKOFF_MS / 1000
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_attempts = max(1, retry_attempts)
+        self.retry_backoff = retry_backoff
+        self.queue = asyncio.Queue(maxsize=max_size)
+        self.task: Optional[asyncio.Task] = None
+        self.inflight: Optional[asyncio.Future] = None
+        self.stats = {"enqueued": 0, "rejected": 0, "flushed": 0, "retries": 0, "failed": 0, "batches": 0}
+
+    def enqueue(self, row: dict) -> bool:
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            return False
+        self.stats["enqueued"] += 1
+        return True
+
+    async def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write whatever is still queued."""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.inflight is not None:
+            await self.inflight
+
+        while not self.queue.empty():
+            await self._flush(self._drain(self.batch_size))
+
+    def _drain(self, limit: int) -> List[dict]:
+        batch = []
+        while len(batch) < limit and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = []
+            try:
+                batch.append(await self.queue.get())
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    batch.extend(self._drain(self.batch_size - len(batch)))
+                    remaining = deadline - time.monotonic()
+                    if len(batch) >= self.batch_size or remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Rows already taken off the queue must not be lost on shutdown
+                self.inflight = asyncio.ensure_future(self._flush(batch))
+                raise
+
+            # Shield the write so shutdown cannot cancel a batch half-way;
+            # stop() waits for it through self.inflight
+            self.inflight = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self.inflight)
+            self.inflight = None
+
+    async def _flush(self, batch: List[dict]):
+        if not batch:
+            return
+        for attempt in range(1, self.retry_attempts + 1):
+            try:
+                async with database.AsyncSessionLocal() as session:
+                    await write_rows(session, batch)
+                    await session.commit()
+            except Exception as e:
+                error = e
+            else:
+                etags.bump()
+                write_hooks.after_insert(batch)
+                self.stats["flushed"] += len(batch)
+                self.stats["batches"] += 1
+                return
+
+            if attempt < self.retry_attempts:
+                delay = self.retry_backoff * 2 ** (attempt - 1)
+                self.stats["retries"] += 1
+                logger.warning(
+                    f"Write-behind flush of {len(batch)} rows failed (attempt {attempt}/{self.retry_attempts}), "
+                    f"retrying in {delay:.2f}s: {str(error)}"
+                )
+                await asyncio.sleep(delay)
+
+        self.stats["failed"] += len(batch)
+        logger.critical(
+            f"Write-behind flush gave up after {self.retry_attempts} attempts; "
+            f"{len(batch)} accepted rows were LOST: {str(error)}"
+        )
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "queued": self.queue.qsize(), "capacity": self.queue.maxsize}
+
+
+buffer = WriteBehindBuffer(
+    INGEST_QUEUE_SIZE, INGEST_BATCH_SIZE, INGEST_FLUSH_INTERVAL_MS / 1000
+) if INGEST_BUFFER_ENABLED else None
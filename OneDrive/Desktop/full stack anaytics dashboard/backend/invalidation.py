@@ -0,0 +1,178 @@
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Set
+from sqlalchemy import select, insert, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import logging
+import os
+import sqlite3
+import uuid
+from dotenv import load_dotenv
+import models, database
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Worker count as set by serve.py, uvicorn --workers or gunicorn
+WORKERS = int(os.getenv("WEB_CONCURRENCY", 1))
+# Publishing a worker's own invalidations is only needed with several
+# workers; every worker still polls, for events admin scripts write
+INVALIDATION_ENABLED = os.getenv("INVALIDATION_ENABLED", "true" if WORKERS > 1 else "false").lower() == "true"
+INVALIDATION_POLL_SECONDS = float(os.getenv("INVALIDATION_POLL_SECONDS", 0.5))
+INVALIDATION_RETENTION_SECONDS = float(os.getenv("INVALIDATION_RETENTION_SECONDS", 300))
+
+# Ids are re-read this far back, so an event committed after a higher id
+# was already seen (concurrent Postgres writers) is still picked up. The
+# outbox is coalesced, so each worker has only a few ids in flight.
+LOOKBACK_IDS = int(os.getenv("INVALIDATION_LOOKBACK_IDS", 100))
+PRUNE_EVERY_POLLS = 120
+
+Handler = Callable[[Optional[str], int], None]
+
+# Unique per process; tells a worker's own events apart from the others'
+origin = uuid.uuid4().hex
+
+handlers: Dict[str, List[Handler]] = {}
+_outbox: List[dict] = []
+
+
+def subscribe(kind: str, handler: Handler):
+    """Call `handler(key, event_id)` for every `kind` event, this worker's own included."""
+    handlers.setdefault(kind, []).append(handler)
+
+
+def publish(kind: str, key: Optional[str] = None):
+    """
+    Tell the other workers to drop cached state. The caller has already
+    updated its own; the event is written out by the next poll, once per
+    (kind, key) however many times it was published since the last.
+    """
+    if INVALIDATION_ENABLED:
+        event = {"origin": origin, "kind": kind, "key": key}
+        if event not in _outbox:
+            _outbox.append(event)
+
+
+async def publish_from(db: AsyncSession, kind: str, key: Optional[str] = None):
+    """
+    Queue an event in the caller's transaction, for processes without a
+    channel (admin scripts): it commits with the change it describes and
+    every running worker applies it on its next poll.
+    """
+    await db.execute(insert(models.CacheInvalidation).values(origin="script", kind=kind, key=key))
+
+
+def publish_sqlite(conn: sqlite3.Connection, kind: str, key: Optional[str] = None):
+    """publish_from for scripts that edit the SQLite file through sqlite3."""
+    try:
+        conn.execute(
+            "INSERT INTO cache_invalidations (origin, kind, key) VALUES ('script', ?, ?)", (kind, key)
+        )
+    except sqlite3.OperationalError:
+        # No table yet: no server has run against this database to cache anything
+        pass
+
+
+def pending(kind: str) -> bool:
+    return any(event["kind"] == kind for event in _outbox)
+
+
+class Channel:
+    """
+    Cache invalidation between worker processes, and from admin scripts,
+    through the cache_invalidations table.
+
+    Each poll writes this worker's queued events, then reads every event
+    newer than the last one seen and hands it to the subscribed handlers.
+    Polling a table works the same on SQLite and PostgreSQL and needs no
+    extra service; events older than INVALIDATION_RETENTION_SECONDS are
+    pruned by whichever worker gets there first.
+    """
+
+    def __init__(self, poll_interval: float = INVALIDATION_POLL_SECONDS):
+        self.poll_interval = poll_interval
+        self.last_seen = 0
+        self.seen: Set[int] = set()
+        self.polls = 0
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    async def _flush(self, session):
+        global _outbox
+        events, _outbox = _outbox, []
+        try:
+            await session.execute(insert(models.CacheInvalidation), events)
+            await session.commit()
+        except Exception:
+            _outbox = events + [event for event in _outbox if event not in events]
+            raise
+
+    async def poll(self):
+        table = models.CacheInvalidation
+        async with database.AsyncSessionLocal() as session:
+            if _outbox:
+                await self._flush(session)
+
+            result = await session.execute(
+                select(table.id, table.kind, table.key)
+                .where(table.id > self.last_seen - LOOKBACK_IDS)
+                .order_by(table.id)
+            )
+            for event_id, kind, key in result.all():
+                if event_id in self.seen:
+                    continue
+                self.seen.add(event_id)
+                self.last_seen = max(self.last_seen, event_id)
+                for handler in handlers.get(kind, []):
+                    handler(key, event_id)
+            self.seen = {event_id for event_id in self.seen if event_id > self.last_seen - LOOKBACK_IDS}
+
+            self.polls += 1
+            if self.polls % PRUNE_EVERY_POLLS == 0:
+                cutoff = datetime.now(timezone.utc) - timedelta(seconds=INVALIDATION_RETENTION_SECONDS)
+                await session.execute(delete(table).where(table.created_at < cutoff))
+                await session.commit()
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.error(f"Cache invalidation poll failed: {str(e)}")
+
+    async def start(self):
+        table = models.CacheInvalidation
+        async with database.AsyncSessionLocal() as session:
+            # Caches start empty, so earlier events need no replay
+            self.last_seen = (await session.execute(select(func.max(table.id)))).scalar() or 0
+            self.seen = set((await session.execute(
+                select(table.id).where(table.id > self.last_seen - LOOKBACK_IDS)
+            )).scalars())
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # The final poll writes out anything still queued
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+
+channel: Optional[Channel] = None
+
+
+async def start():
+    global channel
+    channel = Channel()
+    await channel.start()
+    logger.info(f"Cache invalidation channel started (worker {origin[:8]})")
+
+
+async def stop():
+    if channel is not None:
+        await channel.stop()
@@ -0,0 +1,209 @@
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Set
+from fastapi import Request
+from sqlalchemy import select, func
+import asyncio
+import itertools
+import json
+import logging
+import os
+from dotenv import load_dotenv
+import models, write_hooks, metrics, heavy_hitters
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LIVE_ENABLED = os.getenv("LIVE_ENABLED", "true").lower() == "true"
+# Events buffered per client before it counts as too slow and is dropped
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", 100))
+LIVE_MAX_SUBSCRIBERS = int(os.getenv("LIVE_MAX_SUBSCRIBERS", 500))
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", 15))
+# Large bulk/NDJSON commits send their first N records plus a count
+LIVE_MAX_RECORDS_PER_EVENT = 100
+
+live_subscribers_dropped = metrics.register(metrics.Counter(
+    "live_subscribers_dropped_total", "Stream clients dropped for falling behind."
+))
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+def _record(row: dict) -> dict:
+    recorded_at = row.get("recorded_at")
+    return {
+        "id": row.get("id"),
+        "metric_name": row.get("metric_name"),
+        "value": row.get("value"),
+        "category": row.get("category"),
+        "recorded_at": recorded_at.isoformat() if isinstance(recorded_at, datetime) else recorded_at
+    }
+
+
+def format_event(event_id: int, kind: str, data: dict) -> str:
+    return f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Broker(write_hooks.SeededStore):
+    """
+    In-process fan-out of committed analytics writes to stream clients.
+
+    Every event is serialized once and offered to each subscriber's
+    bounded queue without waiting. A client whose queue is full is
+    dropped (it gets a final `dropped` event and reconnects to resync),
+    so one slow reader never holds back writes or other readers.
+
+    The broker also keeps running summary counters (records, value sum,
+    records per category), seeded once at startup and adjusted by every
+    write, so each event can carry the new totals without a query.
+    """
+
+    def __init__(self, queue_size: int = LIVE_QUEUE_SIZE, max_subscribers: int = LIVE_MAX_SUBSCRIBERS):
+        super().__init__()
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.subscribers: Set[Subscriber] = set()
+        self.total_records = 0
+        self.value_sum = 0
+        self.categories: Dict[str, int] = {}
+        self._ids = itertools.count(1)
+
+    def subscribe(self) -> Subscriber:
+        if len(self.subscribers) >= self.max_subscribers:
+            raise TooManySubscribers()
+        subscriber = Subscriber(self.queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def _drop(self, subscriber: Subscriber):
+        subscriber.dropped = True
+        self.subscribers.discard(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(format_event(next(self._ids), "dropped", {"reason": "slow consumer"}))
+        live_subscribers_dropped.inc()
+
+    def publish(self, kind: str, data: dict):
+        if not self.subscribers:
+            return
+        message = format_event(next(self._ids), kind, data)
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+
+    def summary(self, changed: Optional[Set[str]] = None) -> dict:
+        categories = self.categories if changed is None else {
+            name: self.categories.get(name, 0) for name in changed if name is not None
+        }
+        return {
+            "total_records": self.total_records,
+            "unique_categories": len(self.categories),
+            "avg_value": self.value_sum / self.total_records if self.total_records else 0,
+            "categories": categories
+        }
+
+    def _count(self, rows: List[dict], sign: int) -> Set[str]:
+        changed = set()
+        for row in rows:
+            weight = sign * row.get("record_count", 1)
+            value = row.get("value_sum", row.get("value"))
+            self.total_records += weight
+            self.value_sum += sign * (value or 0)
+            category = row.get("category")
+            if category is not None:
+                count = self.categories.get(category, 0) + weight
+                if count > 0:
+                    self.categories[category] = count
+                else:
+                    self.categories.pop(category, None)
+                changed.add(category)
+        return changed
+
+    def _insert(self, rows: List[dict]):
+        changed = self._count(rows, 1)
+        self.publish("insert", {
+            "records": [_record(row) for row in rows[:LIVE_MAX_RECORDS_PER_EVENT]],
+            "count": len(rows),
+            "summary": self.summary(changed)
+        })
+
+    def _update(self, changes: List[tuple]):
+        changed = self._count([before for before, _ in changes], -1)
+        changed |= self._count([after for _, after in changes], 1)
+        self.publish("update", {
+            "records": [_record(after) for _, after in changes[:LIVE_MAX_RECORDS_PER_EVENT]],
+            "count": len(changes),
+            "summary": self.summary(changed)
+        })
+
+    def _delete(self, rows: List[dict]):
+        changed = self._count(rows, -1)
+        self.publish("delete", {
+            "ids": [row.get("id") for row in rows[:LIVE_MAX_RECORDS_PER_EVENT]],
+            "count": len(rows),
+            "summary": self.summary(changed)
+        })
+
+    def _expire(self, before: datetime, groups: List[dict]):
+        changed = self._count(groups, -1)
+        self.publish("expire", {"before": before.isoformat(), "summary": self.summary(changed)})
+
+    async def seed(self, session, max_id: int):
+        """The summary counters: one aggregate and a GROUP BY category."""
+        table = models.AnalyticsData
+        total, value_sum = (await session.execute(
+            select(func.count(table.id), func.sum(table.value)).where(table.id <= max_id)
+        )).one()
+        stmt, _ = heavy_hitters.grouped_counts("category", table.id <= max_id)
+        self.total_records = total or 0
+        self.value_sum = value_sum or 0
+        self.categories = dict((await session.execute(stmt)).all())
+
+
+async def event_stream(request: Request, subscriber: Subscriber) -> AsyncIterator[str]:
+    """Server-sent events for one client: a snapshot, then every write."""
+    try:
+        yield "retry: 3000\n" + format_event(0, "snapshot", broker.summary())
+        while not subscriber.dropped or not subscriber.queue.empty():
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), LIVE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                continue
+            yield message
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+broker: Optional[Broker] = None
+
+
+async def start():
+    """Subscribe the broker to analytics writes and seed its counters."""
+    global broker
+    if not LIVE_ENABLED:
+        return
+    broker = Broker()
+    broker.register()
+
+    metrics.register(metrics.Gauge(
+        "live_subscribers", "Connected /analytics/stream clients.", (),
+        lambda: {(): len(broker.subscribers)}
+    ))
+    await broker.load()
@@ -1,5 +1,11 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import os
+import metrics
+import database
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
 
 app = FastAPI(
     title="Analytics Dashboard API",
@@ -19,10 +25,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+if METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    engines = {"writer": database.engine}
+    if database.read_engine is not database.engine:
+        engines["reader"] = database.read_engine
+    for label, engine in engines.items():
+        metrics.instrument_engine(engine.sync_engine, label)
+    metrics.pool_gauges({label: engine.sync_engine for label, engine in engines.items()})
+
 from routers import auth_routes, user_routes, analytics_routes
 from database import init_db
+import ingest
+import columnar
+import sketches
+import heavy_hitters
+import catalog
+import partitions
+import live
+import invalidation
 
 app.include_router(auth_routes.router)
 app.include_router(user_routes.router)
@@ -30,7 +55,28 @@ app.include_router(analytics_routes.router)
 
 @app.on_event("startup")
 async def startup():
+    # Once per schema version across all workers (see database.init_db)
     await init_db()
+    await invalidation.start()
+    if ingest.buffer is not None:
+        await ingest.buffer.start()
+    await sketches.start()
+    # Upcoming Postgres partitions and the retention policy, then daily
+    await partitions.start()
+    # Load in the background; /analytics/summary, /top and /catalog use SQL until ready
+    app.state.columnar_load = asyncio.create_task(columnar.start())
+    app.state.heavy_hitters_load = asyncio.create_task(heavy_hitters.start())
+    app.state.catalog_load = asyncio.create_task(catalog.start())
+    app.state.live_load = asyncio.create_task(live.start())
+
+@app.on_event("shutdown")
+async def shutdown():
+    await partitions.stop()
+    if ingest.buffer is not None:
+        await ingest.buffer.stop()
+    # After the buffer so its last flush reaches the sketches too
+    await sketches.stop()
+    await invalidation.stop()
 
 
 @app.get("/")
@@ -40,3 +86,8 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        return Response(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,198 @@
+from typing import Callable, Dict, List, Tuple
+from sqlalchemy import event
+import bisect
+import re
+import threading
+import time
+
+# Seconds; shared by HTTP, DB and hashing histograms
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [per-bucket counts..., +Inf count, sum]
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    labels = _format_labels(self.labels, key, 'le="%s"' % le)
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-1]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose samples are computed at scrape time."""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], collect: Callable[[], Dict[tuple, float]]):
+        self.name, self.help, self.labels, self.collect = name, help, labels, collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+http_requests = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+db_latency = Histogram("db_statement_duration_seconds", "Database statement latency.", ("engine", "operation", "table"))
+hash_latency = Histogram("auth_hash_duration_seconds", "bcrypt hash/verify time on the hashing pool.", ("operation",))
+hash_queue_wait = Histogram("auth_hash_queue_wait_seconds", "Time spent waiting for a hashing worker.", ("operation",))
+
+REGISTRY: list = [http_requests, http_latency, db_latency, hash_latency, hash_queue_wait]
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ============================================
+# SQLAlchemy statement timing
+# ============================================
+_STATEMENT_TARGET = re.compile(
+    r"^\s*(?:WITH\b.*?\)\s*)?(SELECT|INSERT|UPDATE|DELETE|PRAGMA|CREATE|DROP|ALTER|EXPLAIN|COPY)\b"
+    r"(?:.*?\b(?:FROM|INTO|UPDATE|TABLE)\s+\"?(\w+))?",
+    re.IGNORECASE | re.DOTALL
+)
+
+
+def classify_statement(statement: str) -> Tuple[str, str]:
+    """Reduce SQL text to a low-cardinality (operation, table) pair."""
+    match = _STATEMENT_TARGET.match(statement)
+    if not match:
+        return "OTHER", ""
+    operation = match.group(1).upper()
+    table = match.group(2) or ""
+    if operation == "UPDATE":
+        table = re.match(r"\s*UPDATE\s+\"?(\w+)", statement, re.IGNORECASE).group(1)
+    return operation, table
+
+
+def instrument_engine(sync_engine, label: str):
+    # The start time lives on the statement's execution context, so a
+    # statement that raises (no after_cursor_execute) leaves nothing behind
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = context._query_start
+        db_latency.observe(time.perf_counter() - started, label, *classify_statement(statement))
+
+
+def pool_gauges(engines: Dict[str, object]):
+    """Register checked-out / overflow / size gauges for each engine's pool."""
+
+    def collect(attr: str):
+        def sample():
+            values = {}
+            for label, engine in engines.items():
+                pool = engine.pool
+                if hasattr(pool, attr):
+                    # QueuePool counts overflow from -pool_size upwards
+                    values[(label,)] = max(0, getattr(pool, attr)())
+            return values
+        return sample
+
+    register(Gauge("db_pool_checked_out", "Connections currently checked out.", ("engine",), collect("checkedout")))
+    register(Gauge("db_pool_overflow", "Connections open beyond pool_size.", ("engine",), collect("overflow")))
+    register(Gauge("db_pool_size", "Configured pool size.", ("engine",), collect("size")))
+
+
+# ============================================
+# ASGI middleware
+# ============================================
+class MetricsMiddleware:
+    """Time every HTTP request and label it with the matched route template."""
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths = None
+
+    def _route_for(self, scope) -> str:
+        if self._route_paths is None:
+            self._route_paths = {}
+            for route in getattr(scope.get("app"), "routes", []):
+                endpoint = getattr(route, "endpoint", None)
+                if endpoint is not None:
+                    self._route_paths.setdefault(endpoint, route.path)
+        # Unmatched paths share one label so 404 scans cannot blow up cardinality
+        return self._route_paths.get(scope.get("endpoint"), "<unmatched>")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self._route_for(scope)
+            http_latency.observe(time.perf_counter() - started, scope["method"], route)
+            http_requests.inc(scope["method"], route, str(status["code"]))
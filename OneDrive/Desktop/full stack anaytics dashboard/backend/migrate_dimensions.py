@@ -0,0 +1,87 @@
+import asyncio
+import os
+from sqlalchemy import inspect, text
+from models import AnalyticsData, Metric, Category
+from database import engine, Base
+import partitions
+import logging
+
+# Reduce noise from sqlalchemy
+logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
+
+# Indexes of the string-keyed table; their names are reused by the new one
+LEGACY_INDEXES = [
+    "ix_analytics_data_id",
+    "ix_analytics_data_metric_name",
+    "ix_analytics_data_category_recorded_at_id",
+    "ix_analytics_data_recorded_at_id",
+]
+
+async def migrate_dimensions():
+    """
+    Convert analytics_data from metric_name/category strings to
+    metric_id/category_id keys into the metrics and categories tables.
+
+    Runs in one transaction: the old table is renamed, the new one is
+    created from the models, rows are copied across with their ids
+    intact and the old table is dropped.
+    """
+    try:
+        async with engine.begin() as conn:
+            columns = await conn.run_sync(
+                lambda sync_conn: [c["name"] for c in inspect(sync_conn).get_columns("analytics_data")]
+                if inspect(sync_conn).has_table("analytics_data") else []
+            )
+            if not columns:
+                print("analytics_data does not exist yet; it will be created with the new layout.")
+                return
+            if "metric_id" in columns:
+                print("analytics_data already uses dimension keys.")
+                return
+
+            print("Creating metrics and categories...")
+            await conn.run_sync(Base.metadata.create_all, tables=[Metric.__table__, Category.__table__])
+            await conn.execute(text(
+                "INSERT INTO metrics (name) SELECT DISTINCT metric_name FROM analytics_data "
+                "WHERE metric_name IS NOT NULL"
+            ))
+            await conn.execute(text(
+                "INSERT INTO categories (name) SELECT DISTINCT category FROM analytics_data "
+                "WHERE category IS NOT NULL"
+            ))
+
+            print("Rebuilding analytics_data...")
+            await conn.execute(text("ALTER TABLE analytics_data RENAME TO analytics_data_legacy"))
+            for index in LEGACY_INDEXES:
+                await conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+            await conn.run_sync(Base.metadata.create_all, tables=[AnalyticsData.__table__])
+            # On Postgres the new table is partitioned; cover the legacy rows
+            first, last = (await conn.execute(text(
+                "SELECT MIN(recorded_at), MAX(recorded_at) FROM analytics_data_legacy"
+            ))).one()
+            await partitions.ensure_partitions(conn, first, last)
+
+            result = await conn.execute(text(
+                "INSERT INTO analytics_data (id, metric_id, value, category_id, recorded_at) "
+                "SELECT l.id, m.id, l.value, c.id, l.recorded_at FROM analytics_data_legacy l "
+                "LEFT JOIN metrics m ON m.name = l.metric_name "
+                "LEFT JOIN categories c ON c.name = l.category"
+            ))
+            print(f"Copied {result.rowcount} rows.")
+
+            if conn.dialect.name == "postgresql":
+                # Explicit ids bypass the sequence; move it past them
+                await conn.execute(text(
+                    "SELECT setval(pg_get_serial_sequence('analytics_data', 'id'), "
+                    "COALESCE((SELECT MAX(id) FROM analytics_data), 0) + 1, false)"
+                ))
+
+            await conn.execute(text("DROP TABLE analytics_data_legacy"))
+            print("Migration complete.")
+
+    except Exception as e:
+        print(f"Error during migration: {e}")
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    asyncio.run(migrate_dimensions())
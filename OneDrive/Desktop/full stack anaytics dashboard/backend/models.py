@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, func
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, DateTime, Enum, ForeignKey, PrimaryKeyConstraint, UniqueConstraint, Index, func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import ColumnProperty, column_property
 from database import Base
 import enum
 from datetime import datetime
@@ -22,12 +24,149 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+class RefreshToken(Base):
+    """
+    One issued refresh token, stored only as its HMAC digest. Tokens
+    redeemed in turn share a family_id, so reuse of a rotated token
+    revokes the whole chain.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    family_id = Column(String(32), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    rotated_at = Column(DateTime(timezone=True), nullable=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+
+class Metric(Base):
+    """Lookup table for analytics_data.metric_id."""
+    __tablename__ = "metrics"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+class Category(Base):
+    """Lookup table for analytics_data.category_id."""
+    __tablename__ = "categories"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+
+class DimensionComparator(ColumnProperty.Comparator):
+    """
+    `AnalyticsData.category == "x"` compares the integer key against a
+    one-off id lookup instead of decoding every row, so filters stay
+    index seeks.
+    """
+
+    def __eq__(self, other):
+        key_column, dimension = self.prop.info["dimension"]
+        if other is None:
+            return key_column.is_(None)
+        return key_column == select(dimension.id).where(dimension.name == other).scalar_subquery()
+
+    def in_(self, other):
+        key_column, dimension = self.prop.info["dimension"]
+        return key_column.in_(select(dimension.id).where(dimension.name.in_(other)))
+
+
+def dimension_name(key_column, dimension):
+    return column_property(
+        select(dimension.name).where(dimension.id == key_column).correlate_except(dimension).scalar_subquery(),
+        comparator_factory=DimensionComparator,
+        info={"dimension": (key_column, dimension)}
+    )
+
+
 class AnalyticsData(Base):
     __tablename__ = "analytics_data"
     
     id = Column(Integer, primary_key=True, index=True)
-    metric_name = Column(String, index=True)
+    metric_id = Column(Integer, ForeignKey("metrics.id"), index=True)
     value = Column(Integer)
-    category = Column(String)
+    category_id = Column(Integer, ForeignKey("categories.id"))
     recorded_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Read-only names decoded from the lookup tables; writes set the ids
+    # through the dimensions interning cache
+    metric_name = dimension_name(metric_id, Metric)
+    category = dimension_name(category_id, Category)
+
+    __table_args__ = (
+        # Keyset pagination seeks on (recorded_at, id), optionally per category
+        Index("ix_analytics_data_category_recorded_at_id", "category_id", "recorded_at", "id"),
+        Index("ix_analytics_data_recorded_at_id", "recorded_at", "id"),
+        # GET /analytics/data filters: metric_name IN + recorded_at window,
+        # and value ranges / sort=value seeking on (value, id)
+        Index("ix_analytics_data_metric_recorded_at_id", "metric_id", "recorded_at", "id"),
+        Index("ix_analytics_data_value_id", "value", "id"),
+        # Monthly partitions on Postgres (see partitions.py); ignored elsewhere
+        {"postgresql_partition_by": "RANGE (recorded_at)"},
+    )
+
+
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _partitioned_primary_key(constraint, compiler, **kw):
+    # A partitioned table's key must contain the partition column. The
+    # mapper keeps `id` alone as identity; ids still come from one sequence.
+    if constraint.table is not None and constraint.table.name == AnalyticsData.__tablename__:
+        return "PRIMARY KEY (id, recorded_at)"
+    return compiler.visit_primary_key_constraint(constraint, **kw)
+
+
+class RollupMixin:
+    """Pre-aggregated analytics_data values for one time bucket."""
+    id = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    metric_name = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    record_count = Column(Integer, nullable=False, default=0)
+    value_sum = Column(BigInteger, nullable=False, default=0)
+    value_min = Column(Integer)
+    value_max = Column(Integer)
+
+class AnalyticsRollupMinute(RollupMixin, Base):
+    __tablename__ = "analytics_rollup_minute"
+    __table_args__ = (UniqueConstraint("bucket_start", "metric_name", "category"),)
+
+class AnalyticsRollupHour(RollupMixin, Base):
+    __tablename__ = "analytics_rollup_hour"
+    __table_args__ = (UniqueConstraint("bucket_start", "metric_name", "category"),)
+
+class AnalyticsRollupDay(RollupMixin, Base):
+    __tablename__ = "analytics_rollup_day"
+    __table_args__ = (UniqueConstraint("bucket_start", "metric_name", "category"),)
+
+
+class AnalyticsSketch(Base):
+    """Serialized DDSketch of one hour of values for a metric/category."""
+    __tablename__ = "analytics_sketches"
+
+    id = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    metric_name = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    record_count = Column(Integer, nullable=False, default=0)
+    sketch = Column(Text, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (UniqueConstraint("bucket_start", "metric_name", "category"),)
+
+
+class CacheInvalidation(Base):
+    """Cross-worker cache invalidation event (see invalidation.py)."""
+    __tablename__ = "cache_invalidations"
+
+    id = Column(Integer, primary_key=True)
+    origin = Column(String(32), nullable=False)
+    kind = Column(String, nullable=False)
+    key = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    # Never reuse ids after pruning, or a restarted worker's shared ETag
+    # version could repeat an old one
+    __table_args__ = {"sqlite_autoincrement": True}
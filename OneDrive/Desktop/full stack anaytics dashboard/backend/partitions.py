@@ -0,0 +1,202 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy import select, delete, func, text
+import asyncio
+import logging
+import os
+from dotenv import load_dotenv
+import models, database, rollups, etags, write_hooks
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# 0 keeps raw rows forever; otherwise whole months older than this are
+# downsampled into the hour/day rollups and dropped
+ANALYTICS_RETENTION_MONTHS = int(os.getenv("ANALYTICS_RETENTION_MONTHS", 0))
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+PARTITION_MAINTENANCE_INTERVAL_HOURS = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL_HOURS", 24))
+
+# Raw rows streamed per batch while rebuilding rollups for an expiring month
+DOWNSAMPLE_BATCH_SIZE = 10000
+
+TABLE = models.AnalyticsData.__tablename__
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+# Kept for expired months; minute buckets go with the raw rows
+DOWNSAMPLED_ROLLUPS = [(table, width) for table, width in rollups.ROLLUPS if table is not models.AnalyticsRollupMinute]
+
+
+def month_start(value: datetime) -> datetime:
+    return rollups.as_utc(value).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_y{month.year}m{month.month:02d}"
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    """True on Postgres when analytics_data was created PARTITION BY RANGE."""
+    if conn.dialect.name != "postgresql":
+        return False
+    result = await conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"
+    ), {"table": TABLE})
+    return result.first() is not None
+
+
+async def ensure_partitions(conn: AsyncConnection, first: Optional[datetime] = None, last: Optional[datetime] = None) -> List[str]:
+    """
+    Create the monthly partitions covering [first, last] plus
+    PARTITION_MONTHS_AHEAD months past now, and a DEFAULT partition for
+    anything outside them. No-op unless the table is partitioned.
+    """
+    if not await is_partitioned(conn):
+        return []
+    # Every worker runs maintenance; one at a time creates the partitions
+    await database.exclusive(conn, "partitions")
+
+    now = datetime.now(timezone.utc)
+    month = month_start(first or now)
+    end = add_months(month_start(max(last or now, now)), PARTITION_MONTHS_AHEAD)
+
+    created = []
+    await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+    while month <= end:
+        name = partition_name(month)
+        exists = (await conn.execute(text("SELECT to_regclass(:name)"), {"name": name})).scalar()
+        if exists is None:
+            await conn.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            ))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+async def downsample(db: AsyncSession, month: datetime, next_month: datetime) -> List[dict]:
+    """
+    Rebuild the hour/day rollups of one month from its raw rows and drop
+    its minute rollups. Returns record_count/value_sum per
+    (metric_name, category).
+
+    The buckets are recomputed from the raw rows before those go, so
+    rows written before rollups existed are counted too.
+    """
+    table = models.AnalyticsData
+    for rollup, _ in rollups.ROLLUPS:
+        await db.execute(delete(rollup).where(rollup.bucket_start >= month, rollup.bucket_start < next_month))
+
+    groups: Dict[Tuple[str, str], list] = {}
+    stmt = (
+        select(table.metric_name, table.value, table.category, table.recorded_at)
+        .where(table.recorded_at >= month, table.recorded_at < next_month)
+        .execution_options(yield_per=DOWNSAMPLE_BATCH_SIZE)
+    )
+    result = await db.stream(stmt)
+    async for partition in result.partitions():
+        rows = [r._asdict() for r in partition]
+        # The interned names of a row can be NULL only for pre-migration data
+        rows = [r for r in rows if r["metric_name"] is not None and r["category"] is not None and r["value"] is not None]
+        await rollups.apply(db, rows, tables=DOWNSAMPLED_ROLLUPS)
+        for row in rows:
+            group = groups.setdefault((row["metric_name"], row["category"]), [0, 0])
+            group[0] += 1
+            group[1] += row["value"]
+
+    return [
+        {"metric_name": metric_name, "category": category, "record_count": count, "value_sum": value_sum}
+        for (metric_name, category), (count, value_sum) in groups.items()
+    ]
+
+
+async def drop_month(db: AsyncSession, month: datetime, next_month: datetime):
+    """Remove one month of raw rows: DROP its partition when there is one."""
+    conn = await db.connection()
+    if await is_partitioned(conn):
+        await conn.execute(text(f"DROP TABLE IF EXISTS {partition_name(month)}"))
+
+    # Rows parked in the DEFAULT partition, or the whole month when the
+    # table is not partitioned: one index range delete on recorded_at
+    table = models.AnalyticsData
+    await db.execute(delete(table).where(table.recorded_at >= month, table.recorded_at < next_month))
+
+
+async def apply_retention(now: Optional[datetime] = None) -> List[dict]:
+    """
+    Downsample and drop every whole month older than
+    ANALYTICS_RETENTION_MONTHS. Each month commits on its own, so a crash
+    leaves at most one month to redo and nothing half-aggregated.
+
+    Every worker runs this; each month is taken under a lock and the
+    oldest row re-read inside it, so a month is never downsampled twice
+    (a second pass would rebuild its rollups from no raw rows).
+    """
+    if ANALYTICS_RETENTION_MONTHS <= 0:
+        return []
+
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -ANALYTICS_RETENTION_MONTHS)
+    expired = []
+    while True:
+        async with database.AsyncSessionLocal() as session:
+            await database.exclusive(session, "retention")
+            oldest = (await session.execute(select(func.min(models.AnalyticsData.recorded_at)))).scalar()
+            if oldest is None or month_start(oldest) >= cutoff:
+                return expired
+
+            month = month_start(oldest)
+            next_month = add_months(month, 1)
+            groups = await downsample(session, month, next_month)
+            await drop_month(session, month, next_month)
+            await session.commit()
+        removed = sum(group["record_count"] for group in groups)
+
+        etags.bump()
+        write_hooks.after_expire(next_month, groups)
+        expired.append({"month": month, "rows": removed})
+        logger.info(f"Retention: dropped {removed} rows from {month:%Y-%m}")
+
+
+async def maintain():
+    """Create upcoming partitions, then apply retention."""
+    async with database.engine.begin() as conn:
+        created = await ensure_partitions(conn)
+    if created:
+        logger.info(f"Created partitions: {', '.join(created)}")
+    return await apply_retention()
+
+
+async def _run():
+    while True:
+        try:
+            await maintain()
+        except Exception as e:
+            logger.error(f"Partition maintenance failed: {str(e)}")
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL_HOURS * 3600)
+
+
+_task: Optional[asyncio.Task] = None
+
+
+async def start():
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(_run())
+
+
+async def stop():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
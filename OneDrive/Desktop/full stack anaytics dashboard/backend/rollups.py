@@ -0,0 +1,241 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, func, bindparam, or_, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+import re
+import models
+
+# Rollup tables from finest to coarsest, with their bucket width
+ROLLUPS = [
+    (models.AnalyticsRollupMinute, timedelta(minutes=1)),
+    (models.AnalyticsRollupHour, timedelta(hours=1)),
+    (models.AnalyticsRollupDay, timedelta(days=1)),
+]
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Bucket rows per upsert: seven bound values each keeps a statement under
+# SQLite's variable limit (999 on older builds)
+UPSERT_CHUNK = 140
+
+STEP_UNITS = {"m": timedelta(minutes=1), "h": timedelta(hours=1), "d": timedelta(days=1)}
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """SQLite hands back naive datetimes; everything stored here is UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def floor_time(value: datetime, width: timedelta) -> datetime:
+    value = as_utc(value)
+    return value - ((value - EPOCH) % width)
+
+
+def parse_step(step: str) -> Optional[timedelta]:
+    """Parse a bucket width such as '1m', '15m', '6h' or '1d'."""
+    match = re.fullmatch(r"(\d+)([mhd])", step.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        return None
+    return int(match.group(1)) * STEP_UNITS[match.group(2)]
+
+
+def pick_rollup(step: timedelta):
+    """Coarsest rollup whose buckets tile the requested step exactly."""
+    chosen = ROLLUPS[0]
+    for table, width in ROLLUPS:
+        if step % width == timedelta(0):
+            chosen = (table, width)
+    return chosen
+
+
+def _upsert(dialect_name: str, table, rows: List[dict]):
+    if dialect_name == "postgresql":
+        stmt = postgresql.insert(table).values(rows)
+        lowest, highest = func.least, func.greatest
+    else:
+        stmt = sqlite.insert(table).values(rows)
+        # SQLite's multi-argument min()/max() are scalar functions
+        lowest, highest = func.min, func.max
+
+    return stmt.on_conflict_do_update(
+        index_elements=["bucket_start", "metric_name", "category"],
+        set_={
+            "record_count": table.record_count + stmt.excluded.record_count,
+            "value_sum": table.value_sum + stmt.excluded.value_sum,
+            "value_min": lowest(table.value_min, stmt.excluded.value_min),
+            "value_max": highest(table.value_max, stmt.excluded.value_max),
+        }
+    )
+
+
+def _buckets(records: List[dict], width: timedelta) -> dict:
+    """Rollup rows for `records`, keyed by (bucket_start, metric_name, category)."""
+    buckets = {}
+    for record in records:
+        value = record["value"]
+        key = (floor_time(record["recorded_at"], width), record["metric_name"], record["category"])
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = {
+                "bucket_start": key[0],
+                "metric_name": record["metric_name"],
+                "category": record["category"],
+                "record_count": 1,
+                "value_sum": value,
+                "value_min": value,
+                "value_max": value,
+            }
+        else:
+            bucket["record_count"] += 1
+            bucket["value_sum"] += value
+            bucket["value_min"] = min(bucket["value_min"], value)
+            bucket["value_max"] = max(bucket["value_max"], value)
+    return buckets
+
+
+async def apply(db: AsyncSession, records: Iterable[dict], tables=None):
+    """
+    Fold new analytics rows (recorded_at/metric_name/category/value dicts)
+    into every rollup table, or only the (table, width) pairs in `tables`.
+
+    Runs inside the caller's transaction, so rollups commit (or roll back)
+    together with the raw rows. Each table gets one upsert statement per
+    UPSERT_CHUNK distinct (bucket, metric_name, category) keys.
+    """
+    records = list(records)
+    if not records:
+        return
+
+    dialect_name = db.get_bind().dialect.name
+    for table, width in tables or ROLLUPS:
+        buckets = _buckets(records, width)
+        rows = list(buckets.values())
+        for offset in range(0, len(rows), UPSERT_CHUNK):
+            await db.execute(_upsert(dialect_name, table, rows[offset:offset + UPSERT_CHUNK]))
+
+
+async def retract(db: AsyncSession, records: Iterable[dict], tables=None):
+    """
+    Take deleted rows, or the before-image of updated ones, back out of
+    every rollup table. Call it after the raw DELETE/UPDATE and before
+    apply() for the new values, inside the same transaction.
+
+    Counts and sums are subtracted per bucket and emptied buckets are
+    removed. A min or max cannot be un-folded, so a bucket whose min or
+    max was among the removed values gets both recomputed from the raw
+    rows left in it.
+    """
+    records = [
+        record for record in records
+        if record["metric_name"] is not None and record["category"] is not None and record["value"] is not None
+    ]
+    if not records:
+        return
+
+    raw = models.AnalyticsData
+    for table, width in tables or ROLLUPS:
+        rollup = table.__table__
+        buckets = _buckets(records, width)
+        params = [
+            {"b_bucket": bucket["bucket_start"], "b_end": bucket["bucket_start"] + width,
+             "b_metric": bucket["metric_name"], "b_category": bucket["category"],
+             "b_count": bucket["record_count"], "b_sum": bucket["value_sum"],
+             "b_min": bucket["value_min"], "b_max": bucket["value_max"]}
+            for bucket in buckets.values()
+        ]
+        same_bucket = (
+            rollup.c.bucket_start == bindparam("b_bucket"),
+            rollup.c.metric_name == bindparam("b_metric"),
+            rollup.c.category == bindparam("b_category")
+        )
+
+        await db.execute(
+            update(rollup)
+            .where(*same_bucket)
+            .values(
+                record_count=rollup.c.record_count - bindparam("b_count"),
+                value_sum=rollup.c.value_sum - bindparam("b_sum")
+            ),
+            params
+        )
+
+        keys = list(buckets)
+        position = tuple_(rollup.c.bucket_start, rollup.c.metric_name, rollup.c.category)
+        for offset in range(0, len(keys), UPSERT_CHUNK):
+            await db.execute(
+                delete(rollup).where(position.in_(keys[offset:offset + UPSERT_CHUNK]), rollup.c.record_count <= 0)
+            )
+
+        in_bucket = (
+            raw.recorded_at >= bindparam("b_bucket"),
+            raw.recorded_at < bindparam("b_end"),
+            raw.metric_name == bindparam("b_metric"),
+            raw.category == bindparam("b_category")
+        )
+        await db.execute(
+            update(rollup)
+            .where(*same_bucket, or_(rollup.c.value_min >= bindparam("b_min"), rollup.c.value_max <= bindparam("b_max")))
+            .values(
+                value_min=select(func.min(raw.value)).where(*in_bucket).scalar_subquery(),
+                value_max=select(func.max(raw.value)).where(*in_bucket).scalar_subquery()
+            ),
+            params
+        )
+
+
+async def timeseries(
+    db: AsyncSession,
+    step: timedelta,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    metric_name: Optional[str] = None,
+    category: Optional[str] = None
+) -> List[dict]:
+    """Read points of width `step` from the coarsest rollup that fits."""
+    table, width = pick_rollup(step)
+
+    stmt = select(
+        table.bucket_start,
+        func.sum(table.record_count),
+        func.sum(table.value_sum),
+        func.min(table.value_min),
+        func.max(table.value_max)
+    )
+    if metric_name:
+        stmt = stmt.where(table.metric_name == metric_name)
+    if category:
+        stmt = stmt.where(table.category == category)
+    if start:
+        stmt = stmt.where(table.bucket_start >= floor_time(start, step))
+    if end:
+        stmt = stmt.where(table.bucket_start < as_utc(end))
+    stmt = stmt.group_by(table.bucket_start).order_by(table.bucket_start)
+
+    result = await db.execute(stmt)
+
+    points = {}
+    for bucket_start, count, value_sum, value_min, value_max in result.all():
+        key = floor_time(bucket_start, step)
+        point = points.get(key)
+        if point is None:
+            points[key] = {
+                "bucket_start": key,
+                "count": count,
+                "sum": value_sum,
+                "min": value_min,
+                "max": value_max,
+            }
+        else:
+            point["count"] += count
+            point["sum"] += value_sum
+            point["min"] = min(point["min"], value_min)
+            point["max"] = max(point["max"], value_max)
+
+    for point in points.values():
+        point["avg"] = point["sum"] / point["count"] if point["count"] else 0
+    return list(points.values())
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
 from typing import List
+from datetime import datetime, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
-import models, schemas, deps, database
+from sqlalchemy import select, insert, delete, func
+import models, schemas, deps, database, rollups, pagination, ingest, exports, etags, write_hooks, columnar, sketches, heavy_hitters, dimensions, live, bulk_edits, fast_json, catalog, analytics_query
 
 router = APIRouter(
     prefix="/analytics",
@@ -12,7 +15,7 @@ router = APIRouter(
 # ============================================
 # CREATE - Store New Analytics Data
 # ============================================
-@router.post("/data", response_model=schemas.AnalyticsOut)
+@router.post("/data", response_model=schemas.AnalyticsOut, responses={202: {"model": schemas.IngestAccepted}})
 async def create_analytics_data(
     data: schemas.AnalyticsCreate,
     db: AsyncSession = Depends(database.get_db),
@@ -20,19 +23,44 @@ async def create_analytics_data(
 ):
     """
     Store new analytics data in the database.
+
+    With INGEST_BUFFER_ENABLED the record is queued for a batched write and
+    202 is returned instead; a full queue answers 503 with Retry-After.
     """
     # Create new analytics record
-    new_data = models.AnalyticsData(
-        metric_name=data.metric_name,
-        value=data.value,
-        category=data.category
+    row = {
+        "metric_name": data.metric_name,
+        "value": data.value,
+        "category": data.category,
+        "recorded_at": datetime.now(timezone.utc)
+    }
+
+    if ingest.buffer is not None:
+        if not ingest.buffer.enqueue(row):
+            raise HTTPException(
+                status_code=503,
+                detail="Ingestion queue is full, please retry",
+                headers={"Retry-After": "1"}
+            )
+        return JSONResponse(status_code=202, content={
+            "message": "Analytics data queued",
+            "queued": ingest.buffer.queue.qsize()
+        })
+
+    # One INSERT ... RETURNING; the response is built from the request and
+    # the returned id/recorded_at instead of re-reading the row
+    await dimensions.encode(db, [row])
+    table = models.AnalyticsData.__table__
+    result = await db.execute(
+        insert(table).values({c: row[c] for c in ingest.COLUMNS}).returning(table.c.id, table.c.recorded_at)
     )
-    
-    # Save to database
-    db.add(new_data)
+    row["id"], row["recorded_at"] = result.one()
+    await rollups.apply(db, [row])
     await db.commit()
-    await db.refresh(new_data)
-    
+    etags.bump()
+    new_data = {key: row[key] for key in ("id", "metric_name", "value", "category", "recorded_at")}
+    write_hooks.after_insert([new_data])
+
     return new_data
 
 
@@ -41,22 +69,316 @@ async def create_analytics_data(
 # ============================================
 @router.get("/data", response_model=List[schemas.AnalyticsOut])
 async def get_analytics_data(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    category: str = None,
+    category: List[str] = Query(None),
+    metric_name: List[str] = Query(None),
+    min_value: int = None,
+    max_value: int = None,
+    start: datetime = None,
+    end: datetime = None,
+    sort: str = "recorded_at",
+    cursor: str = None,
+    explain: bool = False,
     db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(deps.get_current_active_user)
 ):
     """
     Retrieve analytics data from the database.
+
+    Filters combine with AND: `category` and `metric_name` may repeat
+    (matching any of the names), `min_value`/`max_value` bound the value
+    inclusively and `start`/`end` select recorded_at in [start, end).
+    `sort` is recorded_at, -recorded_at, value or -value (ties by id).
+
+    Pass the X-Next-Cursor header of a full page back as `cursor`, with
+    the same filters and sort, to continue with a keyset seek instead of
+    an OFFSET scan; `skip` is ignored when a cursor is given.
+
+    Admins can add `explain=true` to get the database's query plan for
+    the request instead of rows, to confirm which index it uses.
+
+    Responses carry a weak ETag tied to the table's write version, so a
+    matching If-None-Match is answered with 304 before any query runs.
     """
-    stmt = select(models.AnalyticsData)
-    if category:
-        stmt = stmt.where(models.AnalyticsData.category == category)
-    stmt = stmt.offset(skip).limit(limit)
-    
+    if explain and current_user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="explain requires an admin")
+
+    etag = etags.for_request(request)
+    cached = etags.not_modified(request, etag)
+    if cached is not None and not explain:
+        return cached
+
+    table = models.AnalyticsData
+    stmt = select(table.id, table.metric_id, table.value, table.category_id, table.recorded_at).where(
+        *analytics_query.criteria(category, metric_name, min_value, max_value, start, end)
+    )
+    if cursor:
+        stmt = stmt.where(analytics_query.seek(sort, cursor))
+    else:
+        stmt = stmt.offset(skip)
+    stmt = stmt.order_by(*analytics_query.order_by(sort)).limit(limit)
+
+    if explain:
+        return JSONResponse(await analytics_query.explain(db, stmt))
+
+    # Column tuples, names from the interners and orjson straight to bytes:
+    # no ORM instances and no per-row response_model validation
+    rows = (await db.execute(stmt)).all()
+    metric_names = await dimensions.metrics.names_for(db, (row.metric_id for row in rows))
+    category_names = await dimensions.categories.names_for(db, (row.category_id for row in rows))
+    if rows:
+        pagination.set_next_cursor(response, rows, limit, *analytics_query.cursor_key(sort, rows[-1]))
+    etags.tag(response, etag)
+    return fast_json.response([
+        {
+            "metric_name": metric_names.get(metric_id),
+            "value": value,
+            "category": category_names.get(category_id),
+            "id": id_,
+            "recorded_at": recorded_at
+        }
+        for id_, metric_id, value, category_id, recorded_at in rows
+    ], response)
+
+
+# ============================================
+# READ - Dashboard Summary (SQL Aggregation)
+# ============================================
+@router.get("/summary", response_model=schemas.AnalyticsSummary)
+async def get_analytics_summary(
+    category: str = None,
+    start: datetime = None,
+    end: datetime = None,
+    top: int = Query(5, ge=1, le=100),
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    """
+    Aggregate analytics data on the server.
+
+    One GROUP BY query returns count/sum/max per category; the overall
+    totals are folded from those rows so nothing else hits the database.
+    With COLUMNAR_ENABLED the same payload comes from the in-memory
+    NumPy snapshot once it has loaded.
+    """
+    # Same filter semantics as GET /analytics/data, on either path
+    criteria = analytics_query.criteria([category] if category else None, None, None, None, start, end)
+    if columnar.store is not None and columnar.store.ready:
+        return columnar.store.summary(category=category, start=start, end=end, top=top)
+
+    stmt = select(
+        models.AnalyticsData.category_id,
+        func.count(models.AnalyticsData.id),
+        func.sum(models.AnalyticsData.value),
+        func.max(models.AnalyticsData.value)
+    ).where(*criteria).group_by(models.AnalyticsData.category_id)
+
     result = await db.execute(stmt)
-    return result.scalars().all()
+    rows = result.all()
+    names = await dimensions.categories.names_for(db, (row[0] for row in rows))
+
+    total_records = sum(count for _, count, _, _ in rows)
+    total_value = sum(value_sum or 0 for _, _, value_sum, _ in rows)
+    maxima = [max_value for _, _, _, max_value in rows if max_value is not None]
+
+    top_categories = sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+
+    return {
+        "total_records": total_records,
+        "unique_categories": len(rows),
+        "avg_value": total_value / total_records if total_records else 0,
+        "max_value": max(maxima) if maxima else None,
+        "top_categories": [
+            {
+                "category": names.get(category_id),
+                "count": count,
+                "avg_value": (value_sum or 0) / count if count else 0,
+                "max_value": max_value
+            }
+            for category_id, count, value_sum, max_value in top_categories
+        ]
+    }
+
+
+# ============================================
+# READ - Approximate Top-K Categories and Metrics
+# ============================================
+@router.get("/top", response_model=schemas.TopReport)
+async def get_top_analytics(
+    k: int = Query(5, ge=1, le=100),
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    """
+    Most frequent categories and metric names.
+
+    Served from in-memory Space-Saving counters kept current on every
+    write, without touching the database. Each count overestimates the
+    true one by at most `error`; `guaranteed` marks entries that are
+    certainly in the top k. Until the counters are seeded at startup the
+    answer is an exact GROUP BY.
+    """
+    if heavy_hitters.hitters is not None and heavy_hitters.hitters.ready:
+        return heavy_hitters.hitters.top(k)
+    return await heavy_hitters.sql_top(db, k)
+
+
+# ============================================
+# READ - Dimension Catalog for Filter UIs
+# ============================================
+@router.get("/catalog", response_model=schemas.Catalog)
+async def get_analytics_catalog(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    """
+    Every category and metric name with its row count and first/last
+    recorded_at, sorted by name.
+
+    Served from the in-process catalog that every write path keeps
+    current, so no DISTINCT or GROUP BY runs per request (until it is
+    seeded at startup the answer comes from SQL). Carries the same weak
+    ETag as the data listing.
+    """
+    etag = etags.for_request(request)
+    cached = etags.not_modified(request, etag)
+    if cached is not None:
+        return cached
+
+    etags.tag(response, etag)
+    if catalog.catalog is not None and catalog.catalog.ready:
+        return catalog.catalog.snapshot()
+    return await catalog.sql_catalog(db)
+
+
+# ============================================
+# READ - Time Series from Rollup Tables
+# ============================================
+@router.get("/timeseries", response_model=List[schemas.TimeseriesPoint])
+async def get_analytics_timeseries(
+    step: str = "1h",
+    start: datetime = None,
+    end: datetime = None,
+    metric_name: str = None,
+    category: str = None,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    """
+    Bucketed count/sum/min/max/avg over time.
+
+    `step` is a bucket width such as 1m, 15m, 1h, 6h or 1d. Points are read
+    from the coarsest minute/hour/day rollup that divides the step, never
+    from the raw analytics_data table.
+    """
+    width = rollups.parse_step(step)
+    if width is None:
+        raise HTTPException(status_code=400, detail="Invalid step, expected e.g. 1m, 15m, 1h or 1d")
+
+    return await rollups.timeseries(
+        db, width, start=start, end=end, metric_name=metric_name, category=category
+    )
+
+
+# ============================================
+# READ - Metric Quantiles from Sketches
+# ============================================
+@router.get("/metrics/{metric_name}/quantiles", response_model=schemas.MetricQuantiles)
+async def get_metric_quantiles(
+    metric_name: str,
+    q: List[float] = Query([0.5, 0.95, 0.99]),
+    category: str = None,
+    start: datetime = None,
+    end: datetime = None,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    """
+    Approximate quantiles (p50/p95/p99 by default) of a metric's values.
+
+    Answered by merging the hourly DDSketches that cover [start, end), so
+    cost depends on the number of hours, not rows. Each value is within
+    SKETCH_RELATIVE_ACCURACY (1% by default) of the exact quantile.
+    """
+    if sketches.store is None:
+        raise HTTPException(status_code=503, detail="Quantile sketches are disabled")
+    if any(not 0 <= value <= 1 for value in q):
+        raise HTTPException(status_code=400, detail="Quantiles must be between 0 and 1")
+
+    return await sketches.quantiles(db, metric_name, q, category=category, start=start, end=end)
+
+
+# ============================================
+# STREAM - Live Feed of Committed Writes (SSE)
+# ============================================
+@router.get("/stream")
+async def stream_analytics_data(
+    request: Request,
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    """
+    Server-sent events for every committed analytics write.
+
+    The stream opens with a `snapshot` of the summary counters, then sends
+    `insert`, `update`, `delete` and `expire` events, each carrying the
+    changed records and the updated totals. Clients that fall more than
+    LIVE_QUEUE_SIZE events behind get a `dropped` event and should
+    reconnect.
+    """
+    if live.broker is None or not live.broker.ready:
+        raise HTTPException(status_code=503, detail="Live stream is not available", headers={"Retry-After": "1"})
+    try:
+        subscriber = live.broker.subscribe()
+    except live.TooManySubscribers:
+        raise HTTPException(status_code=503, detail="Too many stream clients", headers={"Retry-After": "5"})
+
+    return StreamingResponse(
+        live.event_stream(request, subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ============================================
+# EXPORT - Stream Analytics Data as a File
+# ============================================
+@router.get("/export")
+async def export_analytics_data(
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    category: List[str] = Query(None),
+    metric_name: List[str] = Query(None),
+    min_value: int = None,
+    max_value: int = None,
+    start: datetime = None,
+    end: datetime = None,
+    sort: str = "recorded_at",
+    limit: int = Query(None, ge=1),
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    """
+    Download analytics data as CSV, NDJSON or Parquet.
+
+    Takes the same filters and sort as GET /analytics/data; without
+    `limit` every matching row is exported.
+
+    Rows are streamed from a server-side cursor in batches, so the first
+    bytes go out immediately and memory stays flat for any export size.
+    """
+    if format == "parquet" and exports.pyarrow is None:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow to be installed")
+
+    # Built (and validated) before streaming starts, so a bad filter is a 400
+    stmt = exports.export_statement(category, metric_name, min_value, max_value, start, end, sort, limit)
+    return StreamingResponse(
+        exports.STREAMERS[format](stmt),
+        media_type=exports.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="analytics_data.{format}"'}
+    )
 
 
 # ============================================
@@ -65,18 +387,26 @@ async def get_analytics_data(
 @router.get("/data/{data_id}", response_model=dict)
 async def get_analytics_by_id(
     data_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(deps.get_current_active_user)
 ):
     """
     Get a specific analytics record by ID.
     """
+    etag = etags.for_request(request)
+    cached = etags.not_modified(request, etag)
+    if cached is not None:
+        return cached
+
     result = await db.execute(select(models.AnalyticsData).where(models.AnalyticsData.id == data_id))
     data = result.scalars().first()
     
     if not data:
         raise HTTPException(status_code=404, detail="Analytics data not found")
     
+    etags.tag(response, etag)
     return {
         "id": data.id,
         "metric_name": data.metric_name,
@@ -101,31 +431,24 @@ async def update_analytics_data(
     """
     Update existing analytics data (Admin only).
     """
-    # Find the record
-    result = await db.execute(select(models.AnalyticsData).where(models.AnalyticsData.id == data_id))
-    data = result.scalars().first()
-    
-    if not data:
+    changes = schemas.AnalyticsChanges(metric_name=metric_name, value=value, category=category)
+
+    # Single UPDATE ... RETURNING (see bulk_edits.update_row)
+    changed = await bulk_edits.update_row(db, data_id, changes)
+    if changed is None:
         raise HTTPException(status_code=404, detail="Analytics data not found")
-    
-    # Update fields if provided
-    if metric_name is not None:
-        data.metric_name = metric_name
-    if value is not None:
-        data.value = value
-    if category is not None:
-        data.category = category
-    
-    # Save changes
     await db.commit()
-    await db.refresh(data)
+    etags.bump()
+
+    before, data = changed
+    write_hooks.after_update([(before, data)])
     
     return {
         "message": "Analytics data updated successfully",
-        "id": data.id,
-        "metric_name": data.metric_name,
-        "value": data.value,
-        "category": data.category
+        "id": data["id"],
+        "metric_name": data["metric_name"],
+        "value": data["value"],
+        "category": data["category"]
     }
 
 
@@ -141,16 +464,19 @@ async def delete_analytics_data(
     """
     Delete analytics data (Admin only).
     """
-    # Find the record
-    result = await db.execute(select(models.AnalyticsData).where(models.AnalyticsData.id == data_id))
-    data = result.scalars().first()
+    # DELETE ... RETURNING hands the rollups and hooks the removed row without a pre-read
+    table = models.AnalyticsData
+    result = await db.execute(delete(table).where(table.id == data_id).returning(*bulk_edits.COLUMNS))
+    deleted = result.mappings().first()
     
-    if not data:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Analytics data not found")
     
-    # Delete the record
-    await db.delete(data)
+    removed = await dimensions.decode(db, [deleted])
+    await rollups.retract(db, removed)
     await db.commit()
+    etags.bump()
+    write_hooks.after_delete(removed)
     
     return {
         "message": "Analytics data deleted successfully",
@@ -158,6 +484,52 @@ async def delete_analytics_data(
     }
 
 
+# ============================================
+# BULK UPDATE / DELETE - Set-Based Edits (Admin)
+# ============================================
+@router.post("/data/bulk/update", response_model=schemas.BulkEditReport)
+async def bulk_update_analytics_data(
+    body: schemas.AnalyticsBulkUpdate,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(deps.get_current_admin_user)
+):
+    """
+    Apply the same changes to every row matched by `ids` or `filter`
+    (Admin only).
+
+    Runs as one UPDATE per BULK_EDIT_CHUNK rows, each committed on its
+    own; `affected` counts the rows changed.
+    """
+    error = bulk_edits.validate(body)
+    if not error and not body.changes.model_dump(exclude_none=True):
+        error = "changes needs at least one field"
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    report = await bulk_edits.update_rows(db, body, body.changes)
+    return {"message": f"{report['affected']} analytics records updated", **report}
+
+
+@router.post("/data/bulk/delete", response_model=schemas.BulkEditReport)
+async def bulk_delete_analytics_data(
+    body: schemas.AnalyticsSelection,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(deps.get_current_admin_user)
+):
+    """
+    Delete every row matched by `ids` or `filter` (Admin only).
+
+    Runs as one DELETE ... RETURNING per BULK_EDIT_CHUNK rows, each
+    committed on its own; `affected` counts the rows removed.
+    """
+    error = bulk_edits.validate(body)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    report = await bulk_edits.delete_rows(db, body)
+    return {"message": f"{report['affected']} analytics records deleted", **report}
+
+
 # ============================================
 # BULK INSERT - Store Multiple Records
 # ============================================
@@ -170,21 +542,101 @@ async def create_bulk_analytics_data(
     """
     Store multiple analytics records at once.
     """
-    new_records = [
-        models.AnalyticsData(
-            metric_name=item.metric_name,
-            value=item.value,
-            category=item.category
-        )
+    recorded_at = datetime.now(timezone.utc)
+    rows = [
+        {
+            "metric_name": item.metric_name,
+            "value": item.value,
+            "category": item.category,
+            "recorded_at": recorded_at
+        }
         for item in data_list
     ]
     
-    if new_records:
-        db.add_all(new_records)
+    if rows:
+        # Interning, INSERT ... RETURNING and rollups in one transaction
+        await ingest.write_rows(db, rows)
         await db.commit()
+        etags.bump()
+        write_hooks.after_insert(rows)
     
     return {
-        "message": f"{len(new_records)} analytics records stored successfully",
-        "count": len(new_records)
+        "message": f"{len(rows)} analytics records stored successfully",
+        "count": len(rows)
     }
 
+
+
+# ============================================
+# STREAMING INSERT - NDJSON Ingestion
+# ============================================
+@router.post("/data/ndjson", response_model=schemas.IngestReport)
+async def ingest_ndjson_analytics_data(
+    request: Request,
+    chunk_size: int = Query(5000, ge=1, le=50000),
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    """
+    Stream newline-delimited AnalyticsCreate objects into the database.
+
+    The body is read incrementally and each chunk of `chunk_size` lines is
+    validated, written and committed on its own, so memory stays flat and
+    one bad line, including one over MAX_LINE_BYTES, only rejects itself.
+    """
+    chunks = []
+    rows = []
+    errors = []
+    line_no = 0
+    rejected = 0
+
+    async def flush():
+        nonlocal rows, errors, rejected
+        await ingest.write_rows(db, rows)
+        await db.commit()
+        etags.bump()
+        write_hooks.after_insert(rows)
+        chunks.append({
+            "chunk": len(chunks) + 1,
+            "accepted": len(rows),
+            "rejected": rejected,
+            "errors": errors
+        })
+        rows, errors, rejected = [], [], 0
+
+    def reject(error: str):
+        nonlocal rejected
+        rejected += 1
+        if len(errors) < 10:
+            errors.append({"line": line_no, "error": error})
+
+    async for line in ingest.iter_lines(request.stream()):
+        line_no += 1
+        if line is None:
+            reject(f"Line exceeds {ingest.MAX_LINE_BYTES} bytes")
+        elif not line.strip():
+            continue
+        else:
+            try:
+                item = schemas.AnalyticsCreate.model_validate_json(line)
+            except ValidationError as e:
+                reject(e.errors()[0]["msg"])
+            else:
+                rows.append({
+                    "metric_name": item.metric_name,
+                    "value": item.value,
+                    "category": item.category,
+                    "recorded_at": datetime.now(timezone.utc)
+                })
+
+        if len(rows) + rejected >= chunk_size:
+            await flush()
+
+    if rows or rejected:
+        await flush()
+
+    return {
+        "accepted": sum(c["accepted"] for c in chunks),
+        "rejected": sum(c["rejected"] for c in chunks),
+        "chunks": chunks
+    }
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-import models, schemas, auth, database
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+import uuid
+import models, schemas, auth, database, deps
 import logging
 
 # Configure logging
@@ -31,9 +34,9 @@ async def register(user: schemas.UserCreate, db: AsyncSession = Depends(database
         if not password:
             raise HTTPException(status_code=400, detail="Password cannot be empty")
 
-        hashed_password = auth.get_password_hash(password)
+        hashed_password = await auth.get_password_hash_async(password)
 
-        new_user = models.User(
+        values = dict(
             email=user.email,
             hashed_password=hashed_password,
             full_name=user.full_name,
@@ -43,9 +46,14 @@ async def register(user: schemas.UserCreate, db: AsyncSession = Depends(database
         )
         
         logger.info("Saving to database...")
-        db.add(new_user)
-        await db.commit()
-        await db.refresh(new_user)
+        # INSERT ... RETURNING loads id/created_at without a refresh
+        # SELECT; the unique email index settles a race with the check above
+        try:
+            new_user = await db.scalar(insert(models.User).values(**values).returning(models.User))
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="Email already registered")
         
         logger.info(f"User {user.email} registered successfully")
         return new_user
@@ -58,6 +66,33 @@ async def register(user: schemas.UserCreate, db: AsyncSession = Depends(database
 
 
 
+async def issue_tokens(db: AsyncSession, user: models.User, family_id: Optional[str] = None) -> dict:
+    """
+    Access token plus a new refresh token in `family_id` (a new family at
+    login). Commits the caller's transaction.
+    """
+    now = datetime.now(timezone.utc)
+    refresh_token = auth.create_refresh_token()
+    db.add(models.RefreshToken(
+        user_id=user.id,
+        family_id=family_id or uuid.uuid4().hex,
+        token_hash=auth.hash_refresh_token(refresh_token),
+        expires_at=now + timedelta(days=auth.REFRESH_TOKEN_EXPIRE_DAYS)
+    ))
+    await db.commit()
+
+    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = auth.create_access_token(
+        data={"sub": user.email}, expires_delta=access_token_expires
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": int(access_token_expires.total_seconds())
+    }
+
+
 @router.post("/token", response_model=schemas.Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
@@ -66,16 +101,98 @@ async def login_for_access_token(
     result = await db.execute(select(models.User).where(models.User.email == form_data.username))
     user = result.scalars().first()
     
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    if not user or not await auth.verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+
+    # Housekeeping on the (rare) login path: drop this user's dead tokens
+    await db.execute(delete(models.RefreshToken).where(
+        models.RefreshToken.user_id == user.id,
+        models.RefreshToken.expires_at < datetime.now(timezone.utc)
+    ))
+    return await issue_tokens(db, user)
+
+
+# ============================================
+# REFRESH - Rotate a Refresh Token
+# ============================================
+@router.post("/token/refresh", response_model=schemas.Token)
+async def refresh_access_token(body: schemas.RefreshRequest, db: AsyncSession = Depends(database.get_db)):
+    """
+    Trade a refresh token for a new access token and a new refresh token.
+
+    One HMAC and an indexed lookup instead of bcrypt. Each refresh token
+    works once: presenting an already rotated one (later than
+    REFRESH_REUSE_GRACE_SECONDS after its rotation) means it leaked, so
+    its whole family is revoked and the user must log in.
+    """
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    token_hash = auth.hash_refresh_token(body.refresh_token)
+    now = datetime.now(timezone.utc)
+    table = models.RefreshToken
+
+    # Conditional update: of two concurrent redemptions only one matches
+    result = await db.execute(
+        update(table)
+        .where(
+            table.token_hash == token_hash,
+            table.rotated_at.is_(None),
+            table.revoked_at.is_(None),
+            table.expires_at > now
+        )
+        .values(rotated_at=now)
+        .returning(table.user_id, table.family_id)
+    )
+    redeemed = result.first()
+    if redeemed is None:
+        # Rotated a moment ago is a concurrent refresh (two tabs), not a replay
+        token = (await db.execute(select(table).where(
+            table.token_hash == token_hash,
+            table.rotated_at < now - timedelta(seconds=auth.REFRESH_REUSE_GRACE_SECONDS),
+            table.revoked_at.is_(None)
+        ))).scalars().first()
+        if token is not None:
+            logger.warning(f"Refresh token reuse for user {token.user_id}; revoking family {token.family_id}")
+            await db.execute(
+                update(table)
+                .where(table.family_id == token.family_id, table.revoked_at.is_(None))
+                .values(revoked_at=now)
+            )
+            await db.commit()
+        raise invalid
+
+    user_id, family_id = redeemed
+    user = await db.get(models.User, user_id)
+    if user is None or not user.is_active:
+        await db.rollback()
+        raise invalid
+    return await issue_tokens(db, user, family_id)
+
+
+@router.post("/token/revoke")
+async def revoke_refresh_token(body: schemas.RefreshRequest, db: AsyncSession = Depends(database.get_db)):
+    """Log out: revoke the refresh token and every token rotated from the same login."""
+    table = models.RefreshToken
+    token_hash = auth.hash_refresh_token(body.refresh_token)
+    family_id = (await db.execute(select(table.family_id).where(table.token_hash == token_hash))).scalar()
+    if family_id is not None:
+        await db.execute(
+            update(table)
+            .where(table.family_id == family_id, table.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc))
+        )
+        await db.commit()
+    # Same answer for unknown tokens, so the endpoint cannot probe them
+    return {"message": "Refresh token revoked"}
+
 
+@router.get("/auth/hashing/stats", dependencies=[Depends(deps.get_current_admin_user)])
+async def read_hashing_stats():
+    return auth.get_hash_stats()
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-import models, schemas, deps, database, auth
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timezone
+import models, schemas, deps, database, auth, pagination, user_cache, fast_json
 
 router = APIRouter(
     prefix="/users",
@@ -19,31 +21,79 @@ async def update_user_me(
     db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(deps.get_current_active_user)
 ):
-    if user_update.full_name is not None:
-        current_user.full_name = user_update.full_name
-    if user_update.bio is not None:
-        current_user.bio = user_update.bio
-    if user_update.email is not None:
+    old_email = current_user.email
+    values = user_update.model_dump(include={"full_name", "bio"}, exclude_none=True)
+    if user_update.email is not None and user_update.email != old_email:
         # Check if email is already taken
-        if user_update.email != current_user.email:
-            result = await db.execute(select(models.User).where(models.User.email == user_update.email))
-            if result.scalars().first():
-                raise HTTPException(status_code=400, detail="Email already registered")
-            current_user.email = user_update.email
+        result = await db.execute(select(models.User.id).where(models.User.email == user_update.email))
+        if result.first():
+            raise HTTPException(status_code=400, detail="Email already registered")
+        values["email"] = user_update.email
     if user_update.password is not None:
-        current_user.hashed_password = auth.get_password_hash(user_update.password)
-    
-    await db.commit()
-    await db.refresh(current_user)
-    return current_user
+        values["hashed_password"] = await auth.get_password_hash_async(user_update.password)
+        # Sessions started with the old password must log in again
+        await db.execute(
+            update(models.RefreshToken)
+            .where(models.RefreshToken.user_id == current_user.id, models.RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc))
+        )
+    if not values:
+        return current_user
+
+    # UPDATE ... RETURNING hands back the stored row, so no refresh SELECT.
+    # current_user may be a shared cached copy and is never edited in place.
+    try:
+        user = await db.scalar(
+            update(models.User)
+            .where(models.User.id == current_user.id)
+            .values(**values)
+            .returning(models.User)
+            .execution_options(populate_existing=True)
+        )
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email already registered")
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user_cache.invalidate(old_email)
+    user_cache.invalidate(user.email)
+    return user
+
+@router.get("/cache/stats", dependencies=[Depends(deps.get_current_admin_user)])
+async def read_user_cache_stats():
+    return user_cache.users.stats()
+
+@router.post("/cache/invalidate", dependencies=[Depends(deps.get_current_admin_user)])
+async def invalidate_user_cache(email: str = None):
+    """Drop one cached user (or all of them) after out-of-band changes such as admin scripts."""
+    if email:
+        user_cache.invalidate(email)
+    else:
+        user_cache.clear()
+    return {"message": "User cache invalidated", "email": email}
 
 @router.get("/", response_model=List[schemas.UserOut], dependencies=[Depends(deps.get_current_admin_user)])
 async def read_users(
+    response: Response,
     skip: int = 0, 
     limit: int = 100,
+    cursor: str = None,
     db: AsyncSession = Depends(database.get_db)
 ):
-    result = await db.execute(select(models.User).offset(skip).limit(limit))
-    users = result.scalars().all()
-    return users
-
+    table = models.User
+    stmt = select(table.email, table.full_name, table.bio, table.role, table.id, table.is_active, table.created_at)
+    if cursor:
+        # Keyset seek on the primary key; skip is ignored in cursor mode
+        (last_id,) = pagination.decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        stmt = stmt.where(models.User.id > last_id)
+    else:
+        stmt = stmt.offset(skip)
+    # Column tuples rendered by fast_json, without ORM instances or UserOut validation
+    result = await db.execute(stmt.order_by(models.User.id).limit(limit))
+    users = [row._asdict() for row in result.all()]
+    if users:
+        pagination.set_next_cursor(response, users, limit, users[-1]["id"])
+    return fast_json.response(users, response)
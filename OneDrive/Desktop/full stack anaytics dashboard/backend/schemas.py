@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class UserBase(BaseModel):
@@ -32,6 +32,11 @@ class UserOut(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     email: Optional[str] = None
@@ -50,3 +55,103 @@ class AnalyticsOut(AnalyticsBase):
 
     class Config:
         from_attributes = True
+
+class CategorySummary(BaseModel):
+    category: Optional[str] = None
+    count: int
+    avg_value: float
+    max_value: Optional[int] = None
+
+class AnalyticsSummary(BaseModel):
+    total_records: int
+    unique_categories: int
+    avg_value: float
+    max_value: Optional[int] = None
+    top_categories: List[CategorySummary]
+
+class TimeseriesPoint(BaseModel):
+    bucket_start: datetime
+    count: int
+    sum: int
+    min: Optional[int] = None
+    max: Optional[int] = None
+    avg: float
+
+class QuantileValue(BaseModel):
+    q: float
+    value: Optional[float] = None
+
+class MetricQuantiles(BaseModel):
+    metric_name: str
+    category: Optional[str] = None
+    count: int
+    relative_accuracy: float
+    quantiles: List[QuantileValue]
+
+class HeavyHitter(BaseModel):
+    name: str
+    count: int
+    error: int
+    guaranteed: bool
+
+class TopReport(BaseModel):
+    total: int
+    capacity: int
+    categories: List[HeavyHitter]
+    metric_names: List[HeavyHitter]
+
+class CatalogEntry(BaseModel):
+    name: str
+    count: int
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
+
+class Catalog(BaseModel):
+    categories: List[CatalogEntry]
+    metric_names: List[CatalogEntry]
+
+class AnalyticsFilter(BaseModel):
+    category: Optional[str] = None
+    metric_name: Optional[str] = None
+    min_value: Optional[int] = None
+    max_value: Optional[int] = None
+    # recorded_at in [start, end)
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+class AnalyticsSelection(BaseModel):
+    """Rows to edit: an id list or a filter, not both."""
+    ids: Optional[List[int]] = None
+    filter: Optional[AnalyticsFilter] = None
+
+class AnalyticsChanges(BaseModel):
+    metric_name: Optional[str] = None
+    value: Optional[int] = None
+    category: Optional[str] = None
+
+class AnalyticsBulkUpdate(AnalyticsSelection):
+    changes: AnalyticsChanges
+
+class BulkEditReport(BaseModel):
+    message: str
+    affected: int
+    chunks: int
+
+class IngestError(BaseModel):
+    line: int
+    error: str
+
+class IngestChunk(BaseModel):
+    chunk: int
+    accepted: int
+    rejected: int
+    errors: List[IngestError]
+
+class IngestReport(BaseModel):
+    accepted: int
+    rejected: int
+    chunks: List[IngestChunk]
+
+class IngestAccepted(BaseModel):
+    message: str
+    queued: int
@@ -0,0 +1,67 @@
+"""
+Multi-worker launcher
+
+Prepares the database once, then starts uvicorn with several worker
+processes so requests use every core:
+
+    python serve.py --workers 4 --port 8000
+
+Before any worker starts, the launcher converts a legacy analytics_data
+layout (migrate_dimensions), creates missing tables and records the schema
+version (database.init_db), and creates the upcoming PostgreSQL partitions.
+Workers then start with SCHEMA_INIT=skip and touch no DDL.
+
+Workers share cached state through the cache_invalidations table
+(invalidation.py): ETags and cached users stay consistent whichever worker
+serves a request. The in-memory stores that only see their own worker's
+writes (columnar summary, heavy hitters, catalog, live stream) are turned
+off unless set explicitly, so every worker answers from SQL instead.
+"""
+import argparse
+import asyncio
+import os
+
+# Stores fed by in-process write hooks would drift apart between workers
+PER_WORKER_STORES = ("COLUMNAR_ENABLED", "HEAVY_HITTERS_ENABLED", "CATALOG_ENABLED", "LIVE_ENABLED")
+
+
+async def prepare():
+    import database
+    import models  # registers the tables on Base.metadata
+    import partitions
+    from migrate_dimensions import migrate_dimensions
+
+    await migrate_dimensions()
+    await database.init_db()
+    async with database.engine.begin() as conn:
+        created = await partitions.ensure_partitions(conn)
+    if created:
+        print(f"Created partitions: {', '.join(created)}")
+    await database.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    # Read by every worker: > 1 makes workers publish their invalidations
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    if args.workers > 1:
+        for name in PER_WORKER_STORES:
+            os.environ.setdefault(name, "false")
+
+    print("Preparing database schema...")
+    asyncio.run(prepare())
+    os.environ["SCHEMA_INIT"] = "skip"
+
+    import uvicorn
+    print(f"Starting {args.workers} worker(s) on {args.host}:{args.port}")
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
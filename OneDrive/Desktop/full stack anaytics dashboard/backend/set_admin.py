@@ -6,6 +6,7 @@ from sqlalchemy import select
 from models import User, UserRole
 from database import engine
 from auth import get_password_hash
+import invalidation
 
 async def set_primary_admin():
     try:
@@ -38,6 +39,9 @@ async def set_primary_admin():
                 session.add(user)
                 print("Created new admin account.")
             
+            # Running servers drop their cached copy of this user
+            await invalidation.publish_from(session, "user", target_email)
+
             # Commit changes
             await session.commit()
             print(f"Successfully configured {target_email} as ADMIN.")
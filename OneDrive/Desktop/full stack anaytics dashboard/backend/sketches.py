@@ -0,0 +1,313 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, tuple_
+import asyncio
+import json
+import logging
+import math
+import os
+from dotenv import load_dotenv
+import models, database, rollups, write_hooks
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SKETCHES_ENABLED = os.getenv("SKETCHES_ENABLED", "true").lower() == "true"
+SKETCH_RELATIVE_ACCURACY = float(os.getenv("SKETCH_RELATIVE_ACCURACY", 0.01))
+SKETCH_FLUSH_INTERVAL_SECONDS = float(os.getenv("SKETCH_FLUSH_INTERVAL_SECONDS", 10))
+
+# One sketch per (hour, metric_name, category); ranges merge whole hours
+BUCKET_WIDTH = timedelta(hours=1)
+
+# Row-value IN lists are chunked to stay under SQLite's variable limit
+FLUSH_CHUNK = 250
+
+
+class DDSketch:
+    """
+    Mergeable quantile sketch with a relative-error guarantee (DDSketch).
+
+    Each value lands in the logarithmic bin ceil(log_gamma(|v|)), so any
+    quantile is returned within `relative_accuracy` of the true value.
+    Bins only hold counts: merging adds them and removing a value
+    subtracts one, which is what lets updates and deletes be undone.
+    """
+
+    def __init__(self, relative_accuracy: float = SKETCH_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero = 0
+
+    @property
+    def count(self) -> int:
+        return self.zero + sum(self.positive.values()) + sum(self.negative.values())
+
+    def _key(self, magnitude: float) -> int:
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        # Midpoint of bin (gamma^(k-1), gamma^k] in relative terms
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, weight: int = 1):
+        if value > 0:
+            bins, key = self.positive, self._key(value)
+        elif value < 0:
+            bins, key = self.negative, self._key(-value)
+        else:
+            self.zero += weight
+            return
+        bins[key] = bins.get(key, 0) + weight
+
+    def merge(self, other: "DDSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in theirs.items():
+                mine[key] = mine.get(key, 0) + count
+        self.zero += other.zero
+
+    def compact(self):
+        """Drop bins emptied by removals."""
+        self.positive = {k: c for k, c in self.positive.items() if c > 0}
+        self.negative = {k: c for k, c in self.negative.items() if c > 0}
+        self.zero = max(0, self.zero)
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.count
+        if total <= 0:
+            return None
+        rank = q * (total - 1)
+
+        seen = 0
+        # Ascending value order: most negative first, then zero, then positive
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "alpha": self.relative_accuracy,
+            "zero": self.zero,
+            "positive": self.positive,
+            "negative": self.negative,
+        }, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, payload: str) -> "DDSketch":
+        data = json.loads(payload)
+        sketch = cls(data["alpha"])
+        sketch.zero = data["zero"]
+        sketch.positive = {int(k): c for k, c in data["positive"].items()}
+        sketch.negative = {int(k): c for k, c in data["negative"].items()}
+        return sketch
+
+
+Key = Tuple[datetime, str, str]
+
+
+def bucket_key(row: dict) -> Key:
+    return (rollups.floor_time(row["recorded_at"], BUCKET_WIDTH), row["metric_name"], row["category"])
+
+
+class SketchStore:
+    """
+    Pending per-bucket sketch deltas, flushed into analytics_sketches.
+
+    Writes only touch the in-memory delta for their bucket; a background
+    task merges deltas into the persisted rows every
+    SKETCH_FLUSH_INTERVAL_SECONDS. Reads merge persisted rows with the
+    deltas still waiting, so answers never lag the write path.
+    """
+
+    def __init__(self, flush_interval: float = SKETCH_FLUSH_INTERVAL_SECONDS):
+        self.flush_interval = flush_interval
+        self.pending: Dict[Key, DDSketch] = {}
+        # Deltas swapped out by a flush that has not committed yet
+        self.flushing: Dict[Key, DDSketch] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def _apply(self, rows: Iterable[dict], weight: int):
+        for row in rows:
+            if row.get("value") is None or row.get("recorded_at") is None:
+                continue
+            key = bucket_key(row)
+            sketch = self.pending.get(key)
+            if sketch is None:
+                sketch = self.pending[key] = DDSketch()
+            sketch.add(row["value"], weight)
+
+    def unflushed(self):
+        yield from self.flushing.items()
+        yield from self.pending.items()
+
+    # write_hooks listeners
+    def on_insert(self, rows: List[dict]):
+        self._apply(rows, 1)
+
+    def on_update(self, changes: List[tuple]):
+        self._apply([before for before, _ in changes], -1)
+        self._apply([after for _, after in changes], 1)
+
+    def on_delete(self, rows: List[dict]):
+        self._apply(rows, -1)
+
+    async def flush(self):
+        if not self.pending:
+            return
+        # Swap first so writes during the flush start a fresh delta
+        pending, self.pending = self.pending, {}
+        self.flushing = pending
+        try:
+            async with database.AsyncSessionLocal() as session:
+                # Workers merging into the same row must not overwrite each other
+                await database.exclusive(session, "sketches")
+                await merge_into_table(session, pending)
+                await session.commit()
+            self.flushing = {}
+        except Exception as e:
+            logger.error(f"Sketch flush failed, will retry: {str(e)}")
+            self.flushing = {}
+            for key, sketch in pending.items():
+                current = self.pending.get(key)
+                if current is None:
+                    self.pending[key] = sketch
+                else:
+                    sketch.merge(current)
+                    self.pending[key] = sketch
+
+    async def _run(self):
+        # Woken early by stop(), never cancelled mid-flush
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+async def merge_into_table(db: AsyncSession, deltas: Dict[Key, DDSketch]):
+    """Fold sketch deltas into analytics_sketches inside the caller's transaction."""
+    table = models.AnalyticsSketch
+    keys = list(deltas)
+    for offset in range(0, len(keys), FLUSH_CHUNK):
+        chunk = keys[offset:offset + FLUSH_CHUNK]
+        result = await db.execute(
+            select(table).where(tuple_(table.bucket_start, table.metric_name, table.category).in_(chunk))
+        )
+        existing = {(rollups.as_utc(r.bucket_start), r.metric_name, r.category): r for r in result.scalars()}
+
+        for key in chunk:
+            row = existing.get(key)
+            sketch = deltas[key]
+            if row is not None:
+                merged = DDSketch.from_json(row.sketch)
+                merged.merge(sketch)
+                merged.compact()
+                row.sketch = merged.to_json()
+                row.record_count = merged.count
+            else:
+                # Copy so a failed flush can put the untouched delta back
+                fresh = DDSketch(sketch.relative_accuracy)
+                fresh.merge(sketch)
+                fresh.compact()
+                db.add(table(
+                    bucket_start=key[0],
+                    metric_name=key[1],
+                    category=key[2],
+                    record_count=fresh.count,
+                    sketch=fresh.to_json()
+                ))
+
+
+async def quantiles(
+    db: AsyncSession,
+    metric_name: str,
+    qs: List[float],
+    category: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> dict:
+    """
+    Merge the hourly sketches covering [start, end) and read quantiles.
+
+    Bounds are widened to whole hours; no analytics_data row is read.
+    """
+    table = models.AnalyticsSketch
+    stmt = select(table.sketch).where(table.metric_name == metric_name)
+    if category:
+        stmt = stmt.where(table.category == category)
+    if start:
+        stmt = stmt.where(table.bucket_start >= rollups.floor_time(start, BUCKET_WIDTH))
+    if end:
+        stmt = stmt.where(table.bucket_start < rollups.as_utc(end))
+
+    merged = DDSketch()
+    for payload in (await db.execute(stmt)).scalars():
+        merged.merge(DDSketch.from_json(payload))
+
+    if store is not None:
+        for (bucket_start, name, bucket_category), delta in store.unflushed():
+            if name != metric_name or (category and bucket_category != category):
+                continue
+            if start and bucket_start < rollups.floor_time(start, BUCKET_WIDTH):
+                continue
+            if end and bucket_start >= rollups.as_utc(end):
+                continue
+            merged.merge(delta)
+    merged.compact()
+
+    return {
+        "metric_name": metric_name,
+        "category": category,
+        "count": merged.count,
+        "relative_accuracy": merged.relative_accuracy,
+        "quantiles": [{"q": q, "value": merged.quantile(q)} for q in qs]
+    }
+
+
+store: Optional[SketchStore] = None
+
+
+async def start():
+    """Subscribe the sketch store to analytics writes and start flushing."""
+    global store
+    if not SKETCHES_ENABLED:
+        return
+    store = SketchStore()
+    write_hooks.insert_hooks.append(store.on_insert)
+    write_hooks.update_hooks.append(store.on_update)
+    write_hooks.delete_hooks.append(store.on_delete)
+    await store.start()
+
+
+async def stop():
+    if store is not None:
+        await store.stop()
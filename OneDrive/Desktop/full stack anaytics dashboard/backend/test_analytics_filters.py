@@ -0,0 +1,149 @@
+"""
+Filter checks for GET /analytics/data, /analytics/summary and /analytics/export
+
+Each endpoint builds its WHERE clause from analytics_query.criteria.
+These checks cover the recorded_at bounds, which may arrive with or
+without a UTC offset, that the summary counts the rows the list returns,
+and that an export returns exactly the rows the list endpoint does for
+the same filters and sort:
+
+    python test_analytics_filters.py
+
+Runs in-process against a fresh SQLite file; needs httpx.
+"""
+import os
+import tempfile
+
+# Set before database.py is imported
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'filters.db')}"
+os.environ["DB_ECHO"] = "false"
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+import httpx
+import auth
+import database
+import ingest
+import models
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+ADMIN_EMAIL = "filters@example.com"
+ADMIN_PASSWORD = "filters-password"
+
+# One row per hour through 2024-01-01 and 2024-01-02 (UTC)
+DAY = datetime(2024, 1, 1, tzinfo=timezone.utc)
+ROWS = [
+    {"metric_name": f"metric_{i % 2}", "value": i, "category": ("web", "mobile", "api")[i % 3],
+     "recorded_at": DAY + timedelta(hours=i)}
+    for i in range(48)
+]
+
+
+def hours(response) -> list:
+    return sorted(row["value"] for row in response.json())
+
+
+async def check(client: httpx.AsyncClient, headers: dict):
+    # One bound with an offset, one without: both read as UTC
+    mixed = await client.get(
+        "/analytics/data",
+        params={"start": "2024-01-01T00:00:00Z", "end": "2024-01-02T00:00:00", "limit": 100},
+        headers=headers
+    )
+    assert mixed.status_code == 200, f"offset start, naive end: {mixed.status_code} {mixed.text}"
+    assert hours(mixed) == list(range(24)), "offset start, naive end"
+
+    mixed = await client.get(
+        "/analytics/data",
+        params={"start": "2024-01-01T06:00:00", "end": "2024-01-01T12:00:00+00:00", "limit": 100},
+        headers=headers
+    )
+    assert mixed.status_code == 200, f"naive start, offset end: {mixed.status_code} {mixed.text}"
+    assert hours(mixed) == list(range(6, 12)), "naive start, offset end"
+
+    # A non-UTC offset is converted, not compared as wall-clock time
+    shifted = await client.get(
+        "/analytics/data",
+        params={"start": "2024-01-01T02:00:00+02:00", "end": "2024-01-01T05:00:00", "limit": 100},
+        headers=headers
+    )
+    assert hours(shifted) == list(range(0, 5)), "+02:00 start"
+
+    backwards = await client.get(
+        "/analytics/data",
+        params={"start": "2024-01-01T01:00:00+00:00", "end": "2024-01-01T02:00:00+02:00"},
+        headers=headers
+    )
+    assert backwards.status_code == 400, "end before start across offsets"
+
+    # The summary counts the rows the list returns for the same bounds
+    for bounds in ({"start": "2024-01-01T12:00:00+05:00"}, {"category": "web", "end": "2024-01-01T12:00:00+05:00"}):
+        listed = await client.get("/analytics/data", params={**bounds, "limit": 100}, headers=headers)
+        summary = await client.get("/analytics/summary", params=bounds, headers=headers)
+        assert summary.status_code == 200, f"summary {bounds}: {summary.status_code} {summary.text}"
+        assert summary.json()["total_records"] == len(listed.json()), f"summary vs list for {bounds}"
+    backwards = await client.get(
+        "/analytics/summary", params={"start": "2024-01-01T10:00:00", "end": "2024-01-01T12:00:00+05:00"}, headers=headers
+    )
+    assert backwards.status_code == 400, "summary with end before start"
+
+    # Export and list agree on the same filters and sort
+    params = [
+        ("category", "web"), ("category", "api"), ("metric_name", "metric_0"),
+        ("min_value", 4), ("start", "2024-01-01T03:00:00Z"), ("end", "2024-01-02T12:00:00"),
+        ("sort", "-value"),
+    ]
+    listed = await client.get("/analytics/data", params=params + [("limit", 100)], headers=headers)
+    exported = await client.get("/analytics/export", params=params + [("format", "ndjson")], headers=headers)
+    assert exported.status_code == 200, f"export: {exported.status_code} {exported.text}"
+    exported_ids = [json.loads(line)["id"] for line in exported.text.splitlines()]
+    assert exported_ids == [row["id"] for row in listed.json()], "export matches GET /analytics/data"
+    assert exported_ids, "export filters matched rows"
+
+    limited = await client.get("/analytics/export", params=params + [("format", "ndjson"), ("limit", 3)], headers=headers)
+    assert [json.loads(line)["id"] for line in limited.text.splitlines()] == exported_ids[:3], "export limit"
+
+    bad_sort = await client.get("/analytics/export", params={"sort": "category"}, headers=headers)
+    assert bad_sort.status_code == 400, "export rejects an unknown sort"
+
+
+async def check_filters():
+    import main
+
+    # Startup creates the schema
+    await main.app.router.startup()
+    try:
+        async with database.AsyncSessionLocal() as session:
+            session.add(models.User(
+                email=ADMIN_EMAIL, hashed_password=auth.get_password_hash(ADMIN_PASSWORD),
+                role=models.UserRole.ADMIN, is_active=True
+            ))
+            await ingest.write_rows(session, [dict(row) for row in ROWS])
+            await session.commit()
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://filters") as client:
+            token = (await client.post("/token", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})).json()
+            await check(client, {"Authorization": f"Bearer {token['access_token']}"})
+    finally:
+        await main.app.router.shutdown()
+
+
+def test_filters():
+    asyncio.run(check_filters())
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, check_fn in list(globals().items()):
+        if name.startswith("test_") and callable(check_fn):
+            try:
+                check_fn()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    raise SystemExit(1 if failures else 0)
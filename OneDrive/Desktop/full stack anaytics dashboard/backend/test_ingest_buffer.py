@@ -0,0 +1,110 @@
+"""
+Write-behind buffer checks
+
+Rows queued by POST /analytics/data were already answered with 202, so
+a failed batch write must be retried rather than dropped. These checks
+make the database write fail on purpose and count what reaches the
+table:
+
+    python test_ingest_buffer.py
+
+Runs against a fresh SQLite file.
+"""
+import os
+import tempfile
+
+# Set before database.py is imported
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'ingest_buffer.db')}"
+os.environ["DB_ECHO"] = "false"
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import delete, func, select
+import database
+import ingest
+import models
+
+logging.getLogger("ingest").setLevel(logging.CRITICAL + 1)
+
+
+def rows(count: int) -> list:
+    return [
+        {"metric_name": "flush_test", "value": i, "category": "buffer", "recorded_at": datetime.now(timezone.utc)}
+        for i in range(count)
+    ]
+
+
+async def stored() -> int:
+    async with database.AsyncSessionLocal() as session:
+        return (await session.execute(select(func.count()).select_from(models.AnalyticsData))).scalar()
+
+
+async def run_buffer(failures: int, retry_attempts: int, count: int = 25) -> ingest.WriteBehindBuffer:
+    """Queue `count` rows through a buffer whose first `failures` writes raise."""
+    async with database.engine.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+        await conn.execute(delete(models.AnalyticsData))
+
+    real_write_rows = ingest.write_rows
+    calls = 0
+
+    async def flaky_write_rows(db, batch):
+        nonlocal calls
+        calls += 1
+        # Fail after the INSERT, so a retry must cope with a rolled-back transaction
+        await real_write_rows(db, batch)
+        if calls <= failures:
+            raise RuntimeError("database is locked")
+
+    buffer = ingest.WriteBehindBuffer(
+        max_size=100, batch_size=10, flush_interval=0.01,
+        retry_attempts=retry_attempts, retry_backoff=0.01
+    )
+    ingest.write_rows = flaky_write_rows
+    try:
+        await buffer.start()
+        for row in rows(count):
+            assert buffer.enqueue(row), "queue accepted the row"
+        await asyncio.sleep(0.5)
+        await buffer.stop()
+    finally:
+        ingest.write_rows = real_write_rows
+    return buffer
+
+
+async def check_first_flush_fails():
+    buffer = await run_buffer(failures=1, retry_attempts=3)
+    assert await stored() == 25, f"rows stored after one failed flush: {await stored()}"
+    stats = buffer.get_stats()
+    assert stats["flushed"] == 25 and stats["failed"] == 0, f"stats: {stats}"
+    assert stats["retries"] == 1, f"one retry: {stats}"
+
+
+async def check_retries_run_out():
+    buffer = await run_buffer(failures=3, retry_attempts=3, count=10)
+    stats = buffer.get_stats()
+    # One batch of ten exhausted its three attempts and was dropped
+    assert stats["failed"] == 10 and stats["retries"] == 2, f"stats: {stats}"
+    assert await stored() == 0, "a dropped batch leaves nothing half-written"
+
+
+def test_first_flush_fails():
+    asyncio.run(check_first_flush_fails())
+
+
+def test_retries_run_out():
+    asyncio.run(check_retries_run_out())
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, check in list(globals().items()):
+        if name.startswith("test_") and callable(check):
+            try:
+                check()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    raise SystemExit(1 if failures else 0)
@@ -0,0 +1,163 @@
+"""
+Checks under DB_PROFILE=sqlite-production
+
+That profile splits a session across one writer connection and a pool of
+query_only readers, which cannot see a transaction's uncommitted rows.
+These checks run the write paths that read back what they just wrote:
+
+    python test_production_profile.py
+
+Runs in-process against a fresh SQLite file; needs httpx.
+"""
+import os
+import tempfile
+
+# Set before database.py is imported
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'production.db')}"
+os.environ["DB_PROFILE"] = "sqlite-production"
+os.environ["DB_ECHO"] = "false"
+
+import asyncio
+import logging
+import sqlite3
+from datetime import datetime, timedelta, timezone
+import httpx
+from sqlalchemy import event, select
+import auth
+import bulk_edits
+import database
+import dimensions
+import ingest
+import models
+import schemas
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+ADMIN_EMAIL = "production@example.com"
+ADMIN_PASSWORD = "production-password"
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+async def rollup_categories() -> set:
+    table = models.AnalyticsRollupMinute
+    async with database.AsyncSessionLocal() as session:
+        return set((await session.execute(select(table.category).distinct())).scalars())
+
+
+async def check_new_names(client: httpx.AsyncClient, headers: dict, ids: list):
+    # A category no transaction has committed yet: interned and decoded in one go
+    response = await client.put(f"/analytics/data/{ids[0]}", params={"category": "brand_new"}, headers=headers)
+    assert response.status_code == 200, f"PUT new category: {response.status_code} {response.text}"
+    assert response.json()["category"] == "brand_new", f"PUT decoded: {response.json()}"
+
+    response = await client.post(
+        "/analytics/data/bulk/update", json={"ids": ids[1:5], "changes": {"category": "bulk_new", "metric_name": "m_new"}},
+        headers=headers
+    )
+    assert response.status_code == 200, f"bulk update new names: {response.status_code} {response.text}"
+    assert {"brand_new", "bulk_new"} <= await rollup_categories(), "rollups carry the new names"
+
+    # Committed ids were promoted to the shared cache
+    assert "brand_new" in dimensions.categories.ids and "m_new" in dimensions.metrics.ids, "fresh ids promoted"
+
+
+async def check_rolled_back_names():
+    async with database.AsyncSessionLocal() as session:
+        await dimensions.categories.id_for(session, "never_committed")
+        await session.rollback()
+        assert "never_committed" not in dimensions.categories.ids, "rolled-back id kept in the cache"
+        assert not session.info.get(dimensions.FRESH_KEY), "rolled-back ids kept in the session"
+
+
+async def check_read_your_writes(ids: list):
+    table = models.AnalyticsData
+    async with database.AsyncSessionLocal() as session:
+        await session.execute(table.__table__.update().where(table.id == ids[9]).values(value=-1))
+        # Uncommitted, so only the writer connection has it
+        value = (await session.execute(select(table.value).where(table.id == ids[9]))).scalar()
+        assert value == -1, f"read after write in one transaction: {value}"
+        await session.rollback()
+
+        # A new transaction reads from a reader again
+        value = (await session.execute(select(table.value).where(table.id == ids[9]))).scalar()
+        assert value == 9, f"read after rollback: {value}"
+        assert session.sync_session.get_bind(clause=select(table.id)) is database.read_engine.sync_engine, "unpinned"
+
+
+def write_locked() -> bool:
+    path = database.engine.url.database
+    try:
+        sqlite3.connect(path, timeout=0, isolation_level=None).execute("BEGIN IMMEDIATE").connection.rollback()
+    except sqlite3.OperationalError:
+        return True
+    return False
+
+
+async def check_locked_before_image(ids: list):
+    # The PUT's before-image is read on the writer, already holding the write lock
+    reads = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT") and "FROM analytics_data" in statement:
+            reads.append((conn.engine is database.engine.sync_engine, write_locked()))
+
+    event.listen(database.read_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(database.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        async with database.AsyncSessionLocal() as session:
+            changed = await bulk_edits.update_row(session, ids[8], schemas.AnalyticsChanges(value=80))
+            await session.commit()
+    finally:
+        event.remove(database.read_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        event.remove(database.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    assert changed[0]["value"] == 8 and changed[1]["value"] == 80, f"before/after: {changed}"
+    assert reads == [(True, True)], f"before-image reads (on writer, locked): {reads}"
+
+
+async def check_production_profile():
+    import main
+
+    # Startup creates the schema
+    await main.app.router.startup()
+    try:
+        async with database.AsyncSessionLocal() as session:
+            session.add(models.User(
+                email=ADMIN_EMAIL, hashed_password=auth.get_password_hash(ADMIN_PASSWORD),
+                role=models.UserRole.ADMIN, is_active=True
+            ))
+            rows = [
+                {"metric_name": "metric", "value": i, "category": "web", "recorded_at": START + timedelta(minutes=i)}
+                for i in range(10)
+            ]
+            await ingest.write_rows(session, rows)
+            await session.commit()
+        ids = [row["id"] for row in rows]
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://production") as client:
+            token = (await client.post("/token", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})).json()
+            headers = {"Authorization": f"Bearer {token['access_token']}"}
+            await check_new_names(client, headers, ids)
+        await check_rolled_back_names()
+        await check_read_your_writes(ids)
+        await check_locked_before_image(ids)
+    finally:
+        await main.app.router.shutdown()
+
+
+def test_production_profile():
+    asyncio.run(check_production_profile())
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, check in list(globals().items()):
+        if name.startswith("test_") and callable(check):
+            try:
+                check()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    raise SystemExit(1 if failures else 0)
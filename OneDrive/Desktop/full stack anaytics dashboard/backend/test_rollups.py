@@ -0,0 +1,202 @@
+"""
+Rollup maintenance checks
+
+The minute/hour/day rollup tables must always agree with analytics_data.
+These checks write through the same paths the API uses, inserts as well
+as single-row and bulk updates and deletes, and compare the rollups with
+the raw rows regrouped:
+
+    python test_rollups.py
+
+Runs in-process against a fresh SQLite file; needs httpx.
+"""
+import os
+import tempfile
+
+# Set before database.py is imported
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'rollups.db')}"
+os.environ["DB_ECHO"] = "false"
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+import httpx
+from sqlalchemy import delete, func, select
+import auth
+import database
+import ingest
+import models
+import rollups
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+ADMIN_EMAIL = "rollups@example.com"
+ADMIN_PASSWORD = "rollups-password"
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+async def reset():
+    async with database.engine.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+        await conn.execute(delete(models.AnalyticsData))
+        for table, _ in rollups.ROLLUPS:
+            await conn.execute(delete(table))
+
+
+async def rollup_totals(session) -> dict:
+    totals = {}
+    for table, _ in rollups.ROLLUPS:
+        count, value_sum, buckets = (await session.execute(
+            select(func.sum(table.record_count), func.sum(table.value_sum), func.count())
+        )).one()
+        totals[table.__tablename__] = (count or 0, value_sum or 0, buckets)
+    return totals
+
+
+async def check_many_distinct_keys():
+    await reset()
+    # 50,000 distinct minute buckets: seven values each is far past SQLite's
+    # 32,766 variables for a single statement
+    rows = [
+        {"metric_name": f"metric_{i % 7}", "value": i, "category": f"cat_{i % 3}",
+         "recorded_at": START + timedelta(minutes=i)}
+        for i in range(50_000)
+    ]
+    async with database.AsyncSessionLocal() as session:
+        await ingest.write_rows(session, rows)
+        await session.commit()
+
+        totals = await rollup_totals(session)
+    expected_sum = sum(range(50_000))
+    minute = totals[models.AnalyticsRollupMinute.__tablename__]
+    assert minute == (50_000, expected_sum, 50_000), f"minute rollup: {minute}"
+    for name, (count, value_sum, _) in totals.items():
+        assert (count, value_sum) == (50_000, expected_sum), f"{name}: {count}, {value_sum}"
+
+
+def test_many_distinct_keys():
+    asyncio.run(check_many_distinct_keys())
+
+
+async def assert_rollups_match_raw(session, step: str):
+    table = models.AnalyticsData
+    raw = [
+        row._asdict() for row in
+        await session.execute(select(table.metric_name, table.value, table.category, table.recorded_at))
+    ]
+    for rollup, width in rollups.ROLLUPS:
+        expected = {
+            key: (bucket["record_count"], bucket["value_sum"], bucket["value_min"], bucket["value_max"])
+            for key, bucket in rollups._buckets(raw, width).items()
+        }
+        stored = {
+            (rollups.as_utc(r.bucket_start), r.metric_name, r.category): (r.record_count, r.value_sum, r.value_min, r.value_max)
+            for r in (await session.execute(select(rollup))).scalars()
+        }
+        assert stored == expected, f"{rollup.__tablename__} after {step}: " + str(
+            sorted((key, stored.get(key), expected.get(key)) for key in stored.keys() ^ expected.keys()
+                   or [k for k in expected if stored[k] != expected[k]])[:5]
+        )
+
+
+async def check_edits_keep_rollups(client: httpx.AsyncClient, headers: dict):
+    await reset()
+    # Ten rows per minute over a few minutes, two metrics, two categories
+    rows = [
+        {"metric_name": f"metric_{i % 2}", "value": i, "category": ("web", "mobile")[i // 2 % 2],
+         "recorded_at": START + timedelta(seconds=6 * i)}
+        for i in range(40)
+    ]
+    async with database.AsyncSessionLocal() as session:
+        await ingest.write_rows(session, rows)
+        await session.commit()
+        await assert_rollups_match_raw(session, "insert")
+    ids = [row["id"] for row in rows]
+
+    async def edit(step: str, method: str, url: str, **kwargs):
+        response = await client.request(method, url, headers=headers, **kwargs)
+        assert response.status_code == 200, f"{step}: {response.status_code} {response.text}"
+        async with database.AsyncSessionLocal() as session:
+            await assert_rollups_match_raw(session, step)
+
+    # Removing a bucket's min and its max forces a recompute
+    await edit("PUT value", "PUT", f"/analytics/data/{ids[0]}", params={"value": 1000})
+    await edit("PUT category", "PUT", f"/analytics/data/{ids[1]}", params={"category": "api", "metric_name": "metric_9"})
+    await edit("DELETE", "DELETE", f"/analytics/data/{ids[2]}")
+    await edit("bulk update by ids", "POST", "/analytics/data/bulk/update",
+               json={"ids": ids[3:12], "changes": {"value": -5}})
+    await edit("bulk update by filter", "POST", "/analytics/data/bulk/update",
+               json={"filter": {"category": "mobile", "min_value": 20}, "changes": {"category": "web"}})
+    await edit("bulk delete by filter", "POST", "/analytics/data/bulk/delete",
+               json={"filter": {"metric_name": "metric_1", "max_value": 30}})
+
+    # The timeseries (rollups) and the summary (raw rows) count the same rows
+    series = (await client.get("/analytics/timeseries", params={"step": "1d"}, headers=headers)).json()
+    summary = (await client.get("/analytics/summary", headers=headers)).json()
+    assert sum(point["count"] for point in series) == summary["total_records"], "timeseries vs summary"
+
+    # A filter bound with a non-UTC offset is converted, not read as wall-clock time
+    await reset()
+    rows = [
+        {"metric_name": "hourly", "value": i, "category": "web", "recorded_at": START + timedelta(hours=i)}
+        for i in range(24)
+    ]
+    async with database.AsyncSessionLocal() as session:
+        await ingest.write_rows(session, rows)
+        await session.commit()
+    ids = [row["id"] for row in rows]
+    response = await client.post(
+        "/analytics/data/bulk/delete", json={"filter": {"end": "2024-01-01T12:00:00+05:00"}}, headers=headers
+    )
+    assert response.json()["affected"] == 7, f"delete before 07:00Z: {response.json()}"
+    async with database.AsyncSessionLocal() as session:
+        await assert_rollups_match_raw(session, "bulk delete before an offset bound")
+    backwards = await client.post(
+        "/analytics/data/bulk/update",
+        json={"filter": {"start": "2024-01-01T10:00:00Z", "end": "2024-01-01T12:00:00+05:00"}, "changes": {"value": 0}},
+        headers=headers
+    )
+    assert backwards.status_code == 400, "bulk filter with end before start"
+
+    await edit("bulk delete by ids", "POST", "/analytics/data/bulk/delete", json={"ids": ids})
+    series = (await client.get("/analytics/timeseries", params={"step": "1d"}, headers=headers)).json()
+    assert series == [], f"timeseries after deleting every row: {series}"
+
+
+async def check_edits():
+    import main
+
+    # Startup creates the schema
+    await main.app.router.startup()
+    try:
+        async with database.AsyncSessionLocal() as session:
+            session.add(models.User(
+                email=ADMIN_EMAIL, hashed_password=auth.get_password_hash(ADMIN_PASSWORD),
+                role=models.UserRole.ADMIN, is_active=True
+            ))
+            await session.commit()
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://rollups") as client:
+            token = (await client.post("/token", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})).json()
+            await check_edits_keep_rollups(client, {"Authorization": f"Bearer {token['access_token']}"})
+    finally:
+        await main.app.router.shutdown()
+
+
+def test_edits_keep_rollups():
+    asyncio.run(check_edits())
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, check in list(globals().items()):
+        if name.startswith("test_") and callable(check):
+            try:
+                check()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    raise SystemExit(1 if failures else 0)
@@ -0,0 +1,170 @@
+"""
+Schema conformance for the fast list endpoints
+
+GET /analytics/data and GET /users/ render Core rows with fast_json instead
+of validating ORM instances through their response_model. These checks
+build the response the response_model path would have produced and
+require byte-identical output, with orjson and with the stdlib fallback:
+
+    python test_schema_conformance.py
+
+Runs in-process against a fresh SQLite file; needs httpx.
+"""
+import os
+import tempfile
+
+# Set before database.py is imported
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'conformance.db')}"
+os.environ["DB_ECHO"] = "false"
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List
+import httpx
+from pydantic import TypeAdapter
+from sqlalchemy import select
+import auth
+import database
+import fast_json
+import ingest
+import models
+import schemas
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+ADMIN_EMAIL = "conformance@example.com"
+ADMIN_PASSWORD = "conformance-password"
+
+analytics_adapter = TypeAdapter(List[schemas.AnalyticsOut])
+users_adapter = TypeAdapter(List[schemas.UserOut])
+
+
+def reference(adapter: TypeAdapter, items) -> bytes:
+    """What FastAPI renders for `items` through a response_model."""
+    data = adapter.dump_python(adapter.validate_python(items), mode="json")
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def both_encoders(check):
+    """Run `check` with orjson (when installed) and with the stdlib fallback."""
+    installed = fast_json.orjson
+    try:
+        for encoder in ([installed] if installed else []) + [None]:
+            fast_json.orjson = encoder
+            check("orjson" if encoder else "stdlib")
+    finally:
+        fast_json.orjson = installed
+
+
+def test_analytics_rows_match_response_model():
+    rows = [
+        {"metric_name": "page_views", "value": 0, "category": "web",
+         "id": 1, "recorded_at": datetime(2024, 1, 1)},
+        {"metric_name": "latência_ms", "value": -42, "category": 'say "hi"\n\t\\',
+         "id": 2, "recorded_at": datetime(2024, 1, 1, 12, 30, 5, 123456, tzinfo=timezone.utc)},
+        {"metric_name": "emoji 📈", "value": 2 ** 53, "category": "</script> ",
+         "id": 3, "recorded_at": datetime(2024, 6, 1, 8, tzinfo=timezone(timedelta(hours=2)))},
+    ]
+
+    def check(encoder: str):
+        assert fast_json.dumps(rows) == reference(analytics_adapter, rows), f"analytics rows ({encoder})"
+
+    both_encoders(check)
+
+
+def test_user_rows_match_response_model():
+    rows = [
+        {"email": "a@example.com", "full_name": None, "bio": None, "role": models.UserRole.ADMIN,
+         "id": 1, "is_active": True, "created_at": datetime(2024, 1, 1, 0, 0, 0)},
+        {"email": "b@example.com", "full_name": "Zoë Ünicode", "bio": "line\nbreak", "role": models.UserRole.VIEWER,
+         "id": 2, "is_active": False, "created_at": datetime(2024, 2, 29, 23, 59, 59, 999999, tzinfo=timezone.utc)},
+    ]
+
+    def check(encoder: str):
+        assert fast_json.dumps(rows) == reference(users_adapter, rows), f"user rows ({encoder})"
+
+    both_encoders(check)
+
+
+async def check_endpoints():
+    import main
+
+    # Startup creates the schema
+    await main.app.router.startup()
+    try:
+        async with database.AsyncSessionLocal() as session:
+            session.add(models.User(
+                email=ADMIN_EMAIL, hashed_password=auth.get_password_hash(ADMIN_PASSWORD),
+                full_name="Conformance Ädmin", role=models.UserRole.ADMIN, is_active=True
+            ))
+            session.add(models.User(email="viewer@example.com", hashed_password="x", role=models.UserRole.VIEWER, is_active=True))
+            now = datetime.now(timezone.utc)
+            await ingest.write_rows(session, [
+                {"metric_name": f"metric_{i % 3}", "value": i * 7, "category": ("web", "mobile", "ÿ \"quoted\"")[i % 3],
+                 "recorded_at": now - timedelta(minutes=i)}
+                for i in range(25)
+            ])
+            await session.commit()
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://conformance") as client:
+            token = (await client.post("/token", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})).json()
+            headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+            async with database.AsyncSessionLocal() as session:
+                table = models.AnalyticsData
+                orm_rows = (await session.execute(
+                    select(table).order_by(table.recorded_at, table.id)
+                )).scalars().all()
+                orm_users = (await session.execute(select(models.User).order_by(models.User.id))).scalars().all()
+
+            for encoder in ([fast_json.orjson] if fast_json.orjson else []) + [None]:
+                installed, fast_json.orjson = fast_json.orjson, encoder
+                try:
+                    # Two pages: the first ends in a cursor the second resumes from
+                    first = await client.get("/analytics/data", params={"limit": 10}, headers=headers)
+                    assert first.status_code == 200
+                    assert first.headers["content-type"] == "application/json"
+                    assert first.content == reference(analytics_adapter, orm_rows[:10]), "GET /analytics/data"
+                    assert first.headers.get("etag") and first.headers.get("x-next-cursor")
+
+                    second = await client.get(
+                        "/analytics/data", params={"limit": 10, "cursor": first.headers["x-next-cursor"]}, headers=headers
+                    )
+                    assert second.content == reference(analytics_adapter, orm_rows[10:20]), "cursor page"
+
+                    filtered = await client.get("/analytics/data", params={"category": "web"}, headers=headers)
+                    web = [row for row in orm_rows if row.category == "web"]
+                    assert filtered.content == reference(analytics_adapter, web), "category filter"
+
+                    cached = await client.get(
+                        "/analytics/data", params={"limit": 10}, headers={**headers, "If-None-Match": first.headers["etag"]}
+                    )
+                    assert cached.status_code == 304
+
+                    users = await client.get("/users/", headers=headers)
+                    assert users.status_code == 200
+                    assert users.content == reference(users_adapter, orm_users), "GET /users/"
+                finally:
+                    fast_json.orjson = installed
+    finally:
+        await main.app.router.shutdown()
+
+
+def test_endpoints_match_response_model():
+    asyncio.run(check_endpoints())
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, check in list(globals().items()):
+        if name.startswith("test_") and callable(check):
+            try:
+                check()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    raise SystemExit(1 if failures else 0)
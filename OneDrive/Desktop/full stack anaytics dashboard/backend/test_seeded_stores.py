@@ -0,0 +1,154 @@
+"""
+Seeding checks for the in-memory stores (catalog, heavy hitters, live
+counters, columnar snapshot)
+
+Each store is seeded from analytics_data at startup while writes keep
+committing. These checks insert, update and delete rows in the middle of
+seeding, then compare every store with the table itself:
+
+    python test_seeded_stores.py
+
+Runs against a fresh SQLite file; the columnar check needs numpy.
+"""
+import os
+import tempfile
+
+# Set before database.py is imported
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'seeded.db')}"
+# WAL, so a seed's read snapshot never holds up the writes made during it
+os.environ["DB_PROFILE"] = "sqlite-production"
+os.environ["DB_ECHO"] = "false"
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, func, select, update
+import catalog
+import columnar
+import database
+import dimensions
+import heavy_hitters
+import ingest
+import live
+import models
+import write_hooks
+
+logging.getLogger().setLevel(logging.WARNING)
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def rows(first: int, count: int) -> list:
+    return [
+        {"metric_name": f"metric_{i % 3}", "value": i, "category": ("web", "mobile", "api")[i % 3],
+         "recorded_at": START + timedelta(minutes=i)}
+        for i in range(first, first + count)
+    ]
+
+
+async def write_during_seed():
+    """What other requests commit while a store is seeding, fired through the hooks."""
+    table = models.AnalyticsData
+    async with database.AsyncSessionLocal() as session:
+        added = rows(100, 5)
+        await ingest.write_rows(session, added)
+
+        old = (await session.execute(select(table.id, table.metric_name, table.value, table.category, table.recorded_at)
+                                     .order_by(table.id).limit(2))).mappings().all()
+        edited, removed = dict(old[0]), dict(old[1])
+        category_id = await dimensions.categories.id_for(session, "desktop")
+        await session.execute(update(table).where(table.id == edited["id"]).values(category_id=category_id, value=-1))
+        await session.execute(delete(table).where(table.id == removed["id"]))
+        await session.commit()
+
+    write_hooks.after_insert(added)
+    write_hooks.after_update([(edited, {**edited, "category": "desktop", "value": -1})])
+    write_hooks.after_delete([removed])
+
+
+async def check_store(store):
+    # The writes land after the store read max_id, before its seed query
+    seed = store.seed
+
+    async def seed_with_writes(session, max_id):
+        await write_during_seed()
+        await seed(session, max_id)
+
+    store.seed = seed_with_writes
+    store.register()
+    try:
+        await store.load()
+    finally:
+        for hooks in (write_hooks.insert_hooks, write_hooks.update_hooks,
+                      write_hooks.delete_hooks, write_hooks.expire_hooks):
+            hooks.clear()
+
+
+async def reset():
+    async with database.engine.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+        await conn.execute(delete(models.AnalyticsData))
+    async with database.AsyncSessionLocal() as session:
+        await ingest.write_rows(session, rows(0, 30))
+        await session.commit()
+
+
+async def truth() -> dict:
+    table = models.AnalyticsData
+    async with database.AsyncSessionLocal() as session:
+        total, value_sum = (await session.execute(select(func.count(table.id), func.sum(table.value)))).one()
+        stmt, _ = heavy_hitters.grouped_counts("category")
+        categories = dict((await session.execute(stmt)).all())
+        listing = await catalog.sql_catalog(session)
+    return {"total": total, "value_sum": value_sum, "categories": categories, "catalog": listing}
+
+
+async def check_seeding():
+    await reset()
+    store = catalog.Catalog()
+    await check_store(store)
+    expected = await truth()
+    # Counts are exact; the time bounds may stay wider after an update or delete
+    counts = lambda listing: {field: {e["name"]: e["count"] for e in entries} for field, entries in listing.items()}
+    assert counts(store.snapshot()) == counts(expected["catalog"]), f"catalog: {store.snapshot()}"
+
+    await reset()
+    store = heavy_hitters.HeavyHitters()
+    await check_store(store)
+    expected = await truth()
+    top = store.top(10)
+    assert top["total"] == expected["total"], f"heavy hitters total: {top['total']}"
+    assert {c["name"]: c["count"] for c in top["categories"]} == expected["categories"], "heavy hitters"
+
+    await reset()
+    store = live.Broker()
+    await check_store(store)
+    expected = await truth()
+    assert (store.total_records, store.value_sum) == (expected["total"], expected["value_sum"]), "live totals"
+    assert store.categories == expected["categories"], "live categories"
+
+    if columnar.np is not None:
+        await reset()
+        store = columnar.ColumnarStore()
+        await check_store(store)
+        expected = await truth()
+        summary = store.summary(top=10)
+        assert summary["total_records"] == expected["total"], f"columnar total: {summary['total_records']}"
+        assert {c["category"]: c["count"] for c in summary["top_categories"]} == expected["categories"], "columnar"
+
+
+def test_seeding():
+    asyncio.run(check_seeding())
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, check in list(globals().items()):
+        if name.startswith("test_") and callable(check):
+            try:
+                check()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    raise SystemExit(1 if failures else 0)
@@ -0,0 +1,134 @@
+from datetime import datetime
+from typing import Callable, List, Tuple
+from sqlalchemy import select, func
+import logging
+import models, database
+
+logger = logging.getLogger(__name__)
+
+# In-process listeners notified after analytics_data writes commit.
+# Rows are dicts with id/metric_name/value/category/recorded_at. Every
+# hook takes a batch: updates
+# as (before, after) pairs, deletes as the removed rows.
+insert_hooks: List[Callable[[List[dict]], None]] = []
+update_hooks: List[Callable[[List[Tuple[dict, dict]]], None]] = []
+delete_hooks: List[Callable[[List[dict]], None]] = []
+# Retention dropped every row recorded before a cutoff; listeners get the
+# cutoff and per (metric_name, category) record_count/value_sum of what went
+expire_hooks: List[Callable[[datetime, List[dict]], None]] = []
+
+
+def _run(hooks, *args):
+    for hook in hooks:
+        try:
+            hook(*args)
+        except Exception as e:
+            # A derived structure falling behind must never fail the write
+            logger.error(f"Write hook {getattr(hook, '__qualname__', hook)} failed: {str(e)}")
+
+
+def after_insert(rows: List[dict]):
+    if rows:
+        _run(insert_hooks, rows)
+
+
+def after_update(changes: List[Tuple[dict, dict]]):
+    if changes:
+        _run(update_hooks, changes)
+
+
+def after_delete(rows: List[dict]):
+    if rows:
+        _run(delete_hooks, rows)
+
+
+def after_expire(before: datetime, groups: List[dict]):
+    _run(expire_hooks, before, groups)
+
+
+class SeededStore:
+    """
+    Base for an in-memory structure seeded from analytics_data at startup
+    and kept current by these hooks.
+
+    Subclasses implement seed(), which reads only rows with id <= max_id,
+    and the _insert/_update/_delete/_expire handlers. max_id and the seed
+    are read in one snapshot; writes whose hooks fire meanwhile are queued
+    and replayed once it is in place, except inserts at or below max_id,
+    which the seed already has. Queued expiries are skipped as well, since
+    the seed normally ran after the retention DELETE, unless the handler
+    is idempotent (replay_expire).
+    """
+
+    replay_expire = False
+
+    def __init__(self):
+        self.ready = False
+        self._pending: List[tuple] = []
+
+    def register(self):
+        insert_hooks.append(self.on_insert)
+        update_hooks.append(self.on_update)
+        delete_hooks.append(self.on_delete)
+        expire_hooks.append(self.on_expire)
+
+    async def seed(self, session, max_id: int):
+        raise NotImplementedError
+
+    def _insert(self, rows: List[dict]):
+        raise NotImplementedError
+
+    def _update(self, changes: List[Tuple[dict, dict]]):
+        raise NotImplementedError
+
+    def _delete(self, rows: List[dict]):
+        raise NotImplementedError
+
+    def _expire(self, before: datetime, groups: List[dict]):
+        raise NotImplementedError
+
+    # Hook listeners
+    def on_insert(self, rows: List[dict]):
+        if not self.ready:
+            self._pending.append(("insert", rows))
+            return
+        self._insert(rows)
+
+    def on_update(self, changes: List[Tuple[dict, dict]]):
+        if not self.ready:
+            self._pending.append(("update", changes))
+            return
+        self._update(changes)
+
+    def on_delete(self, rows: List[dict]):
+        if not self.ready:
+            self._pending.append(("delete", rows))
+            return
+        self._delete(rows)
+
+    def on_expire(self, before: datetime, groups: List[dict]):
+        if not self.ready:
+            self._pending.append(("expire", (before, groups)))
+            return
+        self._expire(before, groups)
+
+    async def load(self) -> int:
+        """Seed from the rows up to the current max id, then replay writes made meanwhile."""
+        table = models.AnalyticsData
+        async with database.AsyncSessionLocal() as session:
+            await database.read_snapshot(session)
+            max_id = (await session.execute(select(func.max(table.id)))).scalar() or 0
+            await self.seed(session, max_id)
+
+        self.ready = True
+        for kind, payload in self._pending:
+            if kind == "insert":
+                self._insert([row for row in payload if row["id"] > max_id])
+            elif kind == "update":
+                self._update(payload)
+            elif kind == "delete":
+                self._delete(payload)
+            elif self.replay_expire:
+                self._expire(*payload)
+        self._pending = []
+        return max_id
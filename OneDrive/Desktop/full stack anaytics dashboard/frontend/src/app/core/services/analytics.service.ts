@@ -1,5 +1,5 @@
 import { Injectable } from '@angular/core';
-import { HttpClient, HttpHeaders } from '@angular/common/http';
+import { HttpClient, HttpHeaders, HttpParams } from '@angular/common/http';
 import { Observable } from 'rxjs';
 
 // ============================================
@@ -22,6 +22,65 @@ export interface AnalyticsResponse {
     recorded_at?: string;
 }
 
+export interface CategorySummary {
+    category: string;
+    count: number;
+    avg_value: number;
+    max_value?: number;
+}
+
+export interface AnalyticsSummary {
+    total_records: number;
+    unique_categories: number;
+    avg_value: number;
+    max_value?: number;
+    top_categories: CategorySummary[];
+}
+
+export interface CatalogEntry {
+    name: string;
+    count: number;
+    first_seen?: string;
+    last_seen?: string;
+}
+
+export interface AnalyticsCatalog {
+    categories: CatalogEntry[];
+    metric_names: CatalogEntry[];
+}
+
+export type AnalyticsSort = 'recorded_at' | '-recorded_at' | 'value' | '-value';
+
+export interface AnalyticsQuery {
+    categories?: string[];
+    metricNames?: string[];
+    minValue?: number;
+    maxValue?: number;
+    start?: string;
+    end?: string;
+    sort?: AnalyticsSort;
+    limit?: number;
+}
+
+export interface LiveSummary {
+    total_records: number;
+    unique_categories: number;
+    avg_value: number;
+    categories: { [category: string]: number };
+}
+
+export interface LiveEvent {
+    type: 'snapshot' | 'insert' | 'update' | 'delete' | 'expire' | 'dropped';
+    records?: AnalyticsData[];
+    ids?: number[];
+    count?: number;
+    summary?: LiveSummary;
+    total_records?: number;
+    unique_categories?: number;
+    avg_value?: number;
+    categories?: { [category: string]: number };
+}
+
 @Injectable({
     providedIn: 'root'
 })
@@ -123,6 +182,190 @@ export class AnalyticsService {
         );
     }
 
+    // ============================================
+    // READ - Filtered and Sorted Analytics Data
+    // ============================================
+    /**
+     * Rows matching every given filter, filtered and sorted by the server
+     *
+     * Example usage:
+     * this.analyticsService.queryAnalyticsData({ metricNames: ['cpu', 'ram'], minValue: 50, sort: '-value' })
+     *   .subscribe(rows => console.log('Matches:', rows.length));
+     */
+    queryAnalyticsData(query: AnalyticsQuery): Observable<AnalyticsData[]> {
+        const params = this.queryParams(query).set('limit', query.limit ?? 100);
+
+        return this.http.get<AnalyticsData[]>(
+            `${this.apiUrl}/data`,
+            { headers: this.getHeaders(), params }
+        );
+    }
+
+    /**
+     * Filter and sort parameters shared by /data and /export
+     */
+    private queryParams(query: AnalyticsQuery): HttpParams {
+        let params = new HttpParams();
+
+        for (const category of query.categories ?? []) {
+            params = params.append('category', category);
+        }
+        for (const metricName of query.metricNames ?? []) {
+            params = params.append('metric_name', metricName);
+        }
+        if (query.minValue != null) {
+            params = params.set('min_value', query.minValue);
+        }
+        if (query.maxValue != null) {
+            params = params.set('max_value', query.maxValue);
+        }
+        if (query.start) {
+            params = params.set('start', query.start);
+        }
+        if (query.end) {
+            params = params.set('end', query.end);
+        }
+        if (query.sort) {
+            params = params.set('sort', query.sort);
+        }
+        return params;
+    }
+
+    // ============================================
+    // READ - Get Aggregated Summary
+    // ============================================
+    /**
+     * Get server-side totals and top categories for the dashboard
+     *
+     * Example usage:
+     * this.analyticsService.getAnalyticsSummary()
+     *   .subscribe(summary => console.log('Total:', summary.total_records));
+     */
+    getAnalyticsSummary(category?: string): Observable<AnalyticsSummary> {
+        let params: any = {};
+
+        if (category) {
+            params.category = category;
+        }
+
+        return this.http.get<AnalyticsSummary>(
+            `${this.apiUrl}/summary`,
+            {
+                headers: this.getHeaders(),
+                params: params
+            }
+        );
+    }
+
+    // ============================================
+    // READ - Category and Metric Name Catalog
+    // ============================================
+    /**
+     * Every category and metric name with row counts and first/last seen,
+     * for filter dropdowns and input suggestions
+     *
+     * Example usage:
+     * this.analyticsService.getCatalog()
+     *   .subscribe(catalog => console.log(catalog.categories.map(c => c.name)));
+     */
+    getCatalog(): Observable<AnalyticsCatalog> {
+        return this.http.get<AnalyticsCatalog>(
+            `${this.apiUrl}/catalog`,
+            { headers: this.getHeaders() }
+        );
+    }
+
+    // ============================================
+    // READ - Live Stream of Analytics Writes
+    // ============================================
+    /**
+     * Server-sent events for every committed write, starting with a snapshot
+     *
+     * Uses fetch instead of EventSource so the JWT goes in the
+     * Authorization header; unsubscribing closes the connection.
+     *
+     * Example usage:
+     * this.analyticsService.streamAnalytics()
+     *   .subscribe(event => console.log(event.type, event.summary));
+     */
+    streamAnalytics(): Observable<LiveEvent> {
+        return new Observable<LiveEvent>(observer => {
+            const controller = new AbortController();
+            const token = localStorage.getItem('access_token');
+
+            fetch(`${this.apiUrl}/stream`, {
+                headers: { 'Authorization': `Bearer ${token}`, 'Accept': 'text/event-stream' },
+                signal: controller.signal
+            }).then(async response => {
+                if (!response.ok || !response.body) {
+                    throw new Error(`Stream failed: ${response.status}`);
+                }
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+
+                while (true) {
+                    const { done, value } = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, { stream: true });
+
+                    // Events are separated by a blank line
+                    let boundary;
+                    while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+                        const chunk = buffer.slice(0, boundary);
+                        buffer = buffer.slice(boundary + 2);
+
+                        let type = 'message';
+                        let data = '';
+                        for (const line of chunk.split('\n')) {
+                            if (line.startsWith('event:')) type = line.slice(6).trim();
+                            else if (line.startsWith('data:')) data += line.slice(5).trim();
+                        }
+                        if (data) {
+                            observer.next({ type, ...JSON.parse(data) } as LiveEvent);
+                        }
+                    }
+                }
+                observer.complete();
+            }).catch(err => {
+                if (!controller.signal.aborted) observer.error(err);
+            });
+
+            return () => controller.abort();
+        });
+    }
+
+    // ============================================
+    // EXPORT - Download Analytics Data as a File
+    // ============================================
+    /**
+     * Download every row matching the query (all rows by default),
+     * streamed by the server; filters and sort work as in queryAnalyticsData
+     *
+     * Example usage:
+     * this.analyticsService.exportAnalyticsData('csv', { categories: ['web'], sort: '-value' })
+     *   .subscribe(blob => saveBlob(blob));
+     */
+    exportAnalyticsData(
+        format: 'csv' | 'ndjson' | 'parquet' = 'csv',
+        query: AnalyticsQuery = {}
+    ): Observable<Blob> {
+        let params = this.queryParams(query).set('format', format);
+
+        if (query.limit != null) {
+            params = params.set('limit', query.limit);
+        }
+
+        return this.http.get(
+            `${this.apiUrl}/export`,
+            {
+                headers: this.getHeaders(),
+                params: params,
+                responseType: 'blob'
+            }
+        );
+    }
+
     // ============================================
     // READ - Get Single Analytics Data by ID
     // ============================================
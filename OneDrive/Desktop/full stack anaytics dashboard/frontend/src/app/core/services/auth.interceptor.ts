@@ -0,0 +1,38 @@
+import { inject } from '@angular/core';
+import { HttpErrorResponse, HttpInterceptorFn } from '@angular/common/http';
+import { Router } from '@angular/router';
+import { catchError, switchMap, throwError } from 'rxjs';
+import { AuthService } from './auth.service';
+
+/**
+ * On a 401 from the API, trade the refresh token for a new access token
+ * and retry the request once. Only when the refresh itself fails does the
+ * user have to log in again.
+ */
+export const authRefreshInterceptor: HttpInterceptorFn = (req, next) => {
+    const authService = inject(AuthService);
+    const router = inject(Router);
+
+    // Login, refresh and revoke answer 401 for bad credentials; never retry them
+    if (req.url.includes('/token')) {
+        return next(req);
+    }
+
+    return next(req).pipe(
+        catchError((error: HttpErrorResponse) => {
+            if (error.status !== 401 || !authService.hasRefreshToken()) {
+                return throwError(() => error);
+            }
+            return authService.refresh().pipe(
+                catchError(refreshError => {
+                    authService.logout();
+                    router.navigate(['/auth/login']);
+                    return throwError(() => refreshError);
+                }),
+                switchMap(response => next(req.clone({
+                    setHeaders: { Authorization: `Bearer ${response.access_token}` }
+                })))
+            );
+        })
+    );
+};
@@ -1,6 +1,6 @@
 import { Injectable } from '@angular/core';
 import { HttpClient } from '@angular/common/http';
-import { Observable, tap, map } from 'rxjs';
+import { Observable, tap, map, finalize, shareReplay } from 'rxjs';
 
 export interface User {
     id?: number;
@@ -14,6 +14,8 @@ export interface User {
 export interface AuthResponse {
     access_token: string;
     token_type: string;
+    refresh_token?: string;
+    expires_in?: number;
 }
 
 @Injectable({
@@ -21,6 +23,7 @@ export interface AuthResponse {
 })
 export class AuthService {
     private apiUrl = 'http://localhost:8000';
+    private refreshInFlight: Observable<AuthResponse> | null = null;
 
     constructor(private http: HttpClient) { }
 
@@ -39,16 +42,52 @@ export class AuthService {
         formData.append('password', credentials.password);
 
         return this.http.post<AuthResponse>(`${this.apiUrl}/token`, formData).pipe(
-            tap(response => {
-                if (response.access_token) {
-                    localStorage.setItem('access_token', response.access_token);
-                }
-            })
+            tap(response => this.storeTokens(response))
         );
     }
 
+    /**
+     * Swap the refresh token for a new token pair without re-entering the
+     * password. Concurrent callers share one request, since each refresh
+     * token can be redeemed only once.
+     */
+    refresh(): Observable<AuthResponse> {
+        if (!this.refreshInFlight) {
+            const refreshToken = localStorage.getItem('refresh_token');
+            this.refreshInFlight = this.http.post<AuthResponse>(`${this.apiUrl}/token/refresh`, {
+                refresh_token: refreshToken
+            }).pipe(
+                tap(response => this.storeTokens(response)),
+                finalize(() => this.refreshInFlight = null),
+                shareReplay(1)
+            );
+        }
+        return this.refreshInFlight;
+    }
+
+    hasRefreshToken(): boolean {
+        return !!localStorage.getItem('refresh_token');
+    }
+
+    private storeTokens(response: AuthResponse) {
+        if (response.access_token) {
+            localStorage.setItem('access_token', response.access_token);
+        }
+        if (response.refresh_token) {
+            localStorage.setItem('refresh_token', response.refresh_token);
+        }
+    }
+
     logout() {
+        const refreshToken = localStorage.getItem('refresh_token');
+        if (refreshToken) {
+            // Revoke server-side too; the local logout does not wait for it
+            this.http.post(`${this.apiUrl}/token/revoke`, { refresh_token: refreshToken }).subscribe({
+                error: () => { }
+            });
+        }
         localStorage.removeItem('access_token');
+        localStorage.removeItem('refresh_token');
     }
 
     isLoggedIn(): boolean {
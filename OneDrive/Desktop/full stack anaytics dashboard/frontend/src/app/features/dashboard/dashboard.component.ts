@@ -1,6 +1,7 @@
-import { Component, OnInit } from '@angular/core';
+import { Component, OnDestroy, OnInit } from '@angular/core';
 import { CommonModule } from '@angular/common';
-import { AnalyticsService, AnalyticsData } from '../../core/services/analytics.service';
+import { AnalyticsService, AnalyticsData, LiveEvent, LiveSummary } from '../../core/services/analytics.service';
+import { Subscription } from 'rxjs';
 import { RouterModule } from '@angular/router';
 
 @Component({
@@ -257,7 +258,7 @@ import { RouterModule } from '@angular/router';
     }
   `]
 })
-export class DashboardComponent implements OnInit {
+export class DashboardComponent implements OnInit, OnDestroy {
     totalRecords = 0;
     uniqueCategories = 0;
     avgValue = 0;
@@ -265,35 +266,99 @@ export class DashboardComponent implements OnInit {
     categoryStats: { name: string, count: number }[] = [];
     maxVal = 100;
 
+    private liveSubscription?: Subscription;
+    private reconnectTimer?: ReturnType<typeof setTimeout>;
+
     constructor(private analyticsService: AnalyticsService) { }
 
     ngOnInit() {
         this.loadDashboardData();
+        this.connectLive();
+    }
+
+    ngOnDestroy() {
+        this.liveSubscription?.unsubscribe();
+        clearTimeout(this.reconnectTimer);
+    }
+
+    /**
+     * Follow the live stream; on a drop or error, reconnect after a pause
+     * (the new snapshot resyncs the counters)
+     */
+    connectLive() {
+        this.liveSubscription?.unsubscribe();
+        this.liveSubscription = this.analyticsService.streamAnalytics().subscribe({
+            next: (event) => this.applyLiveEvent(event),
+            error: () => this.scheduleReconnect(),
+            complete: () => this.scheduleReconnect()
+        });
+    }
+
+    private scheduleReconnect() {
+        clearTimeout(this.reconnectTimer);
+        this.reconnectTimer = setTimeout(() => this.connectLive(), 3000);
+    }
+
+    private applyLiveEvent(event: LiveEvent) {
+        if (event.type === 'dropped') {
+            this.scheduleReconnect();
+            return;
+        }
+        if (event.type === 'snapshot') {
+            this.categoryStats = [];
+            this.applySummary(event as LiveSummary);
+            return;
+        }
+        if (event.summary) {
+            this.applySummary(event.summary);
+        }
+        if (event.type === 'insert' && event.records) {
+            this.recentData = [...this.recentData, ...event.records].slice(-10);
+            this.maxVal = Math.max(this.maxVal, ...event.records.map(r => r.value));
+        } else if (event.type === 'delete' && event.ids) {
+            const ids = new Set(event.ids);
+            this.recentData = this.recentData.filter(r => !ids.has(r.id || 0));
+        } else if (event.type === 'update' && event.records) {
+            const updated = new Map(event.records.map(r => [r.id, r]));
+            this.recentData = this.recentData.map(r => updated.get(r.id) || r);
+        }
+    }
+
+    /**
+     * Totals are replaced; category counts are merged since write events
+     * only carry the categories they touched (the snapshot carries all)
+     */
+    private applySummary(summary: LiveSummary) {
+        this.totalRecords = summary.total_records;
+        this.uniqueCategories = summary.unique_categories;
+        this.avgValue = summary.avg_value;
+
+        const counts = new Map(this.categoryStats.map(c => [c.name, c.count]));
+        for (const [name, count] of Object.entries(summary.categories)) {
+            if (count > 0) counts.set(name, count);
+            else counts.delete(name);
+        }
+        this.categoryStats = [...counts.entries()]
+            .map(([name, count]) => ({ name, count }))
+            .sort((a, b) => b.count - a.count)
+            .slice(0, 5);
     }
 
     loadDashboardData() {
+        this.analyticsService.getAnalyticsSummary().subscribe({
+            next: (summary) => {
+                this.totalRecords = summary.total_records;
+                this.uniqueCategories = summary.unique_categories;
+                this.avgValue = summary.avg_value;
+                this.maxVal = Math.max(summary.max_value || 0, 100);
+                this.categoryStats = summary.top_categories.map(c => ({ name: c.category, count: c.count }));
+            },
+            error: (err) => console.error('Dashboard summary failed', err)
+        });
+
         this.analyticsService.getAllAnalyticsData(0, 500).subscribe({
             next: (all) => {
-                this.totalRecords = all.length;
                 this.recentData = all.sort((a, b) => (b.id || 0) - (a.id || 0)).slice(0, 10).reverse();
-
-                if (all.length > 0) {
-                    this.uniqueCategories = new Set(all.map(d => d.category)).size;
-                    this.avgValue = all.reduce((acc, curr) => acc + curr.value, 0) / all.length;
-                    this.maxVal = Math.max(...all.map(d => d.value), 100);
-
-                    // Calculate category stats
-                    const counts: { [key: string]: number } = {};
-                    all.forEach(d => counts[d.category] = (counts[d.category] || 0) + 1);
-                    this.categoryStats = Object.keys(counts).map(name => ({ name, count: counts[name] }))
-                        .sort((a, b) => b.count - a.count)
-                        .slice(0, 5);
-                } else {
-                    this.uniqueCategories = 0;
-                    this.avgValue = 0;
-                    this.maxVal = 100;
-                    this.categoryStats = [];
-                }
             },
             error: (err) => console.error('Dashboard load failed', err)
         });
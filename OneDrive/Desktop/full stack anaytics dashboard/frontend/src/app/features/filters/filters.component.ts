@@ -1,10 +1,12 @@
-import { Component } from '@angular/core';
+import { Component, OnInit } from '@angular/core';
 import { CommonModule } from '@angular/common';
+import { FormsModule } from '@angular/forms';
+import { AnalyticsService, AnalyticsCatalog, AnalyticsData, AnalyticsQuery, AnalyticsSort } from '../../core/services/analytics.service';
 
 @Component({
     selector: 'app-filters',
     standalone: true,
-    imports: [CommonModule],
+    imports: [CommonModule, FormsModule],
     template: `
     <div class="filters-container">
       <h2>Filters & Insights</h2>
@@ -13,30 +15,67 @@ import { CommonModule } from '@angular/common';
         <div class="controls">
           <div class="control-group">
             <label>Date Range</label>
-            <select>
-              <option>Last 7 Days</option>
-              <option>Last 30 Days</option>
-              <option>Year to Date</option>
+            <select [(ngModel)]="range">
+              <option value="">All Time</option>
+              <option value="7">Last 7 Days</option>
+              <option value="30">Last 30 Days</option>
+              <option value="ytd">Year to Date</option>
             </select>
           </div>
           <div class="control-group">
-            <label>Region</label>
-            <select>
-              <option>All Regions</option>
-              <option>North America</option>
-              <option>Europe</option>
-              <option>Asia</option>
+            <label>Category</label>
+            <select [(ngModel)]="category">
+              <option value="">All Categories</option>
+              <option *ngFor="let c of catalog?.categories" [value]="c.name">{{c.name}} ({{c.count}})</option>
             </select>
           </div>
           <div class="control-group">
-            <label>Device Type</label>
-            <div class="checkboxes">
-              <label><input type="checkbox" checked> Desktop</label>
-              <label><input type="checkbox" checked> Mobile</label>
-            </div>
+            <label>Metric</label>
+            <select [(ngModel)]="metricName">
+              <option value="">All Metrics</option>
+              <option *ngFor="let m of catalog?.metric_names" [value]="m.name">{{m.name}} ({{m.count}})</option>
+            </select>
+          </div>
+          <div class="control-group">
+            <label>Min Value</label>
+            <input type="number" [(ngModel)]="minValue" placeholder="Any">
+          </div>
+          <div class="control-group">
+            <label>Max Value</label>
+            <input type="number" [(ngModel)]="maxValue" placeholder="Any">
+          </div>
+          <div class="control-group">
+            <label>Sort By</label>
+            <select [(ngModel)]="sort">
+              <option value="-recorded_at">Newest First</option>
+              <option value="recorded_at">Oldest First</option>
+              <option value="-value">Highest Value</option>
+              <option value="value">Lowest Value</option>
+            </select>
           </div>
         </div>
-        <button class="btn-primary">Apply Filters</button>
+        <button class="btn-primary" (click)="applyFilters()" [disabled]="loading">
+          {{ loading ? 'Filtering...' : 'Apply Filters' }}
+        </button>
+        <div class="error-msg" *ngIf="error">{{error}}</div>
+      </div>
+
+      <div class="results-card" *ngIf="results">
+        <h3>{{results.length}} matching record(s)</h3>
+        <table *ngIf="results.length">
+          <thead>
+            <tr><th>ID</th><th>Metric</th><th>Category</th><th>Value</th><th>Date</th></tr>
+          </thead>
+          <tbody>
+            <tr *ngFor="let item of results">
+              <td>#{{item.id}}</td>
+              <td>{{item.metric_name}}</td>
+              <td>{{item.category}}</td>
+              <td>{{item.value}}</td>
+              <td>{{item.recorded_at | date:'medium'}}</td>
+            </tr>
+          </tbody>
+        </table>
       </div>
 
       <div class="insights-grid">
@@ -97,7 +136,7 @@ import { CommonModule } from '@angular/common';
         margin-bottom: $spacing-sm;
       }
 
-      select {
+      select, input {
         width: 100%;
         padding: $spacing-md;
         background: rgba(0,0,0,0.2);
@@ -123,6 +162,30 @@ import { CommonModule } from '@angular/common';
       }
     }
 
+    .error-msg { color: $error; margin-top: $spacing-md; font-size: 14px; }
+
+    .results-card {
+      @include glass;
+      padding: $spacing-lg;
+      border-radius: $radius-lg;
+      overflow-x: auto;
+
+      h3 { font-size: $font-size-lg; margin-bottom: $spacing-md; }
+
+      table {
+        width: 100%;
+        border-collapse: collapse;
+
+        th, td {
+          padding: $spacing-sm $spacing-md;
+          text-align: left;
+          border-bottom: 1px solid rgba(255,255,255,0.05);
+        }
+
+        th { color: $text-secondary; font-weight: 500; font-size: $font-size-sm; text-transform: uppercase; }
+      }
+    }
+
     .insights-grid {
       display: grid;
       grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
@@ -143,4 +206,74 @@ import { CommonModule } from '@angular/common';
     }
   `]
 })
-export class FiltersComponent { }
+export class FiltersComponent implements OnInit {
+    // Dropdown options; served from the backend's in-memory catalog
+    catalog: AnalyticsCatalog | null = null;
+
+    range = '';
+    category = '';
+    metricName = '';
+    minValue: number | null = null;
+    maxValue: number | null = null;
+    sort: AnalyticsSort = '-recorded_at';
+
+    results: AnalyticsData[] | null = null;
+    loading = false;
+    error: string | null = null;
+
+    constructor(private analyticsService: AnalyticsService) { }
+
+    ngOnInit() {
+        this.analyticsService.getCatalog().subscribe({
+            next: (catalog) => this.catalog = catalog,
+            error: () => this.catalog = null
+        });
+    }
+
+    /**
+     * Filtering and sorting run on the server against indexed columns;
+     * only the matching page comes back
+     */
+    applyFilters() {
+        const query: AnalyticsQuery = { sort: this.sort, limit: 200 };
+        if (this.category) {
+            query.categories = [this.category];
+        }
+        if (this.metricName) {
+            query.metricNames = [this.metricName];
+        }
+        if (this.minValue != null) {
+            query.minValue = this.minValue;
+        }
+        if (this.maxValue != null) {
+            query.maxValue = this.maxValue;
+        }
+        const start = this.rangeStart();
+        if (start) {
+            query.start = start.toISOString();
+        }
+
+        this.loading = true;
+        this.error = null;
+        this.analyticsService.queryAnalyticsData(query).subscribe({
+            next: (rows) => {
+                this.results = rows;
+                this.loading = false;
+            },
+            error: (err) => {
+                this.error = err.error?.detail || 'Failed to load filtered data.';
+                this.loading = false;
+            }
+        });
+    }
+
+    private rangeStart(): Date | null {
+        if (this.range === 'ytd') {
+            return new Date(new Date().getFullYear(), 0, 1);
+        }
+        if (this.range) {
+            return new Date(Date.now() - Number(this.range) * 24 * 60 * 60 * 1000);
+        }
+        return null;
+    }
+}
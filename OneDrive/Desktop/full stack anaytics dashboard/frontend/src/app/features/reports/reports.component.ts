@@ -1,7 +1,7 @@
 import { Component, OnInit } from '@angular/core';
 import { CommonModule } from '@angular/common';
 import { FormsModule, ReactiveFormsModule, FormBuilder, FormGroup, Validators } from '@angular/forms';
-import { AnalyticsService, AnalyticsData } from '../../core/services/analytics.service';
+import { AnalyticsService, AnalyticsData, AnalyticsCatalog } from '../../core/services/analytics.service';
 
 @Component({
   selector: 'app-reports',
@@ -26,7 +26,10 @@ import { AnalyticsService, AnalyticsData } from '../../core/services/analytics.s
           <div class="form-grid">
             <div class="form-group">
               <label>Metric Name</label>
-              <input type="text" formControlName="metricName" placeholder="e.g. CPU Usage">
+              <input type="text" formControlName="metricName" placeholder="e.g. CPU Usage" list="metric-names">
+              <datalist id="metric-names">
+                <option *ngFor="let m of catalog?.metric_names" [value]="m.name"></option>
+              </datalist>
             </div>
             <div class="form-group">
               <label>Value</label>
@@ -34,7 +37,10 @@ import { AnalyticsService, AnalyticsData } from '../../core/services/analytics.s
             </div>
             <div class="form-group">
               <label>Category</label>
-              <input type="text" formControlName="category" placeholder="e.g. System">
+              <input type="text" formControlName="category" placeholder="e.g. System" list="categories">
+              <datalist id="categories">
+                <option *ngFor="let c of catalog?.categories" [value]="c.name"></option>
+              </datalist>
             </div>
           </div>
           <div class="form-actions">
@@ -225,6 +231,8 @@ export class ReportsComponent implements OnInit {
   success = false;
   showForm = false;
   dataForm: FormGroup;
+  // Existing names, suggested while typing a new entry
+  catalog: AnalyticsCatalog | null = null;
 
   constructor(
     private analyticsService: AnalyticsService,
@@ -239,6 +247,14 @@ export class ReportsComponent implements OnInit {
 
   ngOnInit() {
     this.refreshData();
+    this.loadCatalog();
+  }
+
+  loadCatalog() {
+    this.analyticsService.getCatalog().subscribe({
+      next: (catalog) => this.catalog = catalog,
+      error: () => this.catalog = null
+    });
   }
 
   refreshData() {
@@ -266,6 +282,7 @@ export class ReportsComponent implements OnInit {
           this.success = true;
           this.dataForm.reset({ value: 0 });
           this.refreshData();
+          this.loadCatalog();
           setTimeout(() => this.success = false, 3000);
         },
         error: (err) => {
@@ -286,15 +303,16 @@ export class ReportsComponent implements OnInit {
   }
 
   downloadCSV() {
-    if (!this.realData.length) return;
-    const headers = ['ID', 'Metric', 'Category', 'Value', 'Date'];
-    const rows = this.realData.map(d => `${d.id},"${d.metric_name}","${d.category}",${d.value},${d.recorded_at}`);
-    const csvContent = [headers.join(','), ...rows].join('\n');
-    const blob = new Blob([csvContent], { type: 'text/csv' });
-    const url = window.URL.createObjectURL(blob);
-    const a = document.createElement('a');
-    a.href = url;
-    a.download = 'analytics_report.csv';
-    a.click();
+    this.analyticsService.exportAnalyticsData('csv').subscribe({
+      next: (blob) => {
+        const url = window.URL.createObjectURL(blob);
+        const a = document.createElement('a');
+        a.href = url;
+        a.download = 'analytics_report.csv';
+        a.click();
+        window.URL.revokeObjectURL(url);
+      },
+      error: (err) => console.error('Export failed', err)
+    });
   }
 }
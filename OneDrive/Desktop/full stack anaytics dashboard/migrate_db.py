@@ -22,6 +22,23 @@ def migrate_db():
             print("Migration successful.")
         else:
             print("'bio' column already exists.")
+
+        # Composite indexes used by keyset pagination on analytics_data
+        cursor.execute("PRAGMA table_info(analytics_data)")
+        analytics_columns = [column[1] for column in cursor.fetchall()]
+        category_column = "category_id" if "category_id" in analytics_columns else "category"
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS ix_analytics_data_category_recorded_at_id "
+            f"ON analytics_data ({category_column}, recorded_at, id)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS ix_analytics_data_recorded_at_id "
+            "ON analytics_data (recorded_at, id)"
+        )
+        conn.commit()
+        print("Pagination indexes are in place.")
+        if category_column == "category":
+            print("analytics_data still stores names; run backend/migrate_dimensions.py to convert it.")
             
         conn.close()
     except Exception as e:
@@ -64,7 +64,12 @@ try:
     print(f"   Analytics records in database: {count}")
     
     if count > 0:
-        cursor.execute("SELECT id, metric_name, value, category FROM analytics_data LIMIT 5")
+        cursor.execute("""
+            SELECT d.id, m.name, d.value, c.name FROM analytics_data d
+            LEFT JOIN metrics m ON m.id = d.metric_id
+            LEFT JOIN categories c ON c.id = d.category_id
+            LIMIT 5
+        """)
         records = cursor.fetchall()
         print("   Sample records:")
         for record in records:
@@ -77,15 +82,24 @@ except Exception as e:
 # Insert test data directly
 print(f"\n[6] Testing direct data insert...")
 try:
+    cursor.execute("INSERT OR IGNORE INTO metrics (name) VALUES ('direct_test')")
+    cursor.execute("INSERT OR IGNORE INTO categories (name) VALUES ('testing')")
     cursor.execute("""
-        INSERT INTO analytics_data (metric_name, value, category, recorded_at)
-        VALUES ('direct_test', 777, 'testing', datetime('now'))
+        INSERT INTO analytics_data (metric_id, value, category_id, recorded_at)
+        VALUES (
+            (SELECT id FROM metrics WHERE name = 'direct_test'), 777,
+            (SELECT id FROM categories WHERE name = 'testing'), datetime('now')
+        )
     """)
     conn.commit()
     print("   SUCCESS: Test data inserted directly into database!")
     
     # Verify it was inserted
-    cursor.execute("SELECT * FROM analytics_data WHERE metric_name='direct_test' ORDER BY id DESC LIMIT 1")
+    cursor.execute("""
+        SELECT * FROM analytics_data
+        WHERE metric_id = (SELECT id FROM metrics WHERE name = 'direct_test')
+        ORDER BY id DESC LIMIT 1
+    """)
     result = cursor.fetchone()
     if result:
         print(f"   Verified: Record ID {result[0]} was created")